@@ -0,0 +1,237 @@
+"""
+Result cache for SOP-enhanced analysis.
+
+Repeated event signatures dominate traffic, and every miss may cost an LLM
+call, so results are cached per normalized event signature with LRU and TTL
+eviction. Which SOPs apply also depends on where and when an event happened
+(location- and time-scoped SOPs), so the key includes the set of scoped SOPs
+that apply to the event. Entries are tagged with the SOP corpus version they
+were computed against and are discarded as soon as the SOP snapshot changes.
+Concurrent misses for the same key are computed once.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from agents.sop_rule_engine import build_event_scope
+from agents.tools.sop_search import SOPContextualSearch
+from agents.triage_agent import run_sop_enhanced_analysis
+from config.settings import settings
+from sop.sop_snapshot import get_sop_snapshot
+
+logger = logging.getLogger(__name__)
+
+KeyNormalizer = Callable[[Dict[str, Any]], Hashable]
+ScopeProvider = Callable[[Dict[str, Any], str], Hashable]
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def cv_event_key(event_data: Dict[str, Any]) -> Hashable:
+    """Signature of a CV event: detection, severity and where it was seen."""
+    return (
+        _normalize(event_data.get('detection_name')),
+        _normalize(event_data.get('severity')),
+        _normalize(event_data.get('site_name')),
+        _normalize(event_data.get('camera_name'))
+    )
+
+
+def access_event_key(event_data: Dict[str, Any]) -> Hashable:
+    """Signature of an access control event: alarm, site and device."""
+    return (
+        _normalize(event_data.get('alarm_name')),
+        _normalize(event_data.get('site_name')),
+        _normalize(event_data.get('device_id'))
+    )
+
+
+DEFAULT_KEY_NORMALIZERS: Dict[str, KeyNormalizer] = {
+    "CV_Threat_Detection": cv_event_key,
+    "Access_Control_System": access_event_key
+}
+
+
+def sop_corpus_version() -> int:
+    """Version of the SOP snapshot used by the SOP search tool."""
+    return get_sop_snapshot(SOPContextualSearch.model_fields['db_path'].default).version
+
+
+def sop_event_scope(event_data: Dict[str, Any], event_type: str, db_path: Optional[str] = None) -> Hashable:
+    """The location- and time-scoped SOPs that apply to an event (see SOPSnapshot.applicable_scope)."""
+    try:
+        location, when = build_event_scope(event_data, event_type)
+    except ValueError:
+        # Event types without a known location or time are never scoped
+        return None
+    snapshot = get_sop_snapshot(db_path or SOPContextualSearch.model_fields['db_path'].default)
+    return snapshot.applicable_scope(location, when)
+
+
+class AnalysisCache:
+    """Thread-safe LRU + TTL cache of analysis results keyed by event signature"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 key_normalizers: Optional[Dict[str, KeyNormalizer]] = None,
+                 version_provider: Callable[[], int] = sop_corpus_version,
+                 scope_provider: ScopeProvider = sop_event_scope,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.key_normalizers = dict(DEFAULT_KEY_NORMALIZERS if key_normalizers is None else key_normalizers)
+        self.version_provider = version_provider
+        self.scope_provider = scope_provider
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, corpus_version, result)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, threading.Event] = {}
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_key_normalizer(self, event_type: str, normalizer: KeyNormalizer) -> None:
+        """Register the signature function for an event type"""
+        with self._lock:
+            self.key_normalizers[event_type] = normalizer
+            self._entries.clear()
+
+    def make_key(self, event_data: Dict[str, Any], event_type: str, *variant: Hashable) -> Optional[Hashable]:
+        """Cache key for an event, or None when the event type has no normalizer"""
+        normalizer = self.key_normalizers.get(event_type)
+        if normalizer is None:
+            return None
+        return (event_type, normalizer(event_data), self.scope_provider(event_data, event_type)) + variant
+
+    def get_or_compute(self, event_data: Dict[str, Any], event_type: str,
+                       compute: Callable[[], Dict[str, Any]], *variant: Hashable) -> Dict[str, Any]:
+        """
+        Return the cached result for an event, computing and storing it on a miss.
+
+        Args:
+            event_data: Event payload
+            event_type: Event type, selects the key normalizer
+            compute: Produces the result on a miss
+            variant: Extra key components (e.g. analysis options)
+
+        Returns:
+            A copy of the cached or freshly computed result
+        """
+        key = self.make_key(event_data, event_type, *variant)
+        if key is None:
+            return compute()
+
+        version = self.version_provider()
+        while True:
+            with self._lock:
+                self._check_version(version)
+                result = self._lookup(key)
+                if result is not None:
+                    self.hits += 1
+                    return copy.deepcopy(result)
+
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    self.misses += 1
+                    pending = self._in_flight[key] = threading.Event()
+                    break
+            # Another thread is computing this key; wait and retry the lookup
+            pending.wait()
+
+        try:
+            result = compute()
+            if _is_cacheable(result):
+                with self._lock:
+                    self._store(key, version, copy.deepcopy(result))
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.set()
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "corpus_version": self._version
+            }
+
+    def _check_version(self, version: int) -> None:
+        # Versions only move forward; a thread that read an older version must not roll back
+        if self._version is None or version > self._version:
+            if self._entries:
+                self.invalidations += len(self._entries)
+                logger.info(f"SOP corpus changed, invalidating {len(self._entries)} cached analyses")
+                self._entries.clear()
+            self._version = version
+
+    def _lookup(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, version, result = entry
+        if expires_at <= self.clock() or version != self._version:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key: Hashable, version: int, result: Dict[str, Any]) -> None:
+        if version != self._version or self.max_entries <= 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl_seconds, version, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    """Failed analyses (and rule-based fallbacks for a failed crew) are retried rather than cached"""
+    return isinstance(result, dict) and not result.get('sop_analysis_failed', False) and 'crew_error' not in result
+
+
+# Shared cache in front of run_sop_enhanced_analysis
+sop_analysis_cache = AnalysisCache(
+    max_entries=settings.sop_cache_max_entries,
+    ttl_seconds=settings.sop_cache_ttl
+)
+
+
+def run_cached_sop_enhanced_analysis(event_data: Dict[str, Any], event_type: str,
+                                     allow_crew: bool = True) -> Dict[str, Any]:
+    """run_sop_enhanced_analysis behind the shared result cache."""
+    return sop_analysis_cache.get_or_compute(
+        event_data,
+        event_type,
+        lambda: run_sop_enhanced_analysis(event_data, event_type, allow_crew=allow_crew),
+        allow_crew
+    )
@@ -0,0 +1,228 @@
+"""
+Execution layer for analysis work.
+
+The API handlers are async, but the analysis itself is synchronous: rule-based
+analyzers are CPU work and the CrewAI path blocks on crew.kickoff() for
+seconds. Handlers submit that work to a dedicated pool of worker threads with
+a bounded queue instead of running it on the event loop, so a slow LLM call
+never stalls /health or other requests. When the queue is full new work is
+rejected immediately (HTTP 429) rather than piling up, and work submitted
+while the pool is stopped is rejected with HTTP 503.
+
+The queue is a TriageQueue: work is dispatched by threat level with
+weighted fairness, and urgent work preempts queued low-priority work when
+the queue is full.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from agents.triage_scheduler import TriageQueue, DEFAULT_PRIORITY, pre_score
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the analysis queue is full"""
+
+
+class ExecutorUnavailableError(Exception):
+    """Raised when work is submitted to a stopped executor"""
+
+
+class _WorkItem:
+    __slots__ = ("future", "fn", "args", "kwargs", "enqueued_at")
+
+    def __init__(self, future: Future, fn: Callable, args: tuple, kwargs: dict):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = 0.0
+
+
+class AnalysisExecutor:
+    """Fixed pool of worker threads fed from a bounded priority queue"""
+
+    def __init__(self, workers: int, queue_size: int, name: str = "analysis",
+                 weights: Optional[Dict[str, int]] = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.name = name
+        self._lock = threading.Lock()
+        self._queue = TriageQueue(queue_size, weights)
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._queue.reopen()
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"{self.name}-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started {self.name} executor with {self.workers} workers and queue size {self.queue_size}")
+
+    def stop(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop accepting work, cancel queued work and stop the workers"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            threads = self._threads
+            self._threads = []
+
+        for item in self._queue.close():
+            item.future.cancel()
+
+        if wait:
+            for thread in threads:
+                thread.join(timeout)
+        logger.info(f"Stopped {self.name} executor")
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Queue fn(*args, **kwargs) at the default priority"""
+        return self.submit_prioritized(DEFAULT_PRIORITY, fn, *args, **kwargs)
+
+    def submit_prioritized(self, priority: str, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """
+        Queue fn(*args, **kwargs) for a worker thread at a priority level.
+
+        Raises:
+            ExecutorUnavailableError: The executor is not running
+            ExecutorSaturatedError: The queue is full of work at the same or higher priority
+        """
+        if not self._running:
+            raise ExecutorUnavailableError(f"{self.name} executor is not running")
+
+        future: Future = Future()
+        try:
+            preempted = self._queue.put(_WorkItem(future, fn, args, kwargs), priority)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturatedError(f"{self.name} queue is full ({self.queue_size} pending)")
+
+        if preempted is not None and preempted.future.set_running_or_notify_cancel():
+            with self._lock:
+                self.rejected += 1
+            preempted.future.set_exception(
+                ExecutorSaturatedError(f"{self.name} queue is full, preempted by {priority} work")
+            )
+        return future
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Submit work and await its result without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_prioritized(self, priority: str, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Submit work at a priority level and await its result"""
+        return await asyncio.wrap_future(self.submit_prioritized(priority, fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization counters"""
+        with self._lock:
+            return {
+                "running": self._running,
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "queued": self._queue.qsize(),
+                "queue_size": self.queue_size,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "levels": self._queue.stats()
+            }
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if not item.future.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                self._busy += 1
+            try:
+                result = item.fn(*item.args, **item.kwargs)
+            except BaseException as e:
+                item.future.set_exception(e)
+                with self._lock:
+                    self.failed += 1
+            else:
+                item.future.set_result(result)
+                with self._lock:
+                    self.completed += 1
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+
+# Shared executor for every analysis entry point
+analysis_executor = AnalysisExecutor(
+    workers=settings.analysis_workers,
+    queue_size=settings.analysis_queue_size
+)
+
+
+async def run_analysis(fn: Callable, *args: Any, priority: str = DEFAULT_PRIORITY, **kwargs: Any) -> Any:
+    """
+    Run analysis work on the shared executor from an async handler.
+
+    Raises:
+        HTTPException: 429 when the queue is full, 503 when the executor is not running
+    """
+    try:
+        return await analysis_executor.run_prioritized(priority, fn, *args, **kwargs)
+    except ExecutorSaturatedError as e:
+        logger.warning(f"Rejecting analysis request: {e}")
+        raise HTTPException(status_code=429, detail=f"Analysis capacity exceeded: {str(e)}", headers={"Retry-After": "1"})
+    except ExecutorUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Analysis service unavailable: {str(e)}")
+
+
+async def run_batch_analysis(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a batch function that submits each event to the shared executor itself.
+
+    fn is called as fn(*args, executor=analysis_executor, **kwargs) on a
+    helper thread that only waits for the events' futures, so the batch's
+    events are scheduled, queued and rejected like any other analysis work.
+
+    Raises:
+        HTTPException: 429 when the queue cannot take the batch, 503 when the executor is not running
+    """
+    try:
+        return await asyncio.to_thread(fn, *args, executor=analysis_executor, **kwargs)
+    except ExecutorSaturatedError as e:
+        logger.warning(f"Rejecting batch analysis request: {e}")
+        raise HTTPException(status_code=429, detail=f"Analysis capacity exceeded: {str(e)}", headers={"Retry-After": "1"})
+    except ExecutorUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Analysis service unavailable: {str(e)}")
+
+
+async def run_event_analysis(fn: Callable, event_data: Dict[str, Any], event_type: str, **kwargs: Any) -> Any:
+    """Run fn(event_data, event_type) on the shared executor, scheduled by the event's pre-score"""
+    return await run_analysis(fn, event_data, event_type, priority=pre_score(event_data, event_type), **kwargs)
@@ -0,0 +1,104 @@
+"""
+Per-worker pool of long-lived CrewAI agents and crews.
+
+Building an Agent instantiates its LLM client, tools (including a
+SOPContextualSearch instance) and handlers, and building a Crew wires up its
+memory and callbacks. Each analysis worker thread builds these once per kind
+and then only swaps in the per-request Task. Agents and crews are not shared
+between threads, so concurrent requests never see each other's state, and
+per-event state (tool results, the tool cache and crew memories) is reset
+after every event.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+from crewai import Agent, Crew, Process, Task
+from crewai.agents.cache.cache_handler import CacheHandler
+
+logger = logging.getLogger(__name__)
+
+# Crew memories that hold state from previous events
+EVENT_MEMORY_TYPES = ("short", "entity")
+
+
+class PooledCrew:
+    """An agent and its single-agent crew, reused for every event on one thread"""
+
+    def __init__(self, agent_factory: Callable[[], Agent], verbose: bool = True):
+        self.agent = agent_factory()
+        self.verbose = verbose
+        self.crew = None
+        self.runs = 0
+
+    def kickoff(self, task: Task) -> Any:
+        """Run a per-request task on the pooled crew, then reset per-event state"""
+        task.agent = self.agent
+        if self.crew is None:
+            self.crew = Crew(
+                agents=[self.agent],
+                tasks=[task],
+                verbose=self.verbose,
+                process=Process.sequential
+            )
+        else:
+            self.crew.tasks = [task]
+
+        try:
+            return self.crew.kickoff()
+        finally:
+            self.runs += 1
+            self.reset()
+
+    def reset(self) -> None:
+        """Clear state carried over from the previous event"""
+        self.agent.tools_results = []
+        # Cached tool results (e.g. SOP searches) must not outlive the event
+        self.agent.set_cache_handler(CacheHandler())
+
+        if self.crew is not None:
+            if self.crew.memory:
+                for memory_type in EVENT_MEMORY_TYPES:
+                    try:
+                        self.crew.reset_memories(memory_type)
+                    except RuntimeError as e:
+                        logger.warning(f"Could not reset {memory_type} crew memory: {e}")
+            self.crew.tasks = []
+
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_created = 0
+
+
+def get_pooled_crew(kind: str, agent_factory: Callable[[], Agent], verbose: bool = True) -> PooledCrew:
+    """
+    Get this thread's pooled crew of a kind, building it on first use.
+
+    Args:
+        kind: Pool key, one per agent configuration
+        agent_factory: Builds the agent the first time this thread needs it
+        verbose: Crew verbosity
+
+    Returns:
+        The calling thread's PooledCrew for this kind
+    """
+    global _created
+
+    crews: Dict[str, PooledCrew] = getattr(_local, "crews", None)
+    if crews is None:
+        crews = _local.crews = {}
+
+    pooled = crews.get(kind)
+    if pooled is None:
+        pooled = crews[kind] = PooledCrew(agent_factory, verbose)
+        with _registry_lock:
+            _created += 1
+        logger.info(f"Built pooled {kind} crew for thread {threading.current_thread().name}")
+    return pooled
+
+
+def pool_stats() -> Dict[str, int]:
+    """Number of pooled crews built across all threads"""
+    return {"crews_built": _created}
@@ -0,0 +1,357 @@
+"""
+Deterministic SOP-enhanced analysis.
+
+Most events resolve without an LLM: the rule-based analyzers give the baseline
+assessment, the SOP snapshot finds the applicable procedures, and
+get_priority_override / merge_response_requirements combine them. This module
+produces the same output schema as the CrewAI path in microseconds and tells
+the caller whether the result is decisive or should be escalated to the crew.
+
+Which SOPs apply, and what they require, depends on the event's detection or
+alarm name and, for SOPs limited to certain locations or hours, on where and
+when it happened. Those decisions are materialized in a table per SOP
+database, keyed by (event type, name, scoped SOPs in effect): the names the
+system is known to produce are resolved up front, others on first sight, and
+the whole table is rebuilt when the SOP snapshot version changes (an SOP was
+indexed or deleted).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import logging
+import os
+import threading
+
+from agents.tools.cv_analyzer import CVThreatAnalyzer
+from agents.tools.access_analyzer import AccessControlAnalyzer
+from agents.tools.sop_search import SOPContextualSearch, get_priority_override, merge_response_requirements
+from config.settings import settings
+from sop.applicability import normalize_path, parse_event_time
+from sop.sop_snapshot import SOPSnapshot, get_sop_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Minimum SOP similarity for a match to count as decisive
+SOP_MATCH_THRESHOLD = 0.5
+
+# Fraction of a trigger's words the event must match, so a shared generic word
+# ("person") does not make an unrelated SOP applicable
+TRIGGER_COVERAGE_THRESHOLD = 0.5
+
+# Final priority score applied when an SOP overrides the AI priority
+SOP_PRIORITY_SCORES = {
+    "CRITICAL": 10,
+    "HIGH": 9,
+    "MEDIUM": 6,
+    "LOW": 3
+}
+
+# Detection and alarm names the sensors produce; their decisions are precomputed
+KNOWN_EVENT_SIGNATURES: Dict[str, List[str]] = {
+    "CV_Threat_Detection": [
+        "Person Brandishing Firearm",
+        "Smoke or Fire",
+        "Person Falling Down",
+        "Person Jumping Fence",
+        "Tailgating",
+        "Door Propped Open"
+    ],
+    "Access_Control_System": [
+        "Door Forced Open",
+        "Invalid Badge Read",
+        "Door Held Open",
+        "Granted Access"
+    ]
+}
+
+# Bound on memoized decisions for names outside KNOWN_EVENT_SIGNATURES
+MAX_DECISIONS = 4096
+
+_cv_analyzer = CVThreatAnalyzer()
+_access_analyzer = AccessControlAnalyzer()
+
+
+def build_event_context(event_data: Dict[str, Any], event_type: str) -> str:
+    """Build the SOP search context for an event from its signature."""
+    if event_type == "CV_Threat_Detection":
+        return event_data.get('detection_name', '') or ''
+    elif event_type == "Access_Control_System":
+        return event_data.get('alarm_name', '') or ''
+    raise ValueError(f"Unknown event type: {event_type}")
+
+
+def build_event_scope(event_data: Dict[str, Any], event_type: str) -> Tuple[Optional[List[str]], Optional[datetime]]:
+    """
+    Location path and time of an event, for SOP applicability.
+
+    CV events are located at "site > camera" (or their space's full path when
+    the payload carries one), access events at their device, under their site
+    if known. Either part is None when the event does not say.
+    """
+    if event_type == "CV_Threat_Detection":
+        full_path = event_data.get('space_path') or event_data.get('location')
+        if isinstance(full_path, str) and full_path.strip():
+            location = normalize_path(full_path)
+        else:
+            location = [event_data.get('site_name'), event_data.get('camera_name')]
+        when = parse_event_time(event_data.get('creation_time'))
+    elif event_type == "Access_Control_System":
+        location = [event_data.get('site_name'), event_data.get('device_id')]
+        when = parse_event_time(event_data.get('timestamp'))
+    else:
+        raise ValueError(f"Unknown event type: {event_type}")
+
+    location = [segment for segment in location if isinstance(segment, str) and segment.strip()]
+    return location or None, when
+
+
+def run_rule_based_sop_analysis(event_data: Dict[str, Any], event_type: str,
+                                db_path: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run the SOP-enhanced analysis without the LLM crew.
+
+    Args:
+        event_data: Event payload
+        event_type: "CV_Threat_Detection" or "Access_Control_System"
+        db_path: SOP database, defaults to the SOP search tool's database
+
+    Returns:
+        Tuple of (analysis result, decisive). decisive is False when no SOP
+        matched decisively, or when the analyzer confidence is low and no SOP
+        overrides the priority; the caller should then escalate to the crew.
+    """
+    if event_type == "CV_Threat_Detection":
+        security_analysis = _cv_analyzer._run(event_data)
+    elif event_type == "Access_Control_System":
+        security_analysis = _access_analyzer._run(event_data)
+    else:
+        raise ValueError(f"Unknown event type: {event_type}")
+
+    event_context = build_event_context(event_data, event_type)
+    location, when = build_event_scope(event_data, event_type)
+    decision = get_sop_decision_table(db_path).lookup(event_type, event_context, location, when)
+
+    result = merge_sop_analysis(event_type, security_analysis, decision)
+
+    # An SOP priority override determines the outcome regardless of the analyzer's confidence
+    confident = security_analysis['confidence_score'] >= settings.medium_confidence_threshold
+    decisive = bool(decision.applicable_sops) and (confident or decision.priority_override is not None)
+    logger.debug(f"Rule-based SOP analysis for {event_type}: {len(decision.applicable_sops)} SOPs, decisive={decisive}")
+    return result, decisive
+
+
+class SOPDecision:
+    """The applicable SOPs for an event signature and everything derived from them"""
+
+    __slots__ = (
+        "applicable_sops", "priority_override", "requirements",
+        "escalation_required", "regulatory_requirements", "reasoning_titles"
+    )
+
+    def __init__(self, applicable_sops: List[Dict[str, Any]]):
+        self.applicable_sops = applicable_sops
+        self.priority_override: Optional[str] = get_priority_override(applicable_sops)
+        self.requirements: Dict[str, Any] = merge_response_requirements(applicable_sops)
+        self.escalation_required: bool = (
+            self.requirements['escalation_required']
+            or any((sop.get('special_conditions') or {}).get('escalation_required') for sop in applicable_sops)
+        )
+        self.regulatory_requirements: List[str] = _unique([
+            requirement
+            for sop in applicable_sops
+            for requirement in sop.get('regulatory_requirements', [])
+        ])
+        self.reasoning_titles = ", ".join(sop['title'] for sop in applicable_sops)
+
+
+def resolve_sop_decision(snapshot: SOPSnapshot, event_context: str, location: Optional[List[str]] = None,
+                         when: Optional[datetime] = None) -> SOPDecision:
+    """Search the SOP snapshot for an event context and keep the SOPs that apply to it."""
+    if snapshot.error or not event_context.strip():
+        return SOPDecision([])
+
+    candidates = snapshot.search(event_context, location=location, when=when)
+    keywords = event_context.lower().split()
+    return SOPDecision([
+        sop for sop in candidates
+        if sop['similarity_score'] >= SOP_MATCH_THRESHOLD
+        and any(_trigger_coverage(trigger, keywords) >= TRIGGER_COVERAGE_THRESHOLD for trigger in sop['matched_triggers'])
+    ])
+
+
+class SOPDecisionTable:
+    """SOP decisions per (event type, event context, scope), rebuilt when the SOP corpus changes"""
+
+    def __init__(self, db_path: str, signatures: Optional[Dict[str, List[str]]] = None,
+                 max_entries: int = MAX_DECISIONS):
+        self.db_path = db_path
+        self.signatures = KNOWN_EVENT_SIGNATURES if signatures is None else signatures
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._decisions: Dict[Tuple[str, str, FrozenSet[str]], SOPDecision] = {}
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def lookup(self, event_type: str, event_context: str, location: Optional[List[str]] = None,
+               when: Optional[datetime] = None) -> SOPDecision:
+        """
+        Decision for an event context.
+
+        Args:
+            event_type: Event type the context was built for
+            event_context: Detection or alarm name (see build_event_context)
+            location: Event location path, None if unknown (see build_event_scope)
+            when: Event time, None if unknown
+
+        Returns:
+            The shared SOPDecision; callers must not modify it
+        """
+        snapshot = get_sop_snapshot(self.db_path)
+        # Events where the same location/time-scoped SOPs apply share decisions
+        key = (event_type, _normalize(event_context), snapshot.applicable_scope(location, when))
+        with self._lock:
+            if snapshot.version != self._version:
+                self._rebuild(snapshot)
+            decision = self._decisions.get(key)
+            if decision is not None:
+                self.hits += 1
+                return decision
+            self.misses += 1
+            version = self._version
+
+        decision = resolve_sop_decision(snapshot, event_context, location, when)
+        with self._lock:
+            if self._version == version and len(self._decisions) < self.max_entries:
+                self._decisions[key] = decision
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        """Table size, hit/miss counters and the corpus version it was built for"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._decisions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "rebuilds": self.rebuilds,
+                "corpus_version": self._version
+            }
+
+    def _rebuild(self, snapshot: SOPSnapshot) -> None:
+        # Precomputed for events of unknown location and time; when no SOP is
+        # scoped, that is every event
+        scope = snapshot.applicable_scope()
+        self._decisions = {
+            (event_type, _normalize(name), scope): resolve_sop_decision(snapshot, name)
+            for event_type, names in self.signatures.items()
+            for name in names
+        }
+        self._version = snapshot.version
+        self.rebuilds += 1
+        logger.info(f"Rebuilt SOP decision table for {self.db_path} with {len(self._decisions)} signatures")
+
+
+_tables_lock = threading.Lock()
+_tables: Dict[str, SOPDecisionTable] = {}
+
+
+def get_sop_decision_table(db_path: Optional[str] = None) -> SOPDecisionTable:
+    """Get the shared decision table for an SOP database (defaults to the SOP search tool's database)"""
+    db_path = os.path.abspath(db_path or SOPContextualSearch.model_fields['db_path'].default)
+    with _tables_lock:
+        table = _tables.get(db_path)
+        if table is None:
+            table = _tables[db_path] = SOPDecisionTable(db_path)
+        return table
+
+
+def sop_decision_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every decision table, keyed by database path"""
+    with _tables_lock:
+        tables = dict(_tables)
+    return {db_path: table.stats() for db_path, table in tables.items()}
+
+
+def merge_sop_analysis(event_type: str, security_analysis: Dict[str, Any],
+                       decision: SOPDecision) -> Dict[str, Any]:
+    """Combine a rule-based security analysis with the SOP decision for the event."""
+    applicable_sops = decision.applicable_sops
+    sop_override = decision.priority_override
+    requirements = decision.requirements
+
+    if sop_override:
+        final_threat_level = sop_override
+        final_priority_score = SOP_PRIORITY_SCORES[sop_override]
+    else:
+        final_threat_level = security_analysis['ai_threat_level']
+        final_priority_score = security_analysis['priority_score']
+
+    # SOP-mandated actions come first, security actions are merged after them
+    merged_actions = _unique(requirements['required_actions'] + security_analysis['recommended_actions'])
+
+    escalation_required = security_analysis['escalation_required'] or decision.escalation_required
+
+    return {
+        "event_type": event_type,
+        "original_security_analysis": security_analysis,
+        "applicable_sops": [
+            {
+                "sop_id": sop['sop_id'],
+                "title": sop['title'],
+                "priority_override": sop['priority_override'],
+                "similarity_score": sop['similarity_score'],
+                "matched_triggers": list(sop['matched_triggers'])
+            }
+            for sop in applicable_sops
+        ],
+        "sop_priority_override": sop_override,
+        "final_threat_level": final_threat_level,
+        "final_priority_score": final_priority_score,
+        "merged_response_actions": merged_actions,
+        "response_timeline": requirements['timeline'] or security_analysis['response_timeline'],
+        "escalation_required": escalation_required,
+        "notifications": list(requirements['notifications']),
+        "regulatory_requirements": list(decision.regulatory_requirements),
+        "sop_influence_reasoning": _build_reasoning(security_analysis, decision),
+        "confidence_score": security_analysis['confidence_score'],
+        "false_positive_probability": security_analysis['false_positive_probability'],
+        "event_summary": security_analysis['event_summary'],
+        "analysis_engine": "rule_based",
+        "sop_analysis_failed": False
+    }
+
+
+def _build_reasoning(security_analysis: Dict[str, Any], decision: SOPDecision) -> str:
+    if not decision.applicable_sops:
+        return "No applicable SOPs found - using standard analysis"
+
+    titles = decision.reasoning_titles
+    sop_override = decision.priority_override
+    if sop_override:
+        return (
+            f"{titles} applied - {sop_override} priority override "
+            f"(AI assessment: {security_analysis['ai_threat_level']}, "
+            f"priority {security_analysis['priority_score']}/10)"
+        )
+    return f"{titles} applied - response requirements merged, no priority override"
+
+
+def _trigger_coverage(trigger: str, keywords: List[str]) -> float:
+    """Fraction of trigger words matched by an event keyword (same substring rule as the SOP search)."""
+    words = trigger.lower().split()
+    if not words:
+        return 0.0
+    return sum(1 for word in words if any(keyword in word for keyword in keywords)) / len(words)
+
+
+def _normalize(event_context: str) -> str:
+    """Decision key of an event context; the SOP search only sees its lowercased words."""
+    return " ".join(event_context.lower().split())
+
+
+def _unique(items: List[str]) -> List[str]:
+    """Remove duplicates while preserving order."""
+    return list(dict.fromkeys(items))
@@ -1,9 +1,69 @@
 from crewai.tools import tool
 from typing import Dict, Any, List, Tuple
 from models.event_models import ThreatLevel, TriageAnalysis
+from agents.tools.indicators import ClassificationColumns, IndicatorRules, compile_indicators, expand_results
+from array import array
 from datetime import datetime, timedelta
 import re
 
+# Source types derived from the device ID, first match wins
+SOURCE_INDICATORS = [
+    ('card_reader', ['reader']),
+    ('door_contact_sensor', ['door']),
+    ('keypad', ['keypad']),
+    ('controller_network', ['controller']),
+    ('emergency_exit_sensor', ['emergency'])
+]
+
+# Critical threats - forced entry, duress, security breaches
+CRITICAL_INDICATORS = [
+    'forced entry', 'duress', 'panic', 'emergency', 'break in', 'tamper',
+    'anti-passback violation', 'tailgating', 'unauthorized access attempt'
+]
+
+# High threats - unauthorized access, invalid credentials
+HIGH_INDICATORS = [
+    'door held open', 'invalid card', 'access denied', 'unauthorized',
+    'door left open', 'propped open', 'multiple failed attempts'
+]
+
+# Medium threats - system issues with security implications
+MEDIUM_INDICATORS = [
+    'door ajar', 'communication lost', 'sensor fault', 'lock failure',
+    'battery low', 'time zone violation', 'after hours access'
+]
+
+# Low threats - routine maintenance, system notifications
+LOW_INDICATORS = [
+    'scheduled maintenance', 'system reboot', 'status update',
+    'normal operation', 'periodic check', 'heartbeat'
+]
+
+# Assessment by indicator found in the alarm name, most severe first
+ALARM_LEVEL_INDICATORS = [
+    ((ThreatLevel.CRITICAL, 0.90, 0.05), CRITICAL_INDICATORS),
+    ((ThreatLevel.HIGH, 0.80, 0.10), HIGH_INDICATORS),
+    ((ThreatLevel.MEDIUM, 0.70, 0.20), MEDIUM_INDICATORS),
+    ((ThreatLevel.LOW, 0.60, 0.35), LOW_INDICATORS)
+]
+
+PRIORITY_BASE_SCORES = {
+    ThreatLevel.CRITICAL: 9,
+    ThreatLevel.HIGH: 7,
+    ThreatLevel.MEDIUM: 5,
+    ThreatLevel.LOW: 3
+}
+
+# Sources that raise or lower the priority score
+CRITICAL_SOURCES = ['door', 'lock', 'entry', 'exit']
+MAINTENANCE_SOURCES = ['sensor', 'battery', 'communication']
+
+# Precompiled rules shared by _run, analyze_many and pre-scoring
+_SOURCE_RULES = IndicatorRules(SOURCE_INDICATORS)
+_ALARM_LEVEL_RULES = IndicatorRules(ALARM_LEVEL_INDICATORS)
+_CRITICAL_SOURCE_PATTERN = compile_indicators(CRITICAL_SOURCES)
+_MAINTENANCE_SOURCE_PATTERN = compile_indicators(MAINTENANCE_SOURCES)
+
 @tool("Access Control Analyzer")
 def analyze_access_control(event_data: Dict[str, Any]) -> Dict[str, Any]:
     """Analyzes access control system events to assess security threats, differentiate between system issues and security concerns, and generate appropriate responses."""
@@ -64,22 +124,69 @@ class AccessControlAnalyzer:
             "priority_score": priority_score
         }
     
+    def analyze_many(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze many access control events at once.
+
+        Events are grouped by signature (alarm, device) and each distinct
+        signature is classified once, with the same rules as _run, into
+        array-backed columns. Output is identical to calling _run on each
+        event.
+
+        Args:
+            events: Access control event payloads
+
+        Returns:
+            One analysis per event, in input order
+        """
+        signatures: Dict[Tuple[str, str], int] = {}
+        rows = array('l')
+        for event_data in events:
+            signature = (
+                event_data.get('alarm_name', 'Unknown Alarm'),
+                event_data.get('device_id', 'Unknown Device')
+            )
+            rows.append(signatures.setdefault(signature, len(signatures)))
+
+        columns = ClassificationColumns()
+        sources = []
+        for alarm_name, device_id in signatures:
+            source = self._derive_source_from_device(device_id)
+            sources.append(source)
+            columns.append(*self._assess_access_threat_level(alarm_name, source, device_id))
+
+            row = len(columns.priority)
+            columns.priority.append(
+                self._calculate_access_priority_score(columns.threat_level(row), columns.confidence[row], source)
+            )
+
+        templates = []
+        for row, (alarm_name, device_id) in enumerate(signatures):
+            threat_level = columns.threat_level(row)
+            confidence = columns.confidence[row]
+            false_positive_prob = columns.false_positive[row]
+            templates.append({
+                "event_type": "ACCESS_CONTROL",
+                "ai_threat_level": threat_level.value,
+                "false_positive_probability": false_positive_prob,
+                "confidence_score": confidence,
+                "recommended_actions": self._generate_access_recommendations(
+                    threat_level, alarm_name, sources[row], device_id
+                ),
+                "escalation_required": threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL],
+                "response_timeline": self._get_response_timeline(threat_level),
+                "analysis_reasoning": self._generate_access_reasoning(
+                    alarm_name, threat_level, sources[row], device_id, confidence, false_positive_prob
+                ),
+                "event_summary": f"{alarm_name} - {device_id} ({sources[row]})",
+                "priority_score": columns.priority[row]
+            })
+
+        return expand_results(templates, rows)
+
     def _derive_source_from_device(self, device_id: str) -> str:
         """Derive source type from device ID."""
-        device_lower = device_id.lower()
-        
-        if 'reader' in device_lower:
-            return 'card_reader'
-        elif 'door' in device_lower:
-            return 'door_contact_sensor'
-        elif 'keypad' in device_lower:
-            return 'keypad'
-        elif 'controller' in device_lower:
-            return 'controller_network'
-        elif 'emergency' in device_lower:
-            return 'emergency_exit_sensor'
-        else:
-            return 'access_control_device'
+        return _SOURCE_RULES.first(device_id.lower(), 'access_control_device')
     
     def _assess_access_threat_level(self, alarm_name: str, source: str, device_id: str) -> Tuple[ThreatLevel, float, float]:
         """Assess threat level based on access control alarm characteristics."""
@@ -87,37 +194,9 @@ class AccessControlAnalyzer:
         alarm_lower = alarm_name.lower()
         source_lower = source.lower()
         
-        # Critical threats - forced entry, duress, security breaches
-        critical_indicators = [
-            'forced entry', 'duress', 'panic', 'emergency', 'break in', 'tamper',
-            'anti-passback violation', 'tailgating', 'unauthorized access attempt'
-        ]
-        if any(indicator in alarm_lower for indicator in critical_indicators):
-            return ThreatLevel.CRITICAL, 0.90, 0.05
-        
-        # High threats - unauthorized access, invalid credentials
-        high_indicators = [
-            'door held open', 'invalid card', 'access denied', 'unauthorized',
-            'door left open', 'propped open', 'multiple failed attempts'
-        ]
-        if any(indicator in alarm_lower for indicator in high_indicators):
-            return ThreatLevel.HIGH, 0.80, 0.10
-        
-        # Medium threats - system issues with security implications
-        medium_indicators = [
-            'door ajar', 'communication lost', 'sensor fault', 'lock failure',
-            'battery low', 'time zone violation', 'after hours access'
-        ]
-        if any(indicator in alarm_lower for indicator in medium_indicators):
-            return ThreatLevel.MEDIUM, 0.70, 0.20
-        
-        # Low threats - routine maintenance, system notifications
-        low_indicators = [
-            'scheduled maintenance', 'system reboot', 'status update',
-            'normal operation', 'periodic check', 'heartbeat'
-        ]
-        if any(indicator in alarm_lower for indicator in low_indicators):
-            return ThreatLevel.LOW, 0.60, 0.35
+        assessment = _ALARM_LEVEL_RULES.first(alarm_lower)
+        if assessment is not None:
+            return assessment
         
         # Source-based assessment
         if 'sensor' in source_lower or 'contact' in source_lower:
@@ -229,14 +308,7 @@ class AccessControlAnalyzer:
     def _calculate_access_priority_score(self, threat_level: ThreatLevel, confidence: float, source: str) -> int:
         """Calculate priority score from 1-10 for access control events."""
         
-        base_scores = {
-            ThreatLevel.CRITICAL: 9,
-            ThreatLevel.HIGH: 7,
-            ThreatLevel.MEDIUM: 5,
-            ThreatLevel.LOW: 3
-        }
-        
-        score = base_scores.get(threat_level, 3)
+        score = PRIORITY_BASE_SCORES.get(threat_level, 3)
         
         # Adjust based on confidence
         if confidence > 0.85:
@@ -245,9 +317,9 @@ class AccessControlAnalyzer:
             score -= 1
         
         # Adjust based on source criticality
-        if any(critical in source.lower() for critical in ['door', 'lock', 'entry', 'exit']):
+        if _CRITICAL_SOURCE_PATTERN.search(source.lower()):
             score += 1
-        elif any(maintenance in source.lower() for maintenance in ['sensor', 'battery', 'communication']):
+        elif _MAINTENANCE_SOURCE_PATTERN.search(source.lower()):
             score -= 1
         
         return min(max(score, 1), 10)  # Clamp between 1-10
\ No newline at end of file
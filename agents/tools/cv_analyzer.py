@@ -1,8 +1,59 @@
 from crewai.tools import tool
 from typing import Dict, Any, List, Tuple
 from models.event_models import ThreatLevel, TriageAnalysis
+from agents.tools.indicators import ClassificationColumns, IndicatorRules, compile_indicators, expand_results
+from array import array
 import re
 
+# Threat icons derived from the threat name, first match wins
+ICON_INDICATORS = [
+    ('GUN', ['firearm', 'gun', 'brandishing']),
+    ('FIRE', ['fire', 'smoke']),
+    ('FALL', ['falling']),
+    ('FENCE', ['fence', 'jumping']),
+    ('DOOR', ['door', 'propped']),
+    ('PERSON', ['tailgating'])
+]
+
+# Critical threats - weapons and violence
+CRITICAL_INDICATORS = ['firearm', 'gun', 'weapon', 'knife', 'violence', 'assault', 'brandishing']
+
+# High threats - unauthorized access, suspicious behavior
+HIGH_INDICATORS = ['unauthorized', 'intrusion', 'trespassing', 'suspicious', 'loitering']
+
+# Medium threats - general security concerns
+MEDIUM_INDICATORS = ['unattended', 'overcrowding', 'restricted', 'violation']
+
+# Assessment by indicator found in the threat name, most severe first
+THREAT_LEVEL_INDICATORS = [
+    ((ThreatLevel.CRITICAL, 0.95, 0.05), CRITICAL_INDICATORS),
+    ((ThreatLevel.HIGH, 0.85, 0.10), HIGH_INDICATORS),
+    ((ThreatLevel.MEDIUM, 0.75, 0.20), MEDIUM_INDICATORS)
+]
+
+# Severity-based assessment for threats without indicators
+SEVERITY_ASSESSMENTS = {
+    'SEV0': (ThreatLevel.CRITICAL, 0.90, 0.05),
+    'SEV1': (ThreatLevel.HIGH, 0.80, 0.10),
+    'SEV2': (ThreatLevel.MEDIUM, 0.70, 0.20)
+}
+DEFAULT_SEVERITY_ASSESSMENT = (ThreatLevel.LOW, 0.60, 0.30)
+
+PRIORITY_BASE_SCORES = {
+    ThreatLevel.CRITICAL: 9,
+    ThreatLevel.HIGH: 7,
+    ThreatLevel.MEDIUM: 5,
+    ThreatLevel.LOW: 3
+}
+
+# Locations that raise the priority score
+CRITICAL_LOCATIONS = ['entrance', 'exit', 'lobby', 'secure']
+
+# Precompiled rules shared by _run, analyze_many and pre-scoring
+_ICON_RULES = IndicatorRules(ICON_INDICATORS)
+_THREAT_LEVEL_RULES = IndicatorRules(THREAT_LEVEL_INDICATORS)
+_CRITICAL_LOCATION_PATTERN = compile_indicators(CRITICAL_LOCATIONS)
+
 @tool("CV Threat Analyzer")
 def analyze_cv_threat(event_data: Dict[str, Any]) -> Dict[str, Any]:
     """Analyzes computer vision threat detection events to assess threat levels, false positive probability, and generate actionable recommendations."""
@@ -65,52 +116,85 @@ class CVThreatAnalyzer:
             "priority_score": priority_score
         }
     
+    def analyze_many(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze many CV threat detection events at once.
+
+        Events are grouped by signature (detection, severity, site, camera) and
+        each distinct signature is classified once, with the same rules as
+        _run, into array-backed columns. Output is identical to calling _run
+        on each event.
+
+        Args:
+            events: CV threat detection event payloads
+
+        Returns:
+            One analysis per event, in input order
+        """
+        signatures: Dict[Tuple[str, str, str, str], int] = {}
+        rows = array('l')
+        for event_data in events:
+            signature = (
+                event_data.get('detection_name', 'Unknown Threat'),
+                event_data.get('severity', 'UNKNOWN'),
+                event_data.get('site_name', 'Unknown Site'),
+                event_data.get('camera_name', 'Unknown Camera')
+            )
+            rows.append(signatures.setdefault(signature, len(signatures)))
+
+        columns = ClassificationColumns()
+        icons = []
+        locations = []
+        for threat_name, severity, site_name, camera_name in signatures:
+            icon = self._derive_threat_icon(threat_name)
+            location = f"{site_name} > {camera_name}"
+            icons.append(icon)
+            locations.append(location)
+            columns.append(*self._assess_threat_level(threat_name, icon, severity, location))
+
+            row = len(columns.priority)
+            columns.priority.append(
+                self._calculate_priority_score(columns.threat_level(row), columns.confidence[row], location)
+            )
+
+        templates = []
+        for row, (threat_name, _, site_name, _) in enumerate(signatures):
+            threat_level = columns.threat_level(row)
+            confidence = columns.confidence[row]
+            false_positive_prob = columns.false_positive[row]
+            templates.append({
+                "event_type": "CV_THREAT",
+                "ai_threat_level": threat_level.value,
+                "false_positive_probability": false_positive_prob,
+                "confidence_score": confidence,
+                "recommended_actions": self._generate_recommendations(
+                    threat_level, threat_name, icons[row], locations[row], site_name
+                ),
+                "escalation_required": threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL],
+                "response_timeline": self._get_response_timeline(threat_level),
+                "analysis_reasoning": self._generate_reasoning(
+                    threat_name, threat_level, locations[row], confidence, false_positive_prob
+                ),
+                "event_summary": f"{threat_name} detected at {locations[row]} ({site_name})",
+                "priority_score": columns.priority[row]
+            })
+
+        return expand_results(templates, rows)
+
     def _derive_threat_icon(self, threat_name: str) -> str:
         """Derive threat icon from threat name."""
-        threat_lower = threat_name.lower()
-        
-        if 'firearm' in threat_lower or 'gun' in threat_lower or 'brandishing' in threat_lower:
-            return 'GUN'
-        elif 'fire' in threat_lower or 'smoke' in threat_lower:
-            return 'FIRE'
-        elif 'falling' in threat_lower:
-            return 'FALL'
-        elif 'fence' in threat_lower or 'jumping' in threat_lower:
-            return 'FENCE'
-        elif 'door' in threat_lower or 'propped' in threat_lower:
-            return 'DOOR'
-        elif 'tailgating' in threat_lower:
-            return 'PERSON'
-        else:
-            return 'UNKNOWN'
+        return _ICON_RULES.first(threat_name.lower(), 'UNKNOWN')
     
     def _assess_threat_level(self, threat_name: str, threat_icon: str, severity: str, location: str) -> Tuple[ThreatLevel, float, float]:
         """Assess threat level based on threat characteristics."""
         
-        # Critical threats - weapons and violence
-        critical_indicators = ['firearm', 'gun', 'weapon', 'knife', 'violence', 'assault', 'brandishing']
-        if any(indicator in threat_name.lower() for indicator in critical_indicators) or threat_icon == 'GUN':
-            return ThreatLevel.CRITICAL, 0.95, 0.05
-        
-        # High threats - unauthorized access, suspicious behavior
-        high_indicators = ['unauthorized', 'intrusion', 'trespassing', 'suspicious', 'loitering']
-        if any(indicator in threat_name.lower() for indicator in high_indicators):
-            return ThreatLevel.HIGH, 0.85, 0.10
-        
-        # Medium threats - general security concerns
-        medium_indicators = ['unattended', 'overcrowding', 'restricted', 'violation']
-        if any(indicator in threat_name.lower() for indicator in medium_indicators):
-            return ThreatLevel.MEDIUM, 0.75, 0.20
-        
-        # Severity-based assessment
-        if severity == 'SEV0':
-            return ThreatLevel.CRITICAL, 0.90, 0.05
-        elif severity == 'SEV1':
-            return ThreatLevel.HIGH, 0.80, 0.10
-        elif severity == 'SEV2':
-            return ThreatLevel.MEDIUM, 0.70, 0.20
-        else:
-            return ThreatLevel.LOW, 0.60, 0.30
+        # Gun icons are critical whether or not the name has a critical indicator
+        if threat_icon == 'GUN':
+            return THREAT_LEVEL_INDICATORS[0][0]
+        
+        return _THREAT_LEVEL_RULES.first(
+            threat_name.lower(), SEVERITY_ASSESSMENTS.get(severity, DEFAULT_SEVERITY_ASSESSMENT)
+        )
     
     def _generate_recommendations(self, threat_level: ThreatLevel, threat_name: str, 
                                 threat_icon: str, location: str, site_name: str) -> List[str]:
@@ -191,14 +275,7 @@ class CVThreatAnalyzer:
     def _calculate_priority_score(self, threat_level: ThreatLevel, confidence: float, location: str) -> int:
         """Calculate priority score from 1-10."""
         
-        base_scores = {
-            ThreatLevel.CRITICAL: 9,
-            ThreatLevel.HIGH: 7,
-            ThreatLevel.MEDIUM: 5,
-            ThreatLevel.LOW: 3
-        }
-        
-        score = base_scores.get(threat_level, 3)
+        score = PRIORITY_BASE_SCORES.get(threat_level, 3)
         
         # Adjust based on confidence
         if confidence > 0.9:
@@ -207,7 +284,7 @@ class CVThreatAnalyzer:
             score -= 1
         
         # Adjust based on location criticality
-        if any(critical in location.lower() for critical in ['entrance', 'exit', 'lobby', 'secure']):
+        if _CRITICAL_LOCATION_PATTERN.search(location.lower()):
             score += 1
         
         return min(max(score, 1), 10)  # Clamp between 1-10
\ No newline at end of file
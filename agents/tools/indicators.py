@@ -0,0 +1,68 @@
+"""
+Shared helpers for the rule-based analyzers.
+
+The analyzers classify events by lists of indicator substrings, tried in
+order. IndicatorRules compiles each list once into a single alternation
+regex, which matches exactly when one of the substrings occurs, and is the
+only implementation of those rules: _run, analyze_many and the scheduler's
+pre-score all go through it. The bulk (analyze_many) paths keep
+per-signature results in array-backed columns.
+"""
+
+import re
+from array import array
+from typing import Any, Dict, Generic, List, Optional, Pattern, Sequence, Tuple, TypeVar
+
+from models.event_models import ThreatLevel
+
+# Column encoding of threat levels
+THREAT_LEVELS = (ThreatLevel.CRITICAL, ThreatLevel.HIGH, ThreatLevel.MEDIUM, ThreatLevel.LOW)
+THREAT_LEVEL_CODES = {level: code for code, level in enumerate(THREAT_LEVELS)}
+
+
+T = TypeVar("T")
+
+
+def compile_indicators(indicators: Sequence[str]) -> Pattern:
+    """Compile indicator substrings into one pattern matching any of them"""
+    return re.compile("|".join(re.escape(indicator) for indicator in indicators))
+
+
+class IndicatorRules(Generic[T]):
+    """Ordered (outcome, indicators) rules; the first rule with an indicator in the text wins"""
+
+    def __init__(self, rules: Sequence[Tuple[T, Sequence[str]]]):
+        self.rules = [(outcome, compile_indicators(indicators)) for outcome, indicators in rules]
+
+    def first(self, text_lower: str, default: Optional[T] = None) -> Optional[T]:
+        """Outcome of the first rule matching already-lowercased text, or default"""
+        for outcome, pattern in self.rules:
+            if pattern.search(text_lower):
+                return outcome
+        return default
+
+
+class ClassificationColumns:
+    """Array-backed threat level, confidence, false positive and priority columns"""
+
+    def __init__(self):
+        self.threat_levels = array('b')
+        self.confidence = array('d')
+        self.false_positive = array('d')
+        self.priority = array('b')
+
+    def append(self, threat_level: ThreatLevel, confidence: float, false_positive: float) -> None:
+        self.threat_levels.append(THREAT_LEVEL_CODES[threat_level])
+        self.confidence.append(confidence)
+        self.false_positive.append(false_positive)
+
+    def threat_level(self, row: int) -> ThreatLevel:
+        return THREAT_LEVELS[self.threat_levels[row]]
+
+
+def expand_results(templates: List[Dict[str, Any]], rows: Sequence[int]) -> List[Dict[str, Any]]:
+    """One independent result per event from its signature's result"""
+    return [
+        dict(templates[row], recommended_actions=list(templates[row]["recommended_actions"]))
+        for row in rows
+    ]
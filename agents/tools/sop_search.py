@@ -7,13 +7,17 @@ Procedures when analyzing security events.
 """
 
 from crewai.tools import BaseTool
-from typing import Any, Optional, Type
+from datetime import datetime
+from typing import Any, List, Optional, Type
 from pydantic import BaseModel, Field
 import json
-import sqlite3
 import logging
 import os
 
+from sop.sop_snapshot import get_sop_snapshot
+from sop.storage import get_sop_storage
+from sop.normalization import parse_timeline, timeline_urgency_key
+
 logger = logging.getLogger(__name__)
 # Enable debug logging for this specific module
 logger.setLevel(logging.DEBUG)
@@ -38,9 +42,9 @@ class SOPContextualSearch(BaseTool):
     """
     Search SOP knowledge base for relevant procedures based on event context.
     
-    This tool uses semantic similarity to find SOPs that match the given
-    security event context, helping the triage agent understand what
-    organizational procedures should be followed.
+    This tool matches the given security event context against a shared,
+    pre-compiled snapshot of the SOP knowledge base, helping the triage agent
+    understand what organizational procedures should be followed.
     """
     
     name: str = "SOP Contextual Search"
@@ -58,19 +62,15 @@ class SOPContextualSearch(BaseTool):
             if not os.path.exists(self.db_path):
                 return False, f"Database file does not exist: {self.db_path}"
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = get_sop_storage(self.db_path).read()
             
             # Check if sops table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sops'")
+            cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sops'")
             if not cursor.fetchone():
-                conn.close()
                 return False, "SOPs table does not exist in database"
             
             # Check if there are any SOPs
-            cursor.execute("SELECT COUNT(*) FROM sops")
-            count = cursor.fetchone()[0]
-            conn.close()
+            count = conn.execute("SELECT COUNT(*) FROM sops").fetchone()[0]
             
             if count == 0:
                 return False, f"Database exists but contains no SOPs (count: {count})"
@@ -97,9 +97,18 @@ class SOPContextualSearch(BaseTool):
         try:
             logger.info(f"Searching SOPs for context: {event_context[:100]}...")
             
-            # Validate database first
-            db_valid, db_message = self.validate_database_connection()
-            if not db_valid:
+            # Use the shared pre-compiled snapshot instead of re-reading the table
+            snapshot = get_sop_snapshot(self.db_path)
+            if snapshot.error:
+                logger.error(f"Database validation failed: {snapshot.error}")
+                return json.dumps({
+                    "relevant_sops": [],
+                    "error": snapshot.error,
+                    "database_path": self.db_path
+                })
+            
+            if len(snapshot) == 0:
+                db_message = "Database exists but contains no SOPs (count: 0)"
                 logger.error(f"Database validation failed: {db_message}")
                 return json.dumps({
                     "relevant_sops": [],
@@ -107,106 +116,14 @@ class SOPContextualSearch(BaseTool):
                     "database_path": self.db_path
                 })
             
-            # Connect to SOP database
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Build search query
-            if category_filter:
-                query = """
-                SELECT data as sop_data, searchable_text as search_text 
-                FROM sops 
-                WHERE category = ? 
-                ORDER BY sop_id DESC
-                """
-                cursor.execute(query, (category_filter,))
-            else:
-                query = """
-                SELECT data as sop_data, searchable_text as search_text 
-                FROM sops 
-                ORDER BY sop_id DESC
-                """
-                cursor.execute(query)
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            if not rows:
+            if snapshot.count(category_filter) == 0:
                 logger.warning("No SOPs found in database")
                 return json.dumps({
                     "relevant_sops": [],
                     "message": "No SOPs found in knowledge base"
                 })
             
-            logger.info(f"Found {len(rows)} SOPs in database for processing")
-            
-            # Simple text-based matching (in production, use vector embeddings)
-            relevant_sops = []
-            event_keywords = event_context.lower().split()
-            logger.info(f"Searching for keywords: {event_keywords}")
-            
-            for row in rows:
-                try:
-                    sop_data = json.loads(row['sop_data'])
-                    search_text = row['search_text'].lower()
-                    
-                    logger.debug(f"Processing SOP: {sop_data.get('title', 'Unknown')} with triggers: {sop_data.get('triggers', [])}")
-                    
-                    # Calculate relevance score based on keyword matches
-                    score = 0
-                    matched_triggers = []
-                    
-                    # Check triggers with more flexible matching
-                    for trigger in sop_data.get('triggers', []):
-                        trigger_lower = trigger.lower()
-                        for keyword in event_keywords:
-                            if keyword in trigger_lower:
-                                score += 2
-                                if trigger not in matched_triggers:
-                                    matched_triggers.append(trigger)
-                                logger.debug(f"Keyword '{keyword}' matched trigger '{trigger}' - score: {score}")
-                    
-                    # Check title and category
-                    title_matches = sum(1 for keyword in event_keywords 
-                                       if keyword in sop_data.get('title', '').lower())
-                    score += title_matches
-                    
-                    # Check search text
-                    search_matches = sum(1 for keyword in event_keywords 
-                                        if keyword in search_text)
-                    score += search_matches * 0.5
-                    
-                    logger.debug(f"SOP '{sop_data.get('title')}': title_matches={title_matches}, search_matches={search_matches}, total_score={score}")
-                    
-                    # Lower threshold to be more inclusive
-                    if score > 0:
-                        similarity_score = min(score / len(event_keywords), 1.0)
-                        
-                        relevant_sop = {
-                            "sop_id": sop_data.get('sop_id'),
-                            "title": sop_data.get('title'),
-                            "category": sop_data.get('category'),
-                            "priority_override": sop_data.get('priority_override'),
-                            "response_requirements": sop_data.get('response_requirements'),
-                            "special_conditions": sop_data.get('special_conditions'),
-                            "regulatory_requirements": sop_data.get('regulatory_requirements', []),
-                            "similarity_score": similarity_score,
-                            "matched_triggers": matched_triggers,
-                            "triggers": sop_data.get('triggers', [])
-                        }
-                        relevant_sops.append(relevant_sop)
-                        logger.info(f"Added relevant SOP: {sop_data.get('title')} with score {similarity_score}")
-                    else:
-                        logger.debug(f"SOP '{sop_data.get('title')}' rejected with score {score}")
-                        
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parsing SOP data: {e}")
-                    continue
-            
-            # Sort by similarity score and limit results
-            relevant_sops.sort(key=lambda x: x['similarity_score'], reverse=True)
-            relevant_sops = relevant_sops[:max_results]
+            relevant_sops = snapshot.search(event_context, category_filter, max_results)
             
             result = {
                 "relevant_sops": relevant_sops,
@@ -217,12 +134,6 @@ class SOPContextualSearch(BaseTool):
             logger.info(f"Found {len(relevant_sops)} relevant SOPs")
             return json.dumps(result, indent=2)
             
-        except sqlite3.Error as e:
-            logger.error(f"Database error in SOP search: {e}")
-            return json.dumps({
-                "relevant_sops": [],
-                "error": f"Database error: {str(e)}"
-            })
         except Exception as e:
             logger.error(f"Error in SOP contextual search: {e}")
             return json.dumps({
@@ -231,6 +142,30 @@ class SOPContextualSearch(BaseTool):
             })
 
 
+def find_relevant_sops(event_context: str, category_filter: Optional[str] = None,
+                       max_results: int = 3, db_path: Optional[str] = None,
+                       location: Optional[List[str]] = None, when: Optional[datetime] = None) -> list:
+    """
+    Search the shared SOP snapshot directly, without the tool's JSON round trip.
+    
+    Args:
+        event_context: Description of the security event
+        category_filter: Optional category filter
+        max_results: Maximum number of SOPs to return
+        db_path: SOP database path (defaults to SOP_DATABASE_PATH)
+        location: Event location path; SOPs scoped to other locations are skipped
+        when: Event time; SOPs scoped to other hours are skipped
+        
+    Returns:
+        List of relevant SOP dictionaries, best match first
+    """
+    snapshot = get_sop_snapshot(db_path or SOPContextualSearch.model_fields['db_path'].default)
+    if snapshot.error:
+        logger.warning(f"SOP snapshot unavailable: {snapshot.error}")
+        return []
+    return snapshot.search(event_context, category_filter, max_results, location, when)
+
+
 def search_sops_for_event(event_context: str, category_filter: Optional[str] = None) -> dict:
     """
     Convenience function to search SOPs for a given event context.
@@ -282,6 +217,10 @@ def merge_response_requirements(relevant_sops: list) -> dict:
     """
     Merge response requirements from multiple relevant SOPs.
     
+    The most urgent timeline is the one with the most urgent class, then the
+    shortest deadline, using the urgency and timeline_seconds parsed when
+    each SOP was indexed.
+    
     Args:
         relevant_sops: List of relevant SOP objects
         
@@ -290,37 +229,33 @@ def merge_response_requirements(relevant_sops: list) -> dict:
     """
     merged_requirements = {
         "timeline": None,
+        "timeline_seconds": None,
+        "urgency": None,
         "notifications": set(),
         "required_actions": [],
         "escalation_required": False
     }
     
-    # Find the most urgent timeline
-    timeline_urgency = {
-        "IMMEDIATE": 5,
-        "URGENT (within 1 minute)": 4,
-        "URGENT (within 2 minutes)": 4,
-        "URGENT (within 5 minutes)": 3,
-        "15 minutes": 2,
-        "30 minutes": 1
-    }
-    
-    most_urgent_score = 0
-    
     for sop in relevant_sops:
         requirements = sop.get('response_requirements', {})
         
         # Handle timeline
         timeline = requirements.get('timeline')
         if timeline:
-            score = 0
-            for key, value in timeline_urgency.items():
-                if key.lower() in timeline.lower():
-                    score = value
-                    break
+            if 'timeline_seconds' in requirements:
+                seconds, urgency = requirements['timeline_seconds'], requirements.get('urgency')
+            else:
+                # SOPs indexed before timelines were parsed at ingest
+                seconds, urgency = parse_timeline(timeline)
             
-            if score > most_urgent_score:
-                most_urgent_score = score
+            most_urgent = merged_requirements['timeline_seconds']
+            if seconds is not None and (
+                most_urgent is None
+                or timeline_urgency_key(seconds, urgency) < timeline_urgency_key(most_urgent, merged_requirements['urgency'])
+            ):
+                merged_requirements.update(timeline=timeline, timeline_seconds=seconds, urgency=urgency)
+            elif merged_requirements['timeline'] is None:
+                # An unparseable timeline still beats none at all
                 merged_requirements['timeline'] = timeline
         
         # Collect notifications
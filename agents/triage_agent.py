@@ -1,12 +1,20 @@
-from crewai import Agent, Task, Crew, Process
+from crewai import Agent, Task
 from agents.tools.cv_analyzer import analyze_cv_threat, CVThreatAnalyzer
 from agents.tools.access_analyzer import analyze_access_control, AccessControlAnalyzer
 from agents.tools.sop_search import SOPContextualSearch, get_priority_override, merge_response_requirements
+from agents.sop_rule_engine import run_rule_based_sop_analysis
+from agents.crew_pool import get_pooled_crew
+from agents.analysis_executor import ExecutorSaturatedError
+from agents.triage_scheduler import PRIORITY_LEVELS, pre_score
 from models.event_models import TriageAnalysis, ThreatLevel
-from typing import Dict, Any, List
+from config.settings import settings
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional
 import os
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -175,32 +183,177 @@ def run_triage_analysis(event_data: Dict[str, Any], event_type: str) -> Dict[str
             "priority_score": 7
         }
 
-def batch_analyze_events(events: List[Dict[str, Any]], event_types: List[str]) -> List[Dict[str, Any]]:
-    """Analyze multiple events in batch."""
-    
-    results = []
-    
-    for event_data, event_type in zip(events, event_types):
+def bulk_triage_analysis(events: List[Dict[str, Any]], event_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    Rule-based triage of many events at once, e.g. re-triaging history for reports.
+
+    Events are grouped by type and classified with the analyzers' analyze_many.
+    Results are identical to run_triage_analysis on each event; if a group
+    fails (e.g. a malformed event), its events fall back to the per-event path.
+
+    Args:
+        events: Event payloads
+        event_types: Event type for each event
+
+    Returns:
+        One result per event, in input order
+    """
+    if len(events) != len(event_types):
+        raise ValueError("Number of events must match number of event types")
+
+    analyzers = {
+        "CV_Threat_Detection": CVThreatAnalyzer(),
+        "Access_Control_System": AccessControlAnalyzer()
+    }
+    groups: Dict[str, List[int]] = {}
+    for index, event_type in enumerate(event_types):
+        groups.setdefault(event_type, []).append(index)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+    for event_type, indices in groups.items():
+        analyzer = analyzers.get(event_type)
         try:
-            result = run_triage_analysis(event_data, event_type)
-            results.append(result)
+            if analyzer is None:
+                raise ValueError(f"Unknown event type: {event_type}")
+            group_results = analyzer.analyze_many([events[index] for index in indices])
         except Exception as e:
-            # Add error result
-            results.append({
-                "event_type": event_type,
-                "ai_threat_level": "MEDIUM",
-                "false_positive_probability": 0.5,
-                "confidence_score": 0.5,
-                "recommended_actions": [f"Manual review required - Error: {str(e)}"],
-                "escalation_required": True,
-                "response_timeline": "URGENT (within 5 minutes)",
-                "analysis_reasoning": f"Batch analysis failed: {str(e)}",
-                "event_summary": "Security event - batch analysis error",
-                "priority_score": 7
-            })
-    
+            logger.warning(f"Bulk triage failed for {event_type}, analyzing events individually: {e}")
+            group_results = [run_triage_analysis(events[index], event_type) for index in indices]
+
+        for index, result in zip(indices, group_results):
+            results[index] = result
+
     return results
 
+def batch_analyze_events(events: List[Dict[str, Any]], event_types: List[str], use_sop: bool = False,
+                         timeout: Optional[float] = None, max_workers: Optional[int] = None,
+                         executor: Optional[Any] = None) -> List[Dict[str, Any]]:
+    """
+    Analyze multiple events concurrently.
+
+    Events run on a bounded thread pool, so a batch takes about as long as
+    its slowest event. Results are returned in input order.
+
+    Args:
+        events: Event payloads
+        event_types: Event type for each event
+        use_sop: Run the SOP-enhanced analysis instead of the standard triage
+        timeout: Per-event timeout in seconds (defaults to settings.analysis_timeout)
+        max_workers: Concurrency for this batch (defaults to settings.batch_max_workers);
+            with an executor, also capped at the executor's worker count
+        executor: AnalysisExecutor to submit each event to at its own pre-score
+            priority, instead of a pool private to this batch. Events are
+            submitted most urgent first and only max_workers at a time, so a
+            batch neither fills the shared queue nor preempts its own events.
+
+    Raises:
+        ExecutorSaturatedError: The executor's queue has no room for any of the
+            batch's events (events already queued are cancelled)
+
+    Returns:
+        One result per event, in input order. Failed or timed out events get
+        an error result in the same format.
+    """
+    if len(events) != len(event_types):
+        raise ValueError("Number of events must match number of event types")
+    if len(events) > settings.max_batch_size:
+        raise ValueError(f"Batch size {len(events)} exceeds maximum of {settings.max_batch_size}")
+    if not events:
+        return []
+
+    timeout = settings.analysis_timeout if timeout is None else timeout
+    max_workers = min(max_workers or settings.batch_max_workers, len(events))
+
+    if use_sop:
+        from agents.analysis_cache import run_cached_sop_enhanced_analysis
+        analyze = run_cached_sop_enhanced_analysis
+        error_result = _sop_analysis_error_response
+    else:
+        analyze = run_triage_analysis
+        error_result = _batch_error_response
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+    started_at: Dict[int, float] = {}
+
+    def run_event(index: int) -> Dict[str, Any]:
+        started_at[index] = time.monotonic()
+        return analyze(events[index], event_types[index])
+
+    if executor is None:
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-analysis")
+        unsubmitted = deque(range(len(events)))
+        in_flight = len(events)
+    else:
+        pool = None
+        priorities = [pre_score(event, event_type) for event, event_type in zip(events, event_types)]
+        # Most urgent first: an event only preempts lower levels, so never one of this batch queued before it
+        unsubmitted = deque(sorted(range(len(events)), key=lambda index: PRIORITY_LEVELS.index(priorities[index])))
+        in_flight = max(1, min(max_workers, executor.workers))
+
+    def submit(index: int) -> Future:
+        if pool is not None:
+            return pool.submit(run_event, index)
+        return executor.submit_prioritized(priorities[index], run_event, index)
+
+    pending: Dict[Future, int] = {}
+    try:
+        while unsubmitted or pending:
+            while unsubmitted and len(pending) < in_flight:
+                try:
+                    future = submit(unsubmitted[0])
+                except ExecutorSaturatedError:
+                    # The shared queue is full: wait for this batch's own events to make room
+                    if not pending:
+                        raise
+                    break
+                pending[future] = unsubmitted.popleft()
+
+            # Wake up when something finishes or the oldest running event hits its timeout
+            now = time.monotonic()
+            running = [started_at[index] for index in pending.values() if index in started_at]
+            wait_for = max(0.0, min(running) + timeout - now) if running else timeout
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Batch analysis failed for event {index} ({event_types[index]}): {e}")
+                    results[index] = error_result(event_types[index], e)
+
+            now = time.monotonic()
+            for future, index in list(pending.items()):
+                if index in started_at and now - started_at[index] >= timeout:
+                    # The worker cannot be interrupted; stop waiting for it
+                    del pending[future]
+                    logger.warning(f"Batch analysis timed out for event {index} ({event_types[index]}) after {timeout}s")
+                    results[index] = error_result(
+                        event_types[index], TimeoutError(f"Analysis timed out after {timeout} seconds")
+                    )
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+def _batch_error_response(event_type: str, error: Exception) -> Dict[str, Any]:
+    """Error result in the standard triage format for a failed batch event."""
+    return {
+        "event_type": event_type,
+        "ai_threat_level": "MEDIUM",
+        "false_positive_probability": 0.5,
+        "confidence_score": 0.5,
+        "recommended_actions": [f"Manual review required - Error: {str(error)}"],
+        "escalation_required": True,
+        "response_timeline": "URGENT (within 5 minutes)",
+        "analysis_reasoning": f"Batch analysis failed: {str(error)}",
+        "event_summary": "Security event - batch analysis error",
+        "priority_score": 7
+    }
+
 def create_sop_aware_triage_task(event_data: Dict[str, Any], event_type: str):
     """Create a task for SOP-enhanced analysis of a security event."""
     
@@ -266,27 +419,62 @@ def create_sop_aware_triage_task(event_data: Dict[str, Any], event_type: str):
         agent=None  # Will be set when creating the crew
     )
 
-def run_sop_enhanced_analysis(event_data: Dict[str, Any], event_type: str) -> Dict[str, Any]:
-    """Run the SOP-enhanced triage analysis on a security event."""
+def run_sop_enhanced_analysis(event_data: Dict[str, Any], event_type: str, allow_crew: bool = True) -> Dict[str, Any]:
+    """
+    Run the SOP-enhanced triage analysis on a security event.
+
+    The deterministic rule engine runs first; the CrewAI crew is only used
+    when the rule-based result is not decisive (low analyzer confidence or
+    no decisively matching SOP), and the rule-based result is still returned
+    if the crew then fails.
+
+    Args:
+        event_data: Event payload
+        event_type: "CV_Threat_Detection" or "Access_Control_System"
+        allow_crew: Escalate non-decisive events to the crew. When False the
+            rule-based result is always returned.
+
+    Returns:
+        SOP-enhanced analysis result
+    """
+    try:
+        result, decisive = run_rule_based_sop_analysis(event_data, event_type)
+    except Exception as e:
+        logger.warning(f"Rule-based SOP analysis failed for {event_type}: {e}")
+        if not allow_crew:
+            return _sop_analysis_error_response(event_type, e)
+        result, decisive = None, False
+
+    if decisive or not allow_crew:
+        logger.info(f"Rule-based SOP analysis resolved {event_type} event (decisive: {decisive})")
+        return result
+
+    return run_crew_sop_analysis(event_data, event_type, fallback_result=result)
+
+def run_crew_sop_analysis(event_data: Dict[str, Any], event_type: str,
+                          fallback_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run the SOP-enhanced triage analysis on a security event with the CrewAI crew.
+
+    Args:
+        event_data: Event payload
+        event_type: "CV_Threat_Detection" or "Access_Control_System"
+        fallback_result: Rule-based result returned (with crew_error set) if
+            the crew fails or its output cannot be parsed
+
+    Returns:
+        SOP-enhanced analysis result
+    """
     
     try:
         logger.info(f"Running SOP-enhanced analysis for {event_type}")
         
-        # Create the enhanced agent and task
-        enhanced_agent = create_sop_enhanced_triage_agent()
+        # Reuse this worker's enhanced agent and crew; only the task is per request
+        pooled_crew = get_pooled_crew("sop_enhanced", create_sop_enhanced_triage_agent, settings.crewai_verbose)
         analysis_task = create_sop_aware_triage_task(event_data, event_type)
-        analysis_task.agent = enhanced_agent
-        
-        # Create and run the crew
-        crew = Crew(
-            agents=[enhanced_agent],
-            tasks=[analysis_task],
-            verbose=True,
-            process=Process.sequential
-        )
         
         # Execute the analysis
-        result = crew.kickoff()
+        result = pooled_crew.kickoff(analysis_task)
         
         # Try to parse the result as JSON, fallback to structured format
         try:
@@ -311,6 +499,9 @@ def run_sop_enhanced_analysis(event_data: Dict[str, Any], event_type: str) -> Di
                 else:
                     raise json.JSONDecodeError("No JSON found", result_str, 0)
         except (json.JSONDecodeError, AttributeError, TypeError):
+            if fallback_result is not None:
+                logger.warning(f"Unparseable SOP-enhanced crew output for {event_type}, using rule-based result")
+                return {**fallback_result, "crew_error": "Crew output could not be parsed"}
             # If JSON parsing fails, create a structured response
             parsed_result = {
                 "event_type": event_type,
@@ -331,18 +522,24 @@ def run_sop_enhanced_analysis(event_data: Dict[str, Any], event_type: str) -> Di
         
     except Exception as e:
         logger.error(f"Error in SOP-enhanced analysis for {event_type}: {e}")
-        # Return error response in expected format
-        return {
-            "event_type": event_type,
-            "final_threat_level": "MEDIUM",
-            "final_priority_score": 7,
-            "confidence_score": 0.5,
-            "false_positive_probability": 0.5,
-            "merged_response_actions": [f"Manual review required - SOP-enhanced analysis error: {str(e)}"],
-            "escalation_required": True,
-            "response_timeline": "URGENT (within 5 minutes)",
-            "sop_influence_reasoning": f"SOP-enhanced analysis failed: {str(e)}",
-            "event_summary": f"Security event - SOP-enhanced analysis error for {event_type}",
-            "regulatory_requirements": [],
-            "applicable_sops": []
-        }
\ No newline at end of file
+        if fallback_result is not None:
+            return {**fallback_result, "crew_error": str(e)}
+        return _sop_analysis_error_response(event_type, e)
+
+def _sop_analysis_error_response(event_type: str, error: Exception) -> Dict[str, Any]:
+    """Error response in the SOP-enhanced analysis format."""
+    return {
+        "event_type": event_type,
+        "final_threat_level": "MEDIUM",
+        "final_priority_score": 7,
+        "confidence_score": 0.5,
+        "false_positive_probability": 0.5,
+        "merged_response_actions": [f"Manual review required - SOP-enhanced analysis error: {str(error)}"],
+        "escalation_required": True,
+        "response_timeline": "URGENT (within 5 minutes)",
+        "sop_influence_reasoning": f"SOP-enhanced analysis failed: {str(error)}",
+        "event_summary": f"Security event - SOP-enhanced analysis error for {event_type}",
+        "regulatory_requirements": [],
+        "applicable_sops": [],
+        "sop_analysis_failed": True
+    }
@@ -0,0 +1,224 @@
+"""
+Priority-aware work queue for triage analysis.
+
+Work is queued per threat level, using a cheap pre-score from the rule-based
+analyzers' threat assessment. CRITICAL work is always dispatched first;
+HIGH, MEDIUM and LOW share the workers by smooth weighted round robin so
+lower levels are slowed down under load but never starved. When the queue is
+full, incoming work preempts the most recently queued item of a lower level
+instead of being rejected, so a burst of routine events cannot keep a
+critical one out.
+"""
+
+import bisect
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    from agents.tools.cv_analyzer import CVThreatAnalyzer
+    from agents.tools.access_analyzer import AccessControlAnalyzer
+    _cv_analyzer = CVThreatAnalyzer()
+    _access_analyzer = AccessControlAnalyzer()
+except ImportError:
+    # Analyzers need CrewAI; without it (SOP-only mode) everything runs at the default priority
+    _cv_analyzer = _access_analyzer = None
+
+# Dispatch order, most urgent first
+PRIORITY_LEVELS = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+
+# Work without an event (or of an unknown type) is scheduled at this level
+DEFAULT_PRIORITY = "MEDIUM"
+
+# Relative dispatch share of the non-critical levels
+DEFAULT_WEIGHTS = {
+    "HIGH": 4,
+    "MEDIUM": 2,
+    "LOW": 1
+}
+
+# Upper bounds (seconds) of the queue wait-time histogram buckets
+WAIT_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0]
+
+
+def pre_score(event_data: Dict[str, Any], event_type: str) -> str:
+    """
+    Cheap scheduling priority for an event.
+
+    Uses only the analyzers' threat level assessment, without building
+    recommendations or reasoning. SEV0 CV events are always CRITICAL.
+    """
+    if _cv_analyzer is None:
+        return DEFAULT_PRIORITY
+
+    if event_type == "CV_Threat_Detection":
+        threat_name = event_data.get('detection_name', 'Unknown Threat') or ''
+        severity = event_data.get('severity', 'UNKNOWN')
+        if severity == 'SEV0':
+            return "CRITICAL"
+        location = f"{event_data.get('site_name', 'Unknown Site')} > {event_data.get('camera_name', 'Unknown Camera')}"
+        threat_level, _, _ = _cv_analyzer._assess_threat_level(
+            threat_name, _cv_analyzer._derive_threat_icon(threat_name), severity, location
+        )
+        return threat_level.value
+    elif event_type == "Access_Control_System":
+        alarm_name = event_data.get('alarm_name', 'Unknown Alarm') or ''
+        device_id = event_data.get('device_id', 'Unknown Device') or ''
+        threat_level, _, _ = _access_analyzer._assess_access_threat_level(
+            alarm_name, _access_analyzer._derive_source_from_device(device_id), device_id
+        )
+        return threat_level.value
+    return DEFAULT_PRIORITY
+
+
+def highest_priority(levels: List[str]) -> str:
+    """Most urgent of several levels"""
+    return min(levels, key=PRIORITY_LEVELS.index, default=DEFAULT_PRIORITY)
+
+
+class WaitHistogram:
+    """Cumulative histogram of queue wait times"""
+
+    def __init__(self, buckets: List[float] = WAIT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "mean_seconds": round(self.total / self.count, 6) if self.count else 0.0
+        }
+
+
+class TriageQueue:
+    """
+    Bounded, thread-safe multi-level queue.
+
+    Items must allow setting an `enqueued_at` attribute, which is used for the
+    wait-time histograms.
+    """
+
+    def __init__(self, capacity: int, weights: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[Any]] = {level: deque() for level in PRIORITY_LEVELS}
+        self._credits = {level: 0 for level in self.weights}
+        self._size = 0
+        self._closed = False
+        self._waits = {level: WaitHistogram() for level in PRIORITY_LEVELS}
+        self._admitted = {level: 0 for level in PRIORITY_LEVELS}
+        self._preempted = {level: 0 for level in PRIORITY_LEVELS}
+        self._rejected = {level: 0 for level in PRIORITY_LEVELS}
+
+    def qsize(self) -> int:
+        return self._size
+
+    def put(self, item: Any, level: str) -> Optional[Any]:
+        """
+        Queue an item at a priority level.
+
+        Returns:
+            The lower-priority item preempted to make room, or None
+
+        Raises:
+            queue.Full: The queue is full of work at the same or higher level
+        """
+        if level not in self._queues:
+            raise ValueError(f"Unknown priority level: {level}")
+
+        with self._cond:
+            victim = None
+            if self._size >= self.capacity:
+                victim = self._preempt_below(level)
+                if victim is None:
+                    self._rejected[level] += 1
+                    raise queue.Full
+
+            item.enqueued_at = time.monotonic()
+            self._queues[level].append(item)
+            self._size += 1
+            self._admitted[level] += 1
+            self._cond.notify()
+            return victim
+
+    def get(self) -> Optional[Any]:
+        """Block until an item is available; returns None once the queue is closed"""
+        with self._cond:
+            while not self._size and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+
+            level = self._next_level()
+            item = self._queues[level].popleft()
+            self._size -= 1
+            self._waits[level].observe(time.monotonic() - item.enqueued_at)
+            return item
+
+    def close(self) -> List[Any]:
+        """Wake all getters and return the items that were still queued"""
+        with self._cond:
+            self._closed = True
+            items = []
+            for level in PRIORITY_LEVELS:
+                items.extend(self._queues[level])
+                self._queues[level].clear()
+            self._size = 0
+            self._cond.notify_all()
+            return items
+
+    def reopen(self) -> None:
+        with self._cond:
+            self._closed = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-level depth, admission counters and wait-time histograms"""
+        with self._cond:
+            return {
+                level: {
+                    "depth": len(self._queues[level]),
+                    "admitted": self._admitted[level],
+                    "preempted": self._preempted[level],
+                    "rejected": self._rejected[level],
+                    "wait_seconds": self._waits[level].to_dict()
+                }
+                for level in PRIORITY_LEVELS
+            }
+
+    def _preempt_below(self, level: str) -> Optional[Any]:
+        # Newest item of the least urgent level below the incoming one
+        for lower in reversed(PRIORITY_LEVELS[PRIORITY_LEVELS.index(level) + 1:]):
+            if self._queues[lower]:
+                self._size -= 1
+                self._preempted[lower] += 1
+                return self._queues[lower].pop()
+        return None
+
+    def _next_level(self) -> str:
+        if self._queues["CRITICAL"]:
+            return "CRITICAL"
+
+        # Smooth weighted round robin over the non-empty levels
+        ready = [level for level in self.weights if self._queues[level]]
+        total = sum(self.weights[level] for level in ready)
+        for level in ready:
+            self._credits[level] += self.weights[level]
+        chosen = max(ready, key=lambda level: self._credits[level])
+        self._credits[chosen] -= total
+        return chosen
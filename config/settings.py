@@ -1,6 +1,11 @@
 import os
 from typing import Optional
-from pydantic import BaseSettings, Field
+from pydantic import Field
+
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -35,6 +40,41 @@ class Settings(BaseSettings):
     # Analysis Configuration
     max_batch_size: int = Field(default=100, env="MAX_BATCH_SIZE")
     analysis_timeout: int = Field(default=30, env="ANALYSIS_TIMEOUT")  # seconds
+    batch_max_workers: int = Field(default=16, env="BATCH_MAX_WORKERS")
+    
+    # Analysis Execution Pool
+    analysis_workers: int = Field(default=8, env="ANALYSIS_WORKERS")
+    analysis_queue_size: int = Field(default=64, env="ANALYSIS_QUEUE_SIZE")
+    stream_queue_size: int = Field(default=256, env="STREAM_QUEUE_SIZE")
+    stream_max_record_bytes: int = Field(default=1048576, env="STREAM_MAX_RECORD_BYTES")
+    
+    # SOP-enhanced Analysis Cache
+    sop_cache_max_entries: int = Field(default=1024, env="SOP_CACHE_MAX_ENTRIES")
+    sop_cache_ttl: int = Field(default=3600, env="SOP_CACHE_TTL")  # seconds
+    
+    # SOP Database Tuning
+    sop_db_mmap_size: int = Field(default=268435456, env="SOP_DB_MMAP_SIZE")  # bytes
+    sop_db_cache_size: int = Field(default=65536, env="SOP_DB_CACHE_SIZE")  # KiB per connection
+    sop_db_busy_timeout: int = Field(default=5000, env="SOP_DB_BUSY_TIMEOUT")  # milliseconds
+    sop_db_cached_statements: int = Field(default=256, env="SOP_DB_CACHED_STATEMENTS")
+    sop_bulk_chunk_size: int = Field(default=500, env="SOP_BULK_CHUNK_SIZE")
+    sop_bulk_max_items: int = Field(default=5000, env="SOP_BULK_MAX_ITEMS")
+    sop_text_compression: str = Field(default="auto", env="SOP_TEXT_COMPRESSION")  # auto, zstd, zlib or none
+    sop_text_compression_level: int = Field(default=6, env="SOP_TEXT_COMPRESSION_LEVEL")
+    sop_text_dict_min_samples: int = Field(default=16, env="SOP_TEXT_DICT_MIN_SAMPLES")
+    sop_embedder: str = Field(default="hashing", env="SOP_EMBEDDER")  # hashing[:dim], sentence-transformers[:model] or none
+    sop_business_hours: str = Field(default="mon-fri 08:00-18:00", env="SOP_BUSINESS_HOURS")
+    sop_timezone: str = Field(default="UTC", env="SOP_TIMEZONE")  # time zone of SOP time windows
+    sop_job_ttl: int = Field(default=86400, env="SOP_JOB_TTL")  # seconds finished jobs are kept
+    sop_job_stale_after: int = Field(default=3600, env="SOP_JOB_STALE_AFTER")  # seconds without progress before a job is failed
+    sop_job_events_poll_interval: float = Field(default=1.0, env="SOP_JOB_EVENTS_POLL_INTERVAL")  # seconds
+    sop_ingestion_workers: int = Field(default=2, env="SOP_INGESTION_WORKERS")  # concurrent uploads being processed
+    sop_ingestion_queue_size: int = Field(default=16, env="SOP_INGESTION_QUEUE_SIZE")
+    sop_parse_workers: int = Field(default=2, env="SOP_PARSE_WORKERS")  # document parsing processes, 0 to parse in the ingestion worker
+    sop_extraction_cache_max_entries: int = Field(default=5000, env="SOP_EXTRACTION_CACHE_MAX_ENTRIES")  # 0 disables
+    sop_extraction_cache_ttl: int = Field(default=2592000, env="SOP_EXTRACTION_CACHE_TTL")  # seconds
+    sop_section_extraction_min_chars: int = Field(default=8000, env="SOP_SECTION_EXTRACTION_MIN_CHARS")  # 0 disables
+    sop_section_extraction_workers: int = Field(default=4, env="SOP_SECTION_EXTRACTION_WORKERS")
     
     # Threat Assessment Thresholds
     critical_confidence_threshold: float = Field(default=0.9, env="CRITICAL_CONFIDENCE_THRESHOLD")
@@ -82,6 +122,7 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = False
+        extra = "ignore"
     
     @property
     def high_risk_location_list(self) -> list:
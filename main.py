@@ -2,12 +2,18 @@ from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sop.router import router as sop_router
+from sop.ingestion_executor import sop_ingestion_executor
+from config.settings import settings
+from agents.analysis_executor import analysis_executor, run_batch_analysis, run_event_analysis
 
 # Mock imports for testing without CrewAI
 try:
     from agents.triage_agent import run_triage_analysis, batch_analyze_events, run_sop_enhanced_analysis
+    from agents.analysis_cache import run_cached_sop_enhanced_analysis, sop_analysis_cache
+    from agents.sop_rule_engine import sop_decision_stats
     from models.event_models import CVThreatEvent, AccessControlEvent, TriageAnalysis
     from simulation.simulator import router as simulation_router, initialize_data_loader
+    from streaming.router import router as streaming_router
     FULL_FEATURES = True
 except ImportError:
     # Mock classes and functions for testing SOP system
@@ -38,10 +44,11 @@ except ImportError:
             "response_timeline": "15 minutes"
         }
     
-    def batch_analyze_events(events):
-        return [run_triage_analysis(event['data'], event['type']) for event in events]
+    def batch_analyze_events(events, event_types, use_sop=False, timeout=None, max_workers=None, executor=None):
+        analyze = run_sop_enhanced_analysis if use_sop else run_triage_analysis
+        return [analyze(event_data, event_type) for event_data, event_type in zip(events, event_types)]
     
-    def run_sop_enhanced_analysis(event_data, event_type):
+    def run_sop_enhanced_analysis(event_data, event_type, allow_crew=True):
         return {
             "event_type": event_type,
             "final_threat_level": "MEDIUM",
@@ -56,7 +63,11 @@ except ImportError:
             "applicable_sops": []
         }
     
+    run_cached_sop_enhanced_analysis = run_sop_enhanced_analysis
+    sop_analysis_cache = None
+    sop_decision_stats = None
     simulation_router = None
+    streaming_router = None
     initialize_data_loader = lambda *args: None
     FULL_FEATURES = False
 from typing import List, Dict, Any
@@ -98,6 +109,8 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Include routers
 if FULL_FEATURES and simulation_router:
     app.include_router(simulation_router)
+if FULL_FEATURES and streaming_router:
+    app.include_router(streaming_router)
 app.include_router(sop_router)
 
 # Initialize data loader on startup
@@ -105,6 +118,8 @@ app.include_router(sop_router)
 async def startup_event():
     try:
         logger.info("Starting application startup...")
+        analysis_executor.start()
+        sop_ingestion_executor.start()
         if FULL_FEATURES:
             cv_csv_path = "/Users/celinebroomhead/Downloads/MockData_ComputerVision - Sheet2.csv"
             access_csv_path = "/Users/celinebroomhead/Downloads/MockData_AccessControl - Sheet4.csv"
@@ -142,6 +157,11 @@ async def startup_event():
         logger.error(f"Startup error: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    analysis_executor.stop(wait=False)
+    sop_ingestion_executor.stop(wait=False)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -163,12 +183,14 @@ async def analyze_cv_threat_with_sop(event: CVThreatEvent):
         event_dict = event.dict()
         
         # Run SOP-enhanced triage analysis
-        result = run_sop_enhanced_analysis(event_dict, "CV_Threat_Detection")
+        result = await run_event_analysis(run_cached_sop_enhanced_analysis, event_dict, "CV_Threat_Detection")
         
         logger.info(f"SOP-enhanced CV analysis completed for {event.record_id}: {result.get('final_threat_level', 'UNKNOWN')}")
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in SOP-enhanced CV threat analysis for {event.record_id}: {str(e)}")
         raise HTTPException(
@@ -187,12 +209,14 @@ async def analyze_access_control_with_sop(event: AccessControlEvent):
         event_dict = event.dict()
         
         # Run SOP-enhanced triage analysis
-        result = run_sop_enhanced_analysis(event_dict, "Access_Control_System")
+        result = await run_event_analysis(run_cached_sop_enhanced_analysis, event_dict, "Access_Control_System")
         
         logger.info(f"SOP-enhanced access control analysis completed for {event.alarm_id}: {result.get('final_threat_level', 'UNKNOWN')}")
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in SOP-enhanced access control analysis for {event.alarm_id}: {str(e)}")
         raise HTTPException(
@@ -218,7 +242,7 @@ async def analyze_event_with_sop(
         logger.info(f"Analyzing {event_type} event with SOP consultation")
         
         # Run SOP-enhanced analysis
-        result = run_sop_enhanced_analysis(event_data, event_type)
+        result = await run_event_analysis(run_cached_sop_enhanced_analysis, event_data, event_type)
         
         logger.info(f"SOP-enhanced analysis completed: {result.get('final_threat_level', 'UNKNOWN')}")
         
@@ -244,12 +268,14 @@ async def analyze_cv_threat(event: CVThreatEvent):
         event_dict = event.dict()
         
         # Run triage analysis
-        result = run_triage_analysis(event_dict, "CV_Threat_Detection")
+        result = await run_event_analysis(run_triage_analysis, event_dict, "CV_Threat_Detection")
         
         logger.info(f"CV analysis completed for {event.record_id}: {result.get('ai_threat_level', 'UNKNOWN')}")
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing CV threat event {event.record_id}: {str(e)}")
         raise HTTPException(
@@ -268,12 +294,14 @@ async def analyze_access_control(event: AccessControlEvent):
         event_dict = event.dict()
         
         # Run triage analysis
-        result = run_triage_analysis(event_dict, "Access_Control_System")
+        result = await run_event_analysis(run_triage_analysis, event_dict, "Access_Control_System")
         
         logger.info(f"Access control analysis completed for {event.alarm_id}: {result.get('ai_threat_level', 'UNKNOWN')}")
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing access control event {event.alarm_id}: {str(e)}")
         raise HTTPException(
@@ -286,9 +314,10 @@ async def analyze_access_control(event: AccessControlEvent):
 async def analyze_batch(
     events: List[Dict[str, Any]], 
     event_types: List[str],
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    use_sop: bool = False
 ):
-    """Analyze multiple events in batch."""
+    """Analyze multiple events in batch, concurrently and in input order."""
     try:
         if len(events) != len(event_types):
             raise HTTPException(
@@ -296,6 +325,12 @@ async def analyze_batch(
                 detail="Number of events must match number of event types"
             )
         
+        if len(events) > settings.max_batch_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch size {len(events)} exceeds maximum of {settings.max_batch_size}"
+            )
+        
         logger.info(f"Starting batch analysis of {len(events)} events")
         
         # Validate event types
@@ -307,13 +342,14 @@ async def analyze_batch(
                     detail=f"Invalid event type: {event_type}. Must be one of: {valid_types}"
                 )
         
-        # Run batch analysis
-        results = batch_analyze_events(events, event_types)
+        # Each event runs on the analysis executor at its own pre-score priority
+        results = await run_batch_analysis(batch_analyze_events, events, event_types, use_sop=use_sop)
         
         logger.info(f"Batch analysis completed for {len(events)} events")
         
         return {
             "total_events": len(events),
+            "use_sop": use_sop,
             "results": results,
             "timestamp": datetime.now().isoformat()
         }
@@ -345,7 +381,7 @@ async def analyze_event(
         logger.info(f"Analyzing {event_type} event")
         
         # Run analysis
-        result = run_triage_analysis(event_data, event_type)
+        result = await run_event_analysis(run_triage_analysis, event_data, event_type)
         
         logger.info(f"Analysis completed: {result.get('ai_threat_level', 'UNKNOWN')}")
         
@@ -381,7 +417,11 @@ async def get_statistics():
                 "HIGH", 
                 "MEDIUM",
                 "LOW"
-            ]
+            ],
+            "sop_analysis_cache": sop_analysis_cache.stats() if sop_analysis_cache else None,
+            "sop_decision_table": sop_decision_stats() if sop_decision_stats else None,
+            "analysis_executor": analysis_executor.stats(),
+            "sop_ingestion_executor": sop_ingestion_executor.stats()
         }
         logger.info("Stats generated successfully")
         return stats
@@ -396,7 +436,8 @@ async def get_config():
     return {
         "environment": os.getenv("ENVIRONMENT", "development"),
         "log_level": os.getenv("LOG_LEVEL", "INFO"),
-        "max_batch_size": 100,
+        "max_batch_size": settings.max_batch_size,
+        "analysis_timeout": settings.analysis_timeout,
         "supported_models": ["CrewAI with OpenAI GPT"],
         "memory_enabled": True
     }
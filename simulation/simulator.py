@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from simulation.data_loader import DataLoader
-from agents.triage_agent import run_triage_analysis, run_sop_enhanced_analysis
+from agents.triage_agent import run_triage_analysis
+from agents.analysis_cache import run_cached_sop_enhanced_analysis
+from agents.analysis_executor import run_analysis, run_event_analysis
 from models.event_models import CVThreatEvent, AccessControlEvent
 from typing import Dict, Any, List
 import json
@@ -12,6 +14,24 @@ logger = logging.getLogger(__name__)
 # Initialize router
 router = APIRouter(prefix="/simulate", tags=["simulation"])
 
+# Activity category and icon per detection / alarm name
+# (the SOP decision table precomputes these names, see KNOWN_EVENT_SIGNATURES)
+EVENT_TYPE_MAPPING = {
+    # CV Events
+    "Person Brandishing Firearm": {"category": "health & safety", "icon": "🏥"},
+    "Smoke or Fire": {"category": "health & safety", "icon": "🏥"},
+    "Person Falling Down": {"category": "health & safety", "icon": "🏥"},
+    "Person Jumping Fence": {"category": "perimeter intrusion", "icon": "👣"},
+    "Tailgating": {"category": "perimeter intrusion", "icon": "👣"},
+    "Door Propped Open": {"category": "policy-violation", "icon": "⚠️"},
+
+    # Access Control Events
+    "Door Forced Open": {"category": "perimeter intrusion", "icon": "👣"},
+    "Invalid Badge Read": {"category": "perimeter intrusion", "icon": "👣"},
+    "Door Held Open": {"category": "perimeter intrusion", "icon": "👣"},
+    "Granted Access": {"category": "access-control", "icon": "🚪"}
+}
+
 # Global data loader instance
 data_loader: DataLoader = None
 
@@ -36,7 +56,7 @@ async def simulate_cv_event():
         event_data = cv_event.dict()
         
         # Run analysis
-        analysis_result = run_triage_analysis(event_data, "CV_Threat_Detection")
+        analysis_result = await run_event_analysis(run_triage_analysis, event_data, "CV_Threat_Detection")
         
         return {
             "status": "success",
@@ -46,6 +66,8 @@ async def simulate_cv_event():
             "timestamp": cv_event.creation_time
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -65,7 +87,7 @@ async def simulate_access_event():
         event_data = access_event.dict()
         
         # Run analysis
-        analysis_result = run_triage_analysis(event_data, "Access_Control_System")
+        analysis_result = await run_event_analysis(run_triage_analysis, event_data, "Access_Control_System")
         
         return {
             "status": "success",
@@ -75,6 +97,8 @@ async def simulate_access_event():
             "timestamp": access_event.timestamp
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -106,7 +130,7 @@ async def simulate_batch_events(cv_count: int = 2, access_count: int = 2):
             cv_event = data_loader.get_random_cv_event()
             if cv_event:
                 event_data = cv_event.dict()
-                analysis_result = run_triage_analysis(event_data, "CV_Threat_Detection")
+                analysis_result = await run_event_analysis(run_triage_analysis, event_data, "CV_Threat_Detection")
                 results.append({
                     "event_type": "CV_Threat_Detection",
                     "original_event": event_data,
@@ -119,7 +143,7 @@ async def simulate_batch_events(cv_count: int = 2, access_count: int = 2):
             access_event = data_loader.get_random_access_event()
             if access_event:
                 event_data = access_event.dict()
-                analysis_result = run_triage_analysis(event_data, "Access_Control_System")
+                analysis_result = await run_event_analysis(run_triage_analysis, event_data, "Access_Control_System")
                 results.append({
                     "event_type": "Access_Control_System",
                     "original_event": event_data,
@@ -135,6 +159,8 @@ async def simulate_batch_events(cv_count: int = 2, access_count: int = 2):
             "results": results
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
 
@@ -147,22 +173,11 @@ async def simulate_activities(count: int = 5, activity_type: str = None, fast_mo
     if count > 20:
         raise HTTPException(status_code=400, detail="Maximum 20 activities per request")
     
-    # Event type mapping
-    EVENT_TYPE_MAPPING = {
-        # CV Events
-        "Person Brandishing Firearm": {"category": "health & safety", "icon": "🏥"},
-        "Smoke or Fire": {"category": "health & safety", "icon": "🏥"},
-        "Person Falling Down": {"category": "health & safety", "icon": "🏥"},
-        "Person Jumping Fence": {"category": "perimeter intrusion", "icon": "👣"},
-        "Tailgating": {"category": "perimeter intrusion", "icon": "👣"},
-        "Door Propped Open": {"category": "policy-violation", "icon": "⚠️"},
-        
-        # Access Control Events
-        "Door Forced Open": {"category": "perimeter intrusion", "icon": "👣"},
-        "Invalid Badge Read": {"category": "perimeter intrusion", "icon": "👣"},
-        "Door Held Open": {"category": "perimeter intrusion", "icon": "👣"},
-        "Granted Access": {"category": "access-control", "icon": "🚪"}
-    }
+    # Analysis runs on the analysis executor, off the event loop
+    return await run_analysis(_generate_activities, count, activity_type, fast_mode)
+
+def _generate_activities(count: int, activity_type: str, fast_mode: bool) -> Dict[str, Any]:
+    """Generate and analyze simulated activities."""
     
     activities = []
     
@@ -179,78 +194,28 @@ async def simulate_activities(count: int = 5, activity_type: str = None, fast_mo
                     # Run both standard and SOP-enhanced analysis
                     analysis_result = run_triage_analysis(event_data, "CV_Threat_Detection")
                     
-                    # Run SOP-enhanced analysis with caching
-                    if fast_mode:
-                        # Fast mode: use predefined SOP overrides
-                        detection_name = event_data.get('detection_name', '').lower()
-                        if 'fall' in detection_name or 'person down' in detection_name:
-                            sop_analysis_result = {
-                                "event_type": "CV_Threat_Detection",
-                                "final_threat_level": "MEDICAL EMERGENCY",
-                                "final_priority_score": 10,
-                                "confidence_score": 0.95,
-                                "merged_response_actions": ["IMMEDIATE: Dispatch first aid", "CONTACT emergency services"],
-                                "escalation_required": True,
-                                "response_timeline": "IMMEDIATE (within 30 seconds)",
-                                "sop_influence_reasoning": "Medical Emergency SOP applied - HIGH priority override for fall detection",
-                                "applicable_sops": [{"title": "Medical Emergency Response Protocol", "priority_override": "HIGH"}],
-                                "sop_analysis_failed": False
-                            }
-                        elif 'firearm' in detection_name or 'weapon' in detection_name:
-                            sop_analysis_result = {
-                                "event_type": "CV_Threat_Detection", 
-                                "final_threat_level": "HIGH",
-                                "final_priority_score": 9,
-                                "confidence_score": 0.9,
-                                "merged_response_actions": ["IMMEDIATE: Contact law enforcement", "EVACUATE area"],
-                                "escalation_required": True,
-                                "response_timeline": "IMMEDIATE",
-                                "sop_influence_reasoning": "Weapon Protocol applied - HIGH priority override",
-                                "applicable_sops": [{"title": "Weapon Incident Protocol", "priority_override": "HIGH"}],
-                                "sop_analysis_failed": False
-                            }
-                        else:
-                            # Use standard analysis as SOP result
-                            sop_analysis_result = analysis_result.copy()
-                            sop_analysis_result.update({
-                                "sop_influence_reasoning": "No applicable SOPs found - using standard analysis",
-                                "applicable_sops": [],
-                                "sop_analysis_failed": False
-                            })
-                        logger.info(f"Fast mode SOP analysis for CV event {event_data.get('alert_event_id')}")
-                    else:
-                        try:
-                            # Create cache key based on detection type
-                            cache_key = f"{event_data.get('detection_name', 'unknown')}_{event_data.get('severity', 'unknown')}"
-                            
-                            # Check if we have a cached result for this type of event
-                            if hasattr(run_sop_enhanced_analysis, '_cache') and cache_key in run_sop_enhanced_analysis._cache:
-                                sop_analysis_result = run_sop_enhanced_analysis._cache[cache_key].copy()
-                                logger.info(f"Using cached SOP analysis for CV event {event_data.get('alert_event_id')}")
-                            else:
-                                sop_analysis_result = run_sop_enhanced_analysis(event_data, "CV_Threat_Detection")
-                                
-                                # Cache the result
-                                if not hasattr(run_sop_enhanced_analysis, '_cache'):
-                                    run_sop_enhanced_analysis._cache = {}
-                                run_sop_enhanced_analysis._cache[cache_key] = sop_analysis_result.copy()
-                                
-                                logger.info(f"SOP analysis completed and cached for CV event {event_data.get('alert_event_id')}")
-                        except Exception as e:
-                            logger.warning(f"SOP analysis failed for CV event: {e}")
-                            # Fallback to standard analysis structure with SOP failure indicators
-                            sop_analysis_result = {
-                                "event_type": "CV_Threat_Detection",
-                                "final_threat_level": analysis_result.get('ai_threat_level', 'MEDIUM'),
-                                "final_priority_score": analysis_result.get('priority_score', 5),
-                                "confidence_score": analysis_result.get('confidence_score', 0.7),
-                                "merged_response_actions": analysis_result.get('recommended_actions', []),
-                                "escalation_required": analysis_result.get('escalation_required', False),
-                                "response_timeline": analysis_result.get('response_timeline', '15 minutes'),
-                                "sop_influence_reasoning": f"SOP analysis unavailable: {str(e)}",
-                                "applicable_sops": [],
-                                "sop_analysis_failed": True
-                            }
+                    # Run SOP-enhanced analysis through the shared result cache
+                    # (fast mode: rule-based SOP analysis only, never escalate to the crew)
+                    try:
+                        sop_analysis_result = run_cached_sop_enhanced_analysis(
+                            event_data, "CV_Threat_Detection", allow_crew=not fast_mode
+                        )
+                        logger.info(f"SOP analysis completed for CV event {event_data.get('alert_event_id')}")
+                    except Exception as e:
+                        logger.warning(f"SOP analysis failed for CV event: {e}")
+                        # Fallback to standard analysis structure with SOP failure indicators
+                        sop_analysis_result = {
+                            "event_type": "CV_Threat_Detection",
+                            "final_threat_level": analysis_result.get('ai_threat_level', 'MEDIUM'),
+                            "final_priority_score": analysis_result.get('priority_score', 5),
+                            "confidence_score": analysis_result.get('confidence_score', 0.7),
+                            "merged_response_actions": analysis_result.get('recommended_actions', []),
+                            "escalation_required": analysis_result.get('escalation_required', False),
+                            "response_timeline": analysis_result.get('response_timeline', '15 minutes'),
+                            "sop_influence_reasoning": f"SOP analysis unavailable: {str(e)}",
+                            "applicable_sops": [],
+                            "sop_analysis_failed": True
+                        }
                     
                     detection_name = event_data.get('detection_name', 'Unknown')
                     
@@ -302,7 +267,9 @@ async def simulate_activities(count: int = 5, activity_type: str = None, fast_mo
                     
                     # Run SOP-enhanced analysis
                     try:
-                        sop_analysis_result = run_sop_enhanced_analysis(event_data, "Access_Control_System")
+                        sop_analysis_result = run_cached_sop_enhanced_analysis(
+                            event_data, "Access_Control_System", allow_crew=not fast_mode
+                        )
                         logger.info(f"SOP analysis completed for Access Control event {event_data.get('alarm_id')}")
                     except Exception as e:
                         logger.warning(f"SOP analysis failed for Access Control event: {e}")
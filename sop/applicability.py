@@ -0,0 +1,323 @@
+"""
+Location and time applicability of SOPs.
+
+SpecialConditions.applies_to_locations holds "Site > Building > Floor > Space"
+paths (or just a site, space or device name) and applies_to_times holds
+calendar names ("business_hours", "after_hours", "weekends") or custom ranges
+("Mon-Fri 22:00-06:00"). The index keeps:
+
+- a trie over the location paths: an SOP scoped to a path applies to every
+  event at or below it, and a single-segment location also matches that name
+  anywhere in the event's path
+- each SOP's time windows precompiled into a minute-of-week bitmask
+
+Given an event's location path and time it returns the scoped SOPs that
+apply, so searches can skip every other scoped SOP before scoring. SOPs that
+apply to all locations and all times are never pruned, and an event without
+a location (or time) is not pruned on that dimension.
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Spellings (lowercased, spaces as underscores) of "no restriction"
+UNIVERSAL_LOCATIONS = {"", "all", "any", "all_locations", "all_sites", "everywhere"}
+UNIVERSAL_TIMES = {"", "all", "any", "always", "anytime", "24/7", "all_times"}
+
+_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Named calendars that are not derived from the business hours setting
+_NAMED_WINDOWS = {
+    "weekdays": "mon-fri 00:00-24:00",
+    "weekends": "sat-sun 00:00-24:00",
+    "overnight": "mon-sun 22:00-06:00",
+    "night": "mon-sun 22:00-06:00"
+}
+
+# "[days] HH:MM-HH:MM", days as "mon-fri", "sat,sun", "weekdays" or "weekends"
+_WINDOW_PATTERN = re.compile(
+    r"^(?:(?P<days>[a-z]{3}(?:\s*[-,]\s*[a-z]{3})*|weekdays|weekends)\s+)?"
+    r"(?P<start>\d{1,2})(?::(?P<start_min>\d{2}))?\s*-\s*(?P<end>\d{1,2})(?::(?P<end_min>\d{2}))?$"
+)
+
+_PATH_SEPARATOR = re.compile(r"\s*(?:>|/)\s*")
+
+
+def normalize_path(location: str) -> List[str]:
+    """Lowercased segments of a "Site > Building > Floor > Space" path"""
+    return [" ".join(segment.lower().split()) for segment in _PATH_SEPARATOR.split(location.strip()) if segment.strip()]
+
+
+def compile_window(window: str) -> Optional[int]:
+    """
+    Compile a time window into a minute-of-week bitmask (bit 0 is Monday 00:00)
+
+    Returns:
+        The bitmask, or None when the window applies at all times
+
+    Raises:
+        ValueError: The window is not a known calendar or range
+    """
+    name = _name(window)
+    if name in UNIVERSAL_TIMES:
+        return None
+    if name in ("business_hours", "office_hours"):
+        return _compile_range(settings.sop_business_hours)
+    if name in ("after_hours", "off_hours", "outside_business_hours", "non_business_hours"):
+        return ~_compile_range(settings.sop_business_hours) & ((1 << MINUTES_PER_WEEK) - 1)
+    if name in _NAMED_WINDOWS:
+        return _compile_range(_NAMED_WINDOWS[name])
+    return _compile_range(window)
+
+
+def minute_of_week(when: datetime) -> int:
+    """Minute of the week of a time, in the configured SOP time zone"""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    local = when.astimezone(_local_timezone())
+    return local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+
+def parse_event_time(value: Any) -> Optional[datetime]:
+    """Event timestamp as a datetime; accepts epoch seconds/milliseconds and ISO 8601"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    try:
+        if re.fullmatch(r"\d+(?:\.\d+)?", text):
+            seconds = float(text)
+            if seconds > 1e11:
+                seconds /= 1000
+            return datetime.fromtimestamp(seconds, tz=timezone.utc)
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+class _TrieNode:
+    __slots__ = ("children", "sop_ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.sop_ids: Set[str] = set()
+
+
+class ApplicabilityIndex:
+    """Location trie and time-window bitmasks of the SOPs scoped to specific places or times"""
+
+    def __init__(self):
+        self._root = _TrieNode()
+        # Single-segment locations, matched against any segment of the event path
+        self._names: Dict[str, Set[str]] = {}
+        # SOPs limited in location and/or time
+        self._scoped: Set[str] = set()
+        self._any_location: Set[str] = set()
+        self._any_time: Set[str] = set()
+        # time bitmask -> SOPs with exactly that calendar
+        self._calendars: Dict[int, Set[str]] = {}
+        self._entries: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._scoped)
+
+    def add(self, sop_id: str, special_conditions: Optional[Dict[str, Any]]) -> None:
+        """Index an SOP's location and time scope (replacing any previous entry)"""
+        self.remove(sop_id)
+        conditions = special_conditions or {}
+
+        paths = [
+            normalize_path(location) for location in conditions.get('applies_to_locations') or []
+            if _name(location) not in UNIVERSAL_LOCATIONS
+        ]
+        paths = [path for path in paths if path]
+        if len(paths) < len(conditions.get('applies_to_locations') or []):
+            # Listing "all_locations" alongside specific ones means everywhere
+            paths = []
+
+        mask = self._compile_times(sop_id, conditions.get('applies_to_times') or [])
+
+        if not paths and mask is None:
+            return
+
+        self._scoped.add(sop_id)
+        if paths:
+            for path in paths:
+                if len(path) == 1:
+                    self._names.setdefault(path[0], set()).add(sop_id)
+                node = self._root
+                for segment in path:
+                    node = node.children.setdefault(segment, _TrieNode())
+                node.sop_ids.add(sop_id)
+        else:
+            self._any_location.add(sop_id)
+
+        if mask is None:
+            self._any_time.add(sop_id)
+        else:
+            self._calendars.setdefault(mask, set()).add(sop_id)
+
+        self._entries[sop_id] = (paths, mask)
+
+    def remove(self, sop_id: str) -> None:
+        entry = self._entries.pop(sop_id, None)
+        if entry is None:
+            return
+        paths, mask = entry
+
+        self._scoped.discard(sop_id)
+        self._any_location.discard(sop_id)
+        self._any_time.discard(sop_id)
+        for path in paths:
+            if len(path) == 1:
+                _discard(self._names, path[0], sop_id)
+            self._remove_path(path, sop_id)
+        if mask is not None:
+            _discard(self._calendars, mask, sop_id)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def applicable(self, location: Optional[List[str]] = None, when: Optional[datetime] = None) -> FrozenSet[str]:
+        """
+        Scoped SOPs that apply to an event
+
+        Args:
+            location: Event location path segments (see normalize_path), or None if unknown
+            when: Event time, or None if unknown
+
+        Returns:
+            The scoped SOP ids that apply; scoped SOPs not in it should be skipped
+        """
+        if not self._scoped:
+            return frozenset()
+
+        applicable = set(self._scoped)
+        if location:
+            path = [" ".join(segment.lower().split()) for segment in location if segment]
+            at_location = set(self._any_location)
+            node = self._root
+            for segment in path:
+                node = node.children.get(segment)
+                if node is None:
+                    break
+                at_location |= node.sop_ids
+            for segment in path:
+                at_location |= self._names.get(segment, set())
+            applicable &= at_location
+
+        if when is not None:
+            minute = minute_of_week(when)
+            at_time = set(self._any_time)
+            for mask, sop_ids in self._calendars.items():
+                if mask >> minute & 1:
+                    at_time |= sop_ids
+            applicable &= at_time
+
+        return frozenset(applicable)
+
+    def excluded(self, location: Optional[List[str]] = None, when: Optional[datetime] = None) -> Set[str]:
+        """Scoped SOPs that do not apply to an event"""
+        if not self._scoped or (not location and when is None):
+            return set()
+        return self._scoped - self.applicable(location, when)
+
+    def _compile_times(self, sop_id: str, windows: List[str]) -> Optional[int]:
+        mask = 0
+        for window in windows:
+            try:
+                window_mask = compile_window(window)
+            except ValueError:
+                # Never drop an SOP because its schedule is worded unexpectedly
+                logger.warning(f"Unrecognized time window {window!r} in SOP {sop_id}, treating it as always applicable")
+                return None
+            if window_mask is None:
+                return None
+            mask |= window_mask
+        return mask if windows else None
+
+    def _remove_path(self, path: List[str], sop_id: str) -> None:
+        nodes = [self._root]
+        for segment in path:
+            node = nodes[-1].children.get(segment)
+            if node is None:
+                return
+            nodes.append(node)
+        nodes[-1].sop_ids.discard(sop_id)
+        # Prune empty branches
+        for parent, segment, node in zip(reversed(nodes[:-1]), reversed(path), reversed(nodes[1:])):
+            if node.sop_ids or node.children:
+                break
+            del parent.children[segment]
+
+
+def _compile_range(window: str) -> int:
+    match = _WINDOW_PATTERN.match(" ".join(window.lower().split()))
+    if not match:
+        raise ValueError(f"Unrecognized time window: {window}")
+
+    days = _parse_days(match.group("days"))
+    start = int(match.group("start")) * 60 + int(match.group("start_min") or 0)
+    end = int(match.group("end")) * 60 + int(match.group("end_min") or 0)
+    if start >= MINUTES_PER_DAY or end > MINUTES_PER_DAY:
+        raise ValueError(f"Unrecognized time window: {window}")
+
+    # A range ending before it starts runs past midnight into the next day
+    length = end - start if end > start else MINUTES_PER_DAY - start + end
+    mask = 0
+    for day in days:
+        offset = day * MINUTES_PER_DAY + start
+        bits = ((1 << length) - 1) << offset
+        # Wrap Sunday night into Monday morning
+        mask |= (bits | bits >> MINUTES_PER_WEEK) & ((1 << MINUTES_PER_WEEK) - 1)
+    return mask
+
+
+def _parse_days(days: Optional[str]) -> List[int]:
+    if not days:
+        return list(range(7))
+    if days == "weekdays":
+        return list(range(5))
+    if days == "weekends":
+        return [5, 6]
+
+    selected = []
+    for part in re.split(r"\s*,\s*", days):
+        first, _, last = part.partition("-")
+        first, last = first.strip(), (last or first).strip()
+        if first not in _DAYS or last not in _DAYS:
+            raise ValueError(f"Unrecognized days: {days}")
+        start, end = _DAYS.index(first), _DAYS.index(last)
+        selected.extend(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return selected
+
+
+def _name(value: str) -> str:
+    return "_".join(value.lower().split())
+
+
+def _local_timezone():
+    name = settings.sop_timezone
+    if name.upper() == "UTC":
+        return timezone.utc
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)
+
+
+def _discard(mapping: Dict[Any, Set[str]], key: Any, sop_id: str) -> None:
+    sop_ids = mapping.get(key)
+    if sop_ids is not None:
+        sop_ids.discard(sop_id)
+        if not sop_ids:
+            del mapping[key]
@@ -1,10 +1,68 @@
 import mammoth
 import os
 import logging
-from typing import Tuple, Optional
+from html.parser import HTMLParser
+from typing import List, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
+class _DocxTextParser(HTMLParser):
+    """Plain text of mammoth's HTML, with headings kept as markdown "#" lines"""
+    
+    _BLOCKS = {"p", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+    _CONTAINERS = {"li", "td", "th"}
+    
+    def __init__(self):
+        super().__init__()
+        self.blocks: List[str] = []
+        self._current: List[str] = []
+        self._cells = 0
+        # Open list items and table cells; mammoth wraps their content in <p>
+        self._containers = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "p" and self._containers:
+            # A paragraph inside a cell or list item continues its line
+            if self._current and not self._current[-1].endswith((" ", "\n")):
+                self._current.append(" ")
+        elif tag in self._BLOCKS:
+            self._end_block()
+            if tag[0] == "h" and tag[1:].isdigit():
+                self._current.append("#" * int(tag[1:]) + " ")
+            elif tag == "li":
+                self._current.append("- ")
+            elif tag == "tr":
+                self._cells = 0
+        elif tag in ("td", "th"):
+            if self._cells:
+                self._current.append(" | ")
+            self._cells += 1
+        elif tag == "br":
+            self._current.append("\n")
+        if tag in self._CONTAINERS:
+            self._containers += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self._CONTAINERS:
+            self._containers = max(self._containers - 1, 0)
+        if tag == "p" and self._containers:
+            return
+        if tag in self._BLOCKS:
+            self._end_block()
+    
+    def handle_data(self, data):
+        self._current.append(data)
+    
+    def close(self):
+        super().close()
+        self._end_block()
+    
+    def _end_block(self):
+        text = "".join(self._current).strip()
+        if text and text not in ("-", "#" * len(text)):
+            self.blocks.append(text)
+        self._current = []
+
 class DocumentReader:
     """Extract text content from .docx and .md files"""
     
@@ -70,8 +128,8 @@ class DocumentReader:
         """Extract text from .docx file using mammoth"""
         try:
             with open(file_path, "rb") as docx_file:
-                # Use mammoth to extract text
-                result = mammoth.extract_raw_text(docx_file)
+                # Use mammoth to convert to HTML, keeping headings (as "#" lines) for section splitting
+                result = mammoth.convert_to_html(docx_file)
                 
                 # Check for warnings
                 if result.messages:
@@ -79,7 +137,7 @@ class DocumentReader:
                     logger.warning(f"Mammoth warnings for {file_path}: {warnings}")
                 
                 # Clean up the text
-                text = result.value.strip()
+                text = self._html_to_text(result.value)
                 
                 if not text:
                     return "", "Document appears to be empty or contains no extractable text"
@@ -91,6 +149,13 @@ class DocumentReader:
             logger.error(f"Error extracting from .docx file {file_path}: {str(e)}")
             return "", f"Error reading .docx file: {str(e)}"
     
+    def _html_to_text(self, html: str) -> str:
+        """Text of mammoth's HTML output, one paragraph per block, headings as markdown headings"""
+        parser = _DocxTextParser()
+        parser.feed(html)
+        parser.close()
+        return "\n\n".join(parser.blocks).strip()
+    
     def _extract_from_markdown(self, file_path: str) -> Tuple[str, Optional[str]]:
         """Extract text from .md file"""
         try:
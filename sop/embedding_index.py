@@ -0,0 +1,121 @@
+"""
+In-memory similarity index over SOP passage embeddings.
+
+VectorIndexer persists each SOP's passage vectors in sop_embeddings and loads
+them into an EmbeddingIndex, so a search embeds only the query and then scores
+it with numpy matrix products.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIndex:
+    """
+    In-memory inner-product index over SOP passage embeddings.
+
+    Each SOP contributes several passage vectors (title, each trigger and the
+    combined searchable text); an SOP's score is the best cosine similarity
+    of any of its passages. Small corpora are scored exactly. Once the corpus
+    is larger than the candidate pool, a coarse pass over one centroid per
+    SOP picks the candidates and only their passages are scored, which keeps
+    queries sub-millisecond with thousands of SOPs.
+    """
+
+    def __init__(self, dimension: int, candidate_pool: int = 256):
+        self.dimension = dimension
+        self.candidate_pool = candidate_pool
+        self._lock = threading.RLock()
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._starts = np.zeros(0, dtype=np.intp)
+        self._centroids = np.zeros((0, dimension), dtype=np.float32)
+        self._sop_ids: List[str] = []
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, sop_id: str) -> bool:
+        return sop_id in self._vectors
+
+    def add(self, sop_id: str, vectors: np.ndarray) -> None:
+        """Add or replace the passage vectors for an SOP"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if not len(vectors):
+            self.remove(sop_id)
+            return
+        with self._lock:
+            self._vectors[sop_id] = vectors
+            self._dirty = True
+
+    def remove(self, sop_id: str) -> None:
+        """Remove an SOP from the index if present"""
+        with self._lock:
+            if self._vectors.pop(sop_id, None) is not None:
+                self._dirty = True
+
+    def search(self, query_vector: np.ndarray, k: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Find the k SOPs most similar to a normalized query vector
+
+        Returns:
+            List of (sop_id, score) sorted by descending score
+        """
+        matrix, starts, centroids, sop_ids = self._snapshot()
+        if not sop_ids or k <= 0:
+            return []
+
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        k = min(k, len(sop_ids))
+        pool = max(self.candidate_pool, k)
+
+        if len(sop_ids) <= pool:
+            # Passages are stored grouped by SOP, so a segmented max gives per-SOP scores
+            slots = np.arange(len(sop_ids))
+            best = np.maximum.reduceat(matrix @ query_vector, starts)
+        else:
+            coarse = centroids @ query_vector
+            slots = np.sort(np.argpartition(-coarse, pool - 1)[:pool])
+            counts = np.diff(np.append(starts, len(matrix)))[slots]
+            offsets = np.cumsum(counts) - counts
+            rows = np.repeat(starts[slots] - offsets, counts) + np.arange(counts.sum())
+            best = np.maximum.reduceat(matrix[rows] @ query_vector, offsets)
+
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top], kind="stable")]
+
+        return [
+            (sop_ids[slots[i]], float(best[i]))
+            for i in top
+            if best[i] >= min_score
+        ]
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            return self._matrix, self._starts, self._centroids, self._sop_ids
+
+    def _rebuild(self) -> None:
+        sop_ids = list(self._vectors)
+        blocks = [self._vectors[sop_id] for sop_id in sop_ids]
+        if blocks:
+            self._matrix = np.ascontiguousarray(np.vstack(blocks))
+            self._starts = np.cumsum([0] + [len(block) for block in blocks[:-1]], dtype=np.intp)
+            centroids = np.vstack([block.mean(axis=0) for block in blocks])
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._centroids = np.ascontiguousarray(centroids / norms, dtype=np.float32)
+        else:
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            self._starts = np.zeros(0, dtype=np.intp)
+            self._centroids = np.zeros((0, self.dimension), dtype=np.float32)
+        self._sop_ids = sop_ids
+        self._dirty = False
+        logger.debug(f"Rebuilt embedding index with {len(sop_ids)} SOPs and {len(self._matrix)} passages")
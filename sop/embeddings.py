@@ -0,0 +1,138 @@
+"""
+Local text embedders for SOP search.
+
+SOP passages and search queries are embedded in-process, without a network
+call. HashingEmbedder needs nothing beyond numpy: it hashes words and
+character trigrams into a fixed-size vector. SentenceTransformerEmbedder gives semantic
+matches when sentence-transformers is installed. get_embedder() builds the one
+named by settings.sop_embedder. Each embedder has its own default similarity
+threshold, because cosine scores are only comparable within one embedder.
+"""
+
+import logging
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no signal for matching events to SOP triggers
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "was", "with", "within"
+})
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class BaseEmbedder:
+    """Interface for local text embedders used by the SOP embedding index"""
+
+    name: str = "base"
+    dimension: int = 0
+    # Default minimum cosine similarity for a search match; scores are only
+    # comparable between queries of the same embedder
+    similarity_threshold: float = 0.5
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text into an L2-normalized float32 vector"""
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed several texts into an (n, dimension) L2-normalized float32 matrix"""
+        raise NotImplementedError
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    Dependency-free embedder using signed feature hashing.
+
+    Words and character trigrams are hashed into a fixed number of buckets,
+    so "fall", "falling" and "fallen" share most of their features. The hash
+    is CRC32 rather than Python's hash() so persisted vectors stay valid
+    across processes. Single-trigger queries score about 0.6-1.0 against
+    their SOP and unrelated text stays below about 0.3.
+    """
+
+    similarity_threshold = 0.3
+
+    def __init__(self, dimension: int = 512):
+        self.dimension = dimension
+        self.name = f"hashing-{dimension}"
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dimension] += sign * weight
+        return _normalize_rows(matrix)
+
+    def _features(self, text: str):
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            if token in STOPWORDS:
+                continue
+            yield "w:" + token, 1.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.35
+
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    """Embedder backed by a local sentence-transformers model"""
+
+    similarity_threshold = 0.4
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        # Imported lazily so the dependency is only needed when selected
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers-{model_name}"
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def get_embedder(spec: Optional[str] = None) -> Optional[BaseEmbedder]:
+    """
+    Create the embedder selected by spec or settings.sop_embedder (SOP_EMBEDDER)
+
+    Supported values:
+        hashing (default), hashing:<dimension>,
+        sentence-transformers[:<model_name>], none
+
+    Returns:
+        Embedder instance, or None when embeddings are disabled
+    """
+    if spec is None:
+        spec = settings.sop_embedder
+
+    kind, _, option = spec.strip().partition(":")
+    kind = kind.lower()
+
+    if kind in ("", "none", "off"):
+        return None
+    if kind == "hashing":
+        return HashingEmbedder(int(option) if option else 512)
+    if kind == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbedder(option or "all-MiniLM-L6-v2")
+        except Exception as e:
+            logger.warning(f"Sentence-transformers embedder unavailable ({e}), using hashing embedder")
+            return HashingEmbedder()
+
+    raise ValueError(f"Unknown SOP embedder: {spec}")
@@ -0,0 +1,236 @@
+"""
+Content-addressed cache of LLM SOP extractions.
+
+Extracting an SOP's structure is an LLM call of several seconds, and the
+answer depends only on the document content, the model and the prompt.
+Re-uploading an unchanged document (or one that differs only in whitespace),
+or re-ingesting a whole library, should not pay for it again. Extraction
+results are therefore stored in the SOP database keyed by a hash of the
+whitespace-normalized content, the model and a fingerprint of the prompt, so
+a model or prompt change misses the cache by construction.
+
+The cached value is the raw extraction (the LLM's JSON), not a ProcessedSOP:
+the SOP is rebuilt from it for each upload, so filename, processed date and
+original text are those of the new upload. Entries expire after
+settings.sop_extraction_cache_ttl and the least recently used are evicted
+beyond settings.sop_extraction_cache_max_entries (0 disables the cache).
+Concurrent misses for the same key in this process run the extraction once.
+
+A hit only reads the database: hit counts and times are kept in memory and
+written with the next stored extraction, just before it evicts, so serving
+a cached extraction never takes the SOP database's writer lock.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from sop.storage import SOPStorage, get_sop_storage
+
+logger = logging.getLogger(__name__)
+
+Extraction = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+_ENTRY_COLUMNS = "cache_key, content_hash, model, prompt_version, document_title, created_at, last_hit_at, hits"
+
+
+def normalize_content(text: str) -> str:
+    """Document text with Unicode forms and all whitespace runs normalized"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the normalized document text"""
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+def cache_key(text_hash: str, model: str, prompt_version: str) -> str:
+    return hashlib.sha256(f"{text_hash}\0{model}\0{prompt_version}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed extraction results keyed by content, model and prompt"""
+
+    def __init__(self, db_path: str, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.storage: SOPStorage = get_sop_storage(db_path)
+        self.max_entries = settings.sop_extraction_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.sop_extraction_cache_ttl if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        # key -> [lock, number of threads using it]
+        self._inflight: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        # key -> [hits, last hit time] not yet written to the database
+        self._pending_hits: Dict[str, list] = {}
+
+        with self.storage.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sop_extraction_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    document_title TEXT,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_hit_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sop_extraction_cache_last_hit ON sop_extraction_cache (last_hit_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sop_extraction_cache_hash ON sop_extraction_cache (content_hash)')
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_or_extract(self, document_text: str, model: str, prompt_version: str,
+                       extract: Callable[[], Extraction], document_title: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool]:
+        """
+        The cached extraction of a document, extracting and caching it on a miss
+
+        Args:
+            document_text: Document text the extraction is for
+            model: Model performing the extraction
+            prompt_version: Fingerprint of the extraction prompt
+            extract: Performs the extraction, returning (sop_data, error)
+            document_title: Stored with the entry for inspection
+
+        Returns:
+            Tuple of (sop_data, error, cache_hit); failed extractions are not cached
+        """
+        if not self.enabled:
+            sop_data, error = extract()
+            return sop_data, error, False
+
+        text_hash = content_hash(document_text)
+        key = cache_key(text_hash, model, prompt_version)
+
+        with self._lock:
+            inflight = self._inflight.setdefault(key, [threading.Lock(), 0])
+            inflight[1] += 1
+            key_lock = inflight[0]
+        try:
+            with key_lock:
+                cached = self._get(key)
+                if cached is not None:
+                    with self._lock:
+                        self.hits += 1
+                        pending = self._pending_hits.setdefault(key, [0, 0.0])
+                        pending[0] += 1
+                        pending[1] = time.time()
+                    logger.info(f"SOP extraction cache hit for content {text_hash[:12]}")
+                    return cached, None, True
+
+                with self._lock:
+                    self.misses += 1
+                sop_data, error = extract()
+                if error is None and sop_data is not None:
+                    self._put(key, text_hash, model, prompt_version, document_title, sop_data)
+                return sop_data, error, False
+        finally:
+            with self._lock:
+                inflight[1] -= 1
+                if not inflight[1]:
+                    del self._inflight[key]
+
+    def entries(self, limit: int = 100, content_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recently used entries (without their data)"""
+        sql = f'SELECT {_ENTRY_COLUMNS} FROM sop_extraction_cache'
+        params: list = []
+        if content_hash:
+            sql += ' WHERE content_hash = ?'
+            params.append(content_hash)
+        rows = self.storage.read().execute(sql + ' ORDER BY last_hit_at DESC LIMIT ?', (*params, limit)).fetchall()
+        columns = [column.strip() for column in _ENTRY_COLUMNS.split(",")]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """One entry, including its cached extraction"""
+        row = self.storage.read().execute(
+            f'SELECT {_ENTRY_COLUMNS}, data FROM sop_extraction_cache WHERE cache_key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        columns = [column.strip() for column in _ENTRY_COLUMNS.split(",")]
+        entry = dict(zip(columns, row[:-1]))
+        entry["data"] = json.loads(row[-1])
+        return entry
+
+    def purge(self, key: Optional[str] = None, model: Optional[str] = None,
+              prompt_version: Optional[str] = None) -> int:
+        """
+        Delete cache entries
+
+        Args:
+            key: Only this entry
+            model: Only entries extracted by this model
+            prompt_version: Only entries extracted with this prompt version
+
+        Returns:
+            Number of entries deleted (everything when no filter is given)
+        """
+        conditions, params = [], []
+        for column, value in (("cache_key", key), ("model", model), ("prompt_version", prompt_version)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        with self.storage.write() as conn:
+            deleted = conn.execute(f'DELETE FROM sop_extraction_cache{where}', params).rowcount
+        logger.info(f"Purged {deleted} SOP extraction cache entries")
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit counters"""
+        entries, total_hits = self.storage.read().execute(
+            'SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM sop_extraction_cache'
+        ).fetchone()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored_hits": total_hits
+            }
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.storage.read().execute(
+            'SELECT data FROM sop_extraction_cache WHERE cache_key = ? AND created_at > ?',
+            (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _put(self, key: str, text_hash: str, model: str, prompt_version: str,
+             document_title: Optional[str], sop_data: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            pending_hits = [(hits, last_hit_at, hit_key) for hit_key, (hits, last_hit_at) in self._pending_hits.items()]
+            self._pending_hits.clear()
+        with self.storage.write() as conn:
+            # Recency decides eviction, so hits since the last write are recorded first
+            conn.executemany(
+                'UPDATE sop_extraction_cache SET hits = hits + ?, last_hit_at = max(last_hit_at, ?) WHERE cache_key = ?',
+                pending_hits
+            )
+            conn.execute(
+                '''INSERT OR REPLACE INTO sop_extraction_cache
+                       (cache_key, content_hash, model, prompt_version, document_title, data, created_at, last_hit_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)''',
+                (key, text_hash, model, prompt_version, document_title, json.dumps(sop_data), now, now)
+            )
+            conn.execute('DELETE FROM sop_extraction_cache WHERE created_at <= ?', (now - self.ttl_seconds,))
+            conn.execute(
+                '''DELETE FROM sop_extraction_cache WHERE cache_key IN (
+                       SELECT cache_key FROM sop_extraction_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+                   )''',
+                (self.max_entries,)
+            )
@@ -0,0 +1,182 @@
+"""
+Execution layer for SOP document ingestion.
+
+Processing an upload parses the document (mammoth, CPU-bound), calls the LLM
+to extract its structure (blocking HTTP for seconds) and indexes the result.
+None of that may run on the API's event loop, and none of it should compete
+with triage for the analysis executor. Ingestion gets its own resources:
+
+- a pool of worker threads fed from a bounded queue, where each job runs its
+  pipeline and blocks on the LLM call; a full queue rejects new uploads
+- a process pool for document parsing, so parsing large documents does not
+  hold the GIL the API and the triage workers need
+
+Jobs can be cancelled by job_id: a queued job is dropped, and a running job
+stops at its next stage boundary. Once a job starts writing its result it
+can no longer be cancelled.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from agents.analysis_executor import AnalysisExecutor
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionCancelledError(Exception):
+    """Raised inside a job's pipeline when the job has been cancelled"""
+
+
+class CancellationToken:
+    """Cancellation flag passed to a running ingestion job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._committed = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> bool:
+        """Request cancellation; False if the job is already committing its result"""
+        with self._lock:
+            if self._committed:
+                return False
+            self._cancelled = True
+            return True
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled:
+            raise IngestionCancelledError("Ingestion job was cancelled")
+
+    def commit(self) -> None:
+        """Mark the start of the job's final writes, after which it cannot be cancelled"""
+        with self._lock:
+            self.raise_if_cancelled()
+            self._committed = True
+
+
+class SOPIngestionExecutor:
+    """Bounded worker threads for ingestion jobs plus a process pool for parsing"""
+
+    def __init__(self, workers: int, queue_size: int, parse_workers: int, name: str = "sop-ingestion"):
+        self.name = name
+        self.parse_workers = parse_workers
+        self._executor = AnalysisExecutor(workers=workers, queue_size=queue_size, name=name)
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # job_id -> (future, token) of queued and running jobs
+        self._jobs: Dict[str, tuple] = {}
+        self.cancelled = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor.running
+
+    def start(self) -> None:
+        """Start the worker threads and the parsing processes"""
+        with self._lock:
+            if self.parse_workers > 0 and self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        self._executor.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """Cancel queued and running jobs and stop the pools"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            parse_pool, self._parse_pool = self._parse_pool, None
+        for _, token in jobs:
+            token.cancel()
+        self._executor.stop(wait=wait)
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=wait, cancel_futures=True)
+
+    def submit(self, job_id: str, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """
+        Queue fn(token, *args, **kwargs) as an ingestion job
+
+        fn should call token.raise_if_cancelled() between stages and
+        token.commit() before writing its result.
+
+        Raises:
+            ExecutorUnavailableError: The executor is not running
+            ExecutorSaturatedError: The ingestion queue is full
+        """
+        token = CancellationToken()
+        future = self._executor.submit(fn, token, *args, **kwargs)
+        with self._lock:
+            self._jobs[job_id] = (future, token)
+        future.add_done_callback(lambda _: self._forget(job_id, future))
+        return future
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job
+
+        Returns:
+            False if the job is unknown, finished or already committing its result
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return False
+
+        future, token = entry
+        if not token.cancel():
+            return False
+        # Dropped from the queue if not started; otherwise the job stops at its next stage
+        future.cancel()
+        with self._lock:
+            self.cancelled += 1
+        logger.info(f"Cancelled SOP ingestion job {job_id}")
+        return True
+
+    def parse(self, token: CancellationToken, fn: Callable, *args: Any) -> Any:
+        """
+        Run a parsing function in the process pool and wait for it
+
+        fn and its arguments must be picklable. Without a process pool
+        (parse_workers = 0) fn runs in the calling thread.
+        """
+        token.raise_if_cancelled()
+        pool = self._parse_pool
+        if pool is None:
+            return fn(*args)
+        future = pool.submit(fn, *args)
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeoutError:
+                if token.cancelled:
+                    future.cancel()
+                    token.raise_if_cancelled()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization counters"""
+        stats = self._executor.stats()
+        stats.pop("levels", None)
+        with self._lock:
+            stats["active_jobs"] = len(self._jobs)
+            stats["cancelled"] = self.cancelled
+        stats["parse_workers"] = self.parse_workers
+        return stats
+
+    def _forget(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None and entry[0] is future:
+                del self._jobs[job_id]
+
+
+# Shared executor for SOP uploads
+sop_ingestion_executor = SOPIngestionExecutor(
+    workers=settings.sop_ingestion_workers,
+    queue_size=settings.sop_ingestion_queue_size,
+    parse_workers=settings.sop_parse_workers
+)
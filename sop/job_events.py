@@ -0,0 +1,151 @@
+"""
+Push-based progress of SOP processing jobs.
+
+The upload page used to poll GET /sop/process/{job_id} every second per
+upload. Instead, subscribers wait on a queue that the broadcaster fills:
+
+- stage transitions made in this process are published as they happen
+- one shared poll loop per process picks up transitions made by other
+  workers, reading every watched job in a single query per interval no matter
+  how many clients are subscribed
+
+Each subscriber receives the job's current state first, then every change,
+and its stream ends once the job completes or fails.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+from config.settings import settings
+from sop.job_store import SOPJobStore, TERMINAL_STATUSES
+from sop.models import SOPProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+# Updates buffered per subscriber; a slow client only misses intermediate stages
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Sent to subscribers of a job that no longer exists (expired)
+_GONE = object()
+
+
+class JobEventBroadcaster:
+    """Fans SOP job status changes out to every subscriber of the job"""
+
+    def __init__(self, job_store: SOPJobStore, poll_interval: Optional[float] = None):
+        self.job_store = job_store
+        self.poll_interval = settings.sop_job_events_poll_interval if poll_interval is None else poll_interval
+        # job_id -> subscriber queues
+        self._subscribers: Dict[str, set] = {}
+        # job_id -> last (status, progress, message) fanned out
+        self._last: Dict[str, tuple] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, job: SOPProcessingStatus) -> None:
+        """Fan a job's new state out to its subscribers; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or job.job_id not in self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(job.job_id, job.model_dump(mode="json"))
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, job.job_id, job.model_dump(mode="json"))
+
+    async def subscribe(self, job_id: str, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Stream a job's status
+
+        Args:
+            job_id: Job to follow
+            heartbeat: Yield None after this many idle seconds, so callers can keep connections alive
+
+        Yields:
+            The job status (as JSON-ready dicts), current state first, until the job finishes
+        """
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+
+        try:
+            job = await asyncio.to_thread(self.job_store.get, job_id)
+            if job is None:
+                return
+            _offer(queue, job.model_dump(mode="json"))
+
+            last = None
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if payload is _GONE:
+                    return
+                key = _state(payload)
+                if key == last:
+                    continue
+                last = key
+                yield payload
+                if payload["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            queues = self._subscribers.get(job_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[job_id]
+                    self._last.pop(job_id, None)
+
+    def _deliver(self, job_id: str, payload: Any) -> None:
+        queues = self._subscribers.get(job_id)
+        if not queues:
+            return
+        if payload is not _GONE:
+            key = _state(payload)
+            if self._last.get(job_id) == key:
+                return
+            self._last[job_id] = key
+        for queue in queues:
+            _offer(queue, payload)
+
+    async def _poll(self) -> None:
+        """Pick up changes made by other workers while anyone is subscribed"""
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            job_ids = list(self._subscribers)
+            try:
+                jobs = await asyncio.to_thread(self.job_store.get_many, job_ids)
+            except Exception as e:
+                logger.warning(f"Failed to poll SOP job status: {str(e)}")
+                continue
+
+            found = set()
+            for job in jobs:
+                found.add(job.job_id)
+                self._deliver(job.job_id, job.model_dump(mode="json"))
+            for job_id in job_ids:
+                if job_id not in found:
+                    self._deliver(job_id, _GONE)
+
+
+def _state(payload: Dict[str, Any]) -> tuple:
+    return payload["status"], payload["progress"], payload["message"]
+
+
+def _offer(queue: asyncio.Queue, payload: Any) -> None:
+    """Queue a payload, dropping the oldest update if the subscriber is behind"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(payload)
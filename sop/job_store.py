@@ -0,0 +1,179 @@
+"""
+Persistent store for SOP upload processing jobs.
+
+Jobs used to live in a module-level dict in the router: it grew forever, held
+every processed SOP (original text included), was lost on restart and was
+invisible to other uvicorn workers. Jobs are now rows in the SOP database,
+so every worker sees every job, and a job's result is a reference to the
+indexed SOP rather than a copy of it.
+
+Finished jobs expire settings.sop_job_ttl seconds after they complete.
+Unfinished jobs that stop making progress for settings.sop_job_stale_after
+seconds (their worker died or restarted) are marked failed, and then expire
+like any other finished job.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from sop.models import SOPProcessingStatus
+from sop.storage import SOPStorage, get_sop_storage
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Columns a job update may set
+_UPDATABLE = {"status", "progress", "message", "error", "result_sop_id"}
+
+_SELECT_JOB_SQL = '''
+    SELECT job_id, status, filename, file_size, progress, message, error, result_sop_id, created_at, completed_at
+    FROM sop_jobs
+'''
+
+
+class SOPJobStore:
+    """SQLite-backed SOP processing jobs with TTL eviction"""
+
+    def __init__(self, db_path: str, ttl_seconds: Optional[float] = None,
+                 stale_after_seconds: Optional[float] = None):
+        self.storage: SOPStorage = get_sop_storage(db_path)
+        self.ttl_seconds = settings.sop_job_ttl if ttl_seconds is None else ttl_seconds
+        self.stale_after_seconds = settings.sop_job_stale_after if stale_after_seconds is None else stale_after_seconds
+
+        with self.storage.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sop_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT NOT NULL DEFAULT '',
+                    error TEXT,
+                    result_sop_id TEXT,
+                    created_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sop_jobs_status ON sop_jobs (status, updated_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sop_jobs_expires_at ON sop_jobs (expires_at)')
+
+    def create(self, job: SOPProcessingStatus) -> None:
+        """Store a new job (and evict expired ones)"""
+        self.evict()
+        now = time.time()
+        with self.storage.write() as conn:
+            conn.execute(
+                '''INSERT INTO sop_jobs (job_id, status, filename, file_size, progress, message, error,
+                                         result_sop_id, created_at, completed_at, updated_at, expires_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (
+                    job.job_id, job.status, job.filename, job.file_size, job.progress, job.message, job.error,
+                    job.result_sop_id, job.created_at.isoformat(),
+                    job.completed_at.isoformat() if job.completed_at else None,
+                    now, now + self.ttl_seconds if job.status in TERMINAL_STATUSES else None
+                )
+            )
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        """
+        Update a job's status fields
+
+        Moving to a terminal status ("completed", "failed" or "cancelled") stamps
+        completed_at and starts the job's TTL.
+
+        Args:
+            job_id: Job to update
+            **fields: Any of status, progress, message, error, result_sop_id
+
+        Returns:
+            False if the job does not exist (e.g. it already expired)
+        """
+        unknown = set(fields) - _UPDATABLE
+        if unknown:
+            raise ValueError(f"Cannot update job fields: {sorted(unknown)}")
+
+        now = time.time()
+        fields["updated_at"] = now
+        if fields.get("status") in TERMINAL_STATUSES:
+            fields["completed_at"] = datetime.now().isoformat()
+            fields["expires_at"] = now + self.ttl_seconds
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.storage.write() as conn:
+            cursor = conn.execute(
+                f'UPDATE sop_jobs SET {assignments} WHERE job_id = ?',
+                (*fields.values(), job_id)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[SOPProcessingStatus]:
+        """A job by id, or None if unknown or expired"""
+        row = self.storage.read().execute(
+            _SELECT_JOB_SQL + ' WHERE job_id = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (job_id, time.time())
+        ).fetchone()
+        return self._to_status(row) if row else None
+
+    def get_many(self, job_ids: List[str]) -> List[SOPProcessingStatus]:
+        """The jobs among job_ids that exist and have not expired"""
+        if not job_ids:
+            return []
+        placeholders = ", ".join("?" * len(job_ids))
+        rows = self.storage.read().execute(
+            _SELECT_JOB_SQL + f' WHERE job_id IN ({placeholders}) AND (expires_at IS NULL OR expires_at > ?)',
+            (*job_ids, time.time())
+        ).fetchall()
+        return [self._to_status(row) for row in rows]
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[SOPProcessingStatus]:
+        """Most recently updated jobs, optionally only those with a status"""
+        conditions, params = ["(expires_at IS NULL OR expires_at > ?)"], [time.time()]
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        rows = self.storage.read().execute(
+            _SELECT_JOB_SQL + f' WHERE {" AND ".join(conditions)} ORDER BY updated_at DESC LIMIT ?',
+            (*params, limit)
+        ).fetchall()
+        return [self._to_status(row) for row in rows]
+
+    def evict(self) -> Dict[str, int]:
+        """Fail stalled jobs and delete expired ones"""
+        now = time.time()
+        placeholders = ", ".join("?" * len(TERMINAL_STATUSES))
+        with self.storage.write() as conn:
+            stalled = conn.execute(
+                f'''UPDATE sop_jobs SET status = 'failed', error = 'Processing was interrupted',
+                        message = 'Processing was interrupted before completing',
+                        completed_at = ?, updated_at = ?, expires_at = ?
+                    WHERE status NOT IN ({placeholders}) AND updated_at < ?''',
+                (datetime.now().isoformat(), now, now + self.ttl_seconds,
+                 *TERMINAL_STATUSES, now - self.stale_after_seconds)
+            ).rowcount
+            expired = conn.execute('DELETE FROM sop_jobs WHERE expires_at <= ?', (now,)).rowcount
+
+        if stalled or expired:
+            logger.info(f"SOP job store: marked {stalled} stalled jobs failed, evicted {expired} expired jobs")
+        return {"stalled": stalled, "expired": expired}
+
+    def _to_status(self, row: tuple) -> SOPProcessingStatus:
+        job_id, status, filename, file_size, progress, message, error, result_sop_id, created_at, completed_at = row
+        return SOPProcessingStatus(
+            job_id=job_id,
+            status=status,
+            filename=filename,
+            file_size=file_size,
+            progress=progress,
+            message=message,
+            error=error,
+            result_sop_id=result_sop_id,
+            created_at=datetime.fromisoformat(created_at),
+            completed_at=datetime.fromisoformat(completed_at) if completed_at else None
+        )
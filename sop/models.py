@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from enum import Enum
+from sop.normalization import parse_timeline, normalize_priority
 
 class SOPPriority(str, Enum):
     CRITICAL = "CRITICAL"
@@ -19,6 +20,15 @@ class ResponseRequirements(BaseModel):
     timeline: str = Field(..., description="Response timeline requirement")
     notifications: List[str] = Field(default=[], description="Required notifications")
     required_actions: List[str] = Field(default=[], description="Required response actions")
+    timeline_seconds: Optional[int] = Field(None, description="Response deadline in seconds, parsed from timeline")
+    urgency: Optional[SOPTimeline] = Field(None, description="Urgency class, parsed from timeline")
+
+    @model_validator(mode="after")
+    def parse_timeline_text(self) -> "ResponseRequirements":
+        # Always derived from the text, so they cannot drift from it
+        self.timeline_seconds, urgency = parse_timeline(self.timeline)
+        self.urgency = SOPTimeline(urgency) if urgency else None
+        return self
 
 class SpecialConditions(BaseModel):
     applies_to_locations: List[str] = Field(default=[], description="Applicable locations")
@@ -38,6 +48,11 @@ class ProcessedSOP(BaseModel):
     processed_date: datetime = Field(default_factory=datetime.now, description="Processing timestamp")
     original_text: str = Field(..., description="Original document text")
 
+    @field_validator("priority_override", mode="before")
+    @classmethod
+    def normalize_priority_override(cls, value: Any) -> Any:
+        return normalize_priority(value)
+
 class SOPProcessingStatus(BaseModel):
     job_id: str = Field(..., description="Processing job ID")
     status: str = Field(..., description="Processing status")
@@ -46,7 +61,7 @@ class SOPProcessingStatus(BaseModel):
     progress: int = Field(default=0, description="Processing progress percentage")
     message: str = Field(default="", description="Status message")
     error: Optional[str] = Field(None, description="Error message if failed")
-    result: Optional[ProcessedSOP] = Field(None, description="Processed SOP result")
+    result_sop_id: Optional[str] = Field(None, description="ID of the indexed SOP once completed")
     created_at: datetime = Field(default_factory=datetime.now, description="Job creation time")
     completed_at: Optional[datetime] = Field(None, description="Job completion time")
 
@@ -57,11 +72,25 @@ class SOPSearchResult(BaseModel):
     priority_override: Optional[SOPPriority] = Field(None, description="Priority override")
     response_requirements: ResponseRequirements = Field(..., description="Response requirements")
     matched_triggers: List[str] = Field(default=[], description="Matched trigger keywords")
+    snippet: Optional[str] = Field(None, description="Highlighted excerpt for keyword search results")
+
+class BulkIndexFailure(BaseModel):
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    sop_id: Optional[str] = Field(None, description="SOP identifier, if the item had one")
+    error: str = Field(..., description="Why the item was not indexed")
+
+class BulkIndexResult(BaseModel):
+    total: int = Field(default=0, description="Items submitted")
+    indexed: int = Field(default=0, description="Items indexed")
+    failed: List[BulkIndexFailure] = Field(default=[], description="Items that were not indexed")
+    chunks: int = Field(default=0, description="Write transactions used")
+    duration_seconds: float = Field(default=0.0, description="Indexing time")
 
 class FileUploadResponse(BaseModel):
     job_id: str = Field(..., description="Processing job ID")
     filename: str = Field(..., description="Uploaded filename")
     file_size: int = Field(..., description="File size in bytes")
     file_type: str = Field(..., description="File type detected")
+    sha256: Optional[str] = Field(None, description="SHA-256 of the uploaded file")
     status: str = Field(..., description="Initial status")
     message: str = Field(..., description="Response message")
\ No newline at end of file
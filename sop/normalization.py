@@ -0,0 +1,135 @@
+"""
+Normalization of free-text SOP fields at ingest.
+
+Extracted SOPs describe their response timeline in free text ("IMMEDIATE
+(within 30 seconds)", "within two minutes", "1 hour"). The timeline is parsed
+once, when the SOP is built, into a deadline in seconds and an urgency class
+that are stored with the SOP, so merging requirements at analysis time is a
+numeric comparison.
+"""
+
+import re
+from typing import Any, Optional, Tuple
+
+# Urgency classes (SOPTimeline values) by upper bound of the deadline in seconds
+URGENCY_BOUNDS = [
+    ("IMMEDIATE", 60),
+    ("URGENT", 300),
+    ("PROMPT", 1800)
+]
+ROUTINE = "ROUTINE"
+
+# Urgency classes from most to least urgent
+URGENCY_ORDER = [urgency for urgency, _ in URGENCY_BOUNDS] + [ROUTINE]
+
+# Deadline implied by a timeline that names an urgency but no duration
+KEYWORD_SECONDS = {
+    "IMMEDIATE": 0,
+    "URGENT": 300
+}
+
+_UNIT_SECONDS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "day": 86400, "days": 86400
+}
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "forty-five": 45, "sixty": 60, "ninety": 90
+}
+
+_LONG_UNITS = r"seconds?|secs?|minutes?|mins?|hours?|hrs?|days?"
+
+# "30 seconds", "2min", "1.5 hours", "5m", or "two minutes", "an hour"
+_DURATION_PATTERN = re.compile(
+    rf"(?P<digits>\d+(?:\.\d+)?)\s*(?P<unit>{_LONG_UNITS}|s|m|h)\b"
+    rf"|\b(?P<word>{'|'.join(sorted(_NUMBER_WORDS, key=len, reverse=True))})[\s-]+(?P<word_unit>{_LONG_UNITS})\b",
+    re.IGNORECASE
+)
+_HALF_HOUR_PATTERN = re.compile(r"\bhalf(?:\s+an)?\s+hour\b", re.IGNORECASE)
+_IMMEDIATE_PATTERN = re.compile(r"\b(?:immediate(?:ly)?|asap|as soon as possible|without delay)\b", re.IGNORECASE)
+_URGENT_PATTERN = re.compile(r"\burgent(?:ly)?\b", re.IGNORECASE)
+
+# Priority spellings that mean "no override"
+_NO_PRIORITY = {"", "NONE", "NULL", "N/A", "NA", "NOT SPECIFIED", "UNSPECIFIED"}
+
+
+def parse_timeline(timeline: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parse a free-text response timeline
+
+    The deadline is the shortest duration the text mentions; without one,
+    "immediate" and "urgent" imply KEYWORD_SECONDS. The urgency class is the
+    one the text names, otherwise it follows from the deadline. A named class
+    is never contradicted by a longer duration for some later step:
+    "Immediate notification; investigation within 24 hours" is (0, "IMMEDIATE").
+
+    Args:
+        timeline: Timeline text from the SOP's response requirements
+
+    Returns:
+        Tuple of (deadline in seconds, urgency class), (None, None) when unparseable
+    """
+    if not timeline:
+        return None, None
+
+    durations = []
+    for match in _DURATION_PATTERN.finditer(timeline):
+        if match.group("digits"):
+            amount = float(match.group("digits"))
+            unit = match.group("unit").lower()
+        else:
+            amount = _NUMBER_WORDS[match.group("word").lower()]
+            unit = match.group("word_unit").lower()
+        durations.append(int(round(amount * _UNIT_SECONDS[unit])))
+    if _HALF_HOUR_PATTERN.search(timeline):
+        durations.append(1800)
+
+    named = None
+    if _IMMEDIATE_PATTERN.search(timeline):
+        named = "IMMEDIATE"
+    elif _URGENT_PATTERN.search(timeline):
+        named = "URGENT"
+
+    if durations:
+        seconds = min(durations)
+        if named and URGENCY_ORDER.index(urgency_for_seconds(seconds)) > URGENCY_ORDER.index(named):
+            seconds = KEYWORD_SECONDS[named]
+    elif named:
+        seconds = KEYWORD_SECONDS[named]
+    else:
+        return None, None
+
+    return seconds, named or urgency_for_seconds(seconds)
+
+
+def urgency_for_seconds(seconds: int) -> str:
+    """Urgency class of a response deadline"""
+    for urgency, bound in URGENCY_BOUNDS:
+        if seconds <= bound:
+            return urgency
+    return ROUTINE
+
+
+def timeline_urgency_key(seconds: Optional[int], urgency: Optional[str]) -> Tuple[int, int]:
+    """
+    Sort key of a parsed timeline, most urgent first
+
+    Timelines are ordered by urgency class, then by deadline, so a timeline
+    named IMMEDIATE always beats "within 1 hour" even if it was stored with
+    a longer deadline.
+    """
+    if urgency not in URGENCY_ORDER:
+        urgency = urgency_for_seconds(seconds) if seconds is not None else ROUTINE
+    return URGENCY_ORDER.index(urgency), seconds if seconds is not None else 0
+
+
+def normalize_priority(priority: Any) -> Any:
+    """Canonical spelling of a priority override ("high " -> "HIGH", "none" -> None)"""
+    if priority is None or not isinstance(priority, str):
+        return priority
+    normalized = " ".join(priority.split()).upper()
+    return None if normalized in _NO_PRIORITY else normalized
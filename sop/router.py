@@ -1,21 +1,30 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+import json
 import os
-import tempfile
 import uuid
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from config.settings import settings
 from sop.models import (
     FileUploadResponse, 
     SOPProcessingStatus, 
     ProcessedSOP,
-    SOPSearchResult
+    SOPSearchResult,
+    BulkIndexResult
 )
 from sop.document_reader import DocumentReader
 from sop.sop_extractor import SOPExtractor
-from sop.vector_indexer import VectorIndexer
+from sop.extraction_cache import ExtractionCache
+from sop.vector_indexer import VectorIndexer, LIST_FIELDS
+from sop.job_store import SOPJobStore
+from sop.uploads import receive_upload, InvalidUploadError, UploadTooLargeError
+from sop.job_events import JobEventBroadcaster
+from sop.ingestion_executor import sop_ingestion_executor, CancellationToken, IngestionCancelledError
+from agents.analysis_executor import ExecutorSaturatedError, ExecutorUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +33,32 @@ router = APIRouter(prefix="/sop", tags=["sop"])
 
 # Global instances
 document_reader = DocumentReader()
-sop_extractor = SOPExtractor()
 vector_indexer = VectorIndexer()
+extraction_cache = ExtractionCache(vector_indexer.db_path)
+sop_extractor = SOPExtractor(cache=extraction_cache)
 
-# In-memory job tracking (in production, use Redis or database)
-processing_jobs: Dict[str, SOPProcessingStatus] = {}
+# Request body of /upload for the OpenAPI docs (the body is parsed by receive_upload)
+UPLOAD_REQUEST_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+# Processing jobs, shared by every worker through the SOP database
+job_store = SOPJobStore(vector_indexer.db_path)
+job_events = JobEventBroadcaster(job_store)
+
+# Idle seconds between keep-alive comments on job event streams
+JOB_EVENTS_HEARTBEAT = 15
 
 @router.get("/")
 async def sop_transformer_page():
@@ -47,113 +77,168 @@ async def sop_transformer_page():
         logger.error(f"Error serving SOP transformer page: {str(e)}")
         raise HTTPException(status_code=500, detail=f"SOP transformer page error: {str(e)}")
 
-@router.post("/upload", response_model=FileUploadResponse)
-async def upload_sop_document(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
-):
+@router.post("/upload", response_model=FileUploadResponse, openapi_extra=UPLOAD_REQUEST_SCHEMA)
+async def upload_sop_document(request: Request):
     """
     Upload and process a single SOP document (.docx or .md)
     Accepts only one file at a time with 2MB size limit
+    
+    The file is streamed to disk and hashed as it arrives; uploads over the
+    limit are rejected (413) as soon as that is known, without buffering them.
     """
+    # Generate unique job ID
+    job_id = str(uuid.uuid4())
+    
     try:
-        # Generate unique job ID
-        job_id = str(uuid.uuid4())
-        
-        logger.info(f"Processing file upload: {file.filename} (Job: {job_id})")
-        
-        # Validate file type
-        if not document_reader.is_supported_file(file.filename):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Supported types: {', '.join(document_reader.supported_extensions)}"
-            )
-        
-        # Check file size (FastAPI UploadFile doesn't have size directly)
-        # We'll check when we save the file
+        upload = await receive_upload(
+            request,
+            max_bytes=document_reader.max_file_size,
+            allowed_extensions=document_reader.supported_extensions
+        )
+    except UploadTooLargeError as e:
+        logger.warning(f"Rejected SOP upload (Job: {job_id}): {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error receiving SOP upload (Job: {job_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    logger.info(f"Processing file upload: {upload.filename} ({upload.size} bytes, sha256 {upload.sha256}) (Job: {job_id})")
+    
+    try:
+        # Create initial job status
+        job_status = SOPProcessingStatus(
+            job_id=job_id,
+            status="uploaded",
+            filename=upload.filename,
+            file_size=upload.size,
+            progress=10,
+            message="File uploaded successfully, starting processing..."
+        )
         
-        # Create temporary file
-        temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, file.filename)
+        await run_in_threadpool(job_store.create, job_status)
         
+        # Start processing on the ingestion executor
         try:
-            # Save uploaded file
-            content = await file.read()
-            
-            # Check file size
-            if len(content) > document_reader.max_file_size:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File size {len(content)} bytes exceeds maximum allowed size of {document_reader.max_file_size} bytes"
-                )
-            
-            with open(temp_file_path, 'wb') as f:
-                f.write(content)
-            
-            # Create initial job status
-            job_status = SOPProcessingStatus(
-                job_id=job_id,
-                status="uploaded",
-                filename=file.filename,
-                file_size=len(content),
-                progress=10,
-                message="File uploaded successfully, starting processing..."
-            )
-            
-            processing_jobs[job_id] = job_status
-            
-            # Start background processing
-            background_tasks.add_task(
-                process_sop_file,
-                job_id=job_id,
-                file_path=temp_file_path,
-                filename=file.filename
-            )
-            
-            # Return response
-            response = FileUploadResponse(
-                job_id=job_id,
-                filename=file.filename,
-                file_size=len(content),
-                file_type=os.path.splitext(file.filename.lower())[1],
-                status="processing",
-                message="File uploaded successfully and processing started"
-            )
-            
-            logger.info(f"File upload successful: {file.filename} (Job: {job_id})")
-            return response
-            
-        except Exception as e:
-            # Clean up temp file on error
-            try:
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                os.rmdir(temp_dir)
-            except:
-                pass
-            raise e
-            
-    except HTTPException:
-        raise
+            future = sop_ingestion_executor.submit(job_id, process_sop_file, job_id, upload.path, upload.filename)
+        except (ExecutorSaturatedError, ExecutorUnavailableError) as e:
+            _update_job(job_id, status="failed", error=str(e), message=f"Processing not started: {str(e)}")
+            if isinstance(e, ExecutorSaturatedError):
+                raise HTTPException(status_code=429, detail=f"SOP ingestion capacity exceeded: {str(e)}", headers={"Retry-After": "5"})
+            raise HTTPException(status_code=503, detail=f"SOP ingestion unavailable: {str(e)}")
+        # A job cancelled before it started never runs, so clean up for it
+        future.add_done_callback(lambda f: f.cancelled() and upload.remove())
+        
     except Exception as e:
-        logger.error(f"Error uploading file {file.filename}: {str(e)}")
+        upload.remove()
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Error uploading file {upload.filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    logger.info(f"File upload successful: {upload.filename} (Job: {job_id})")
+    return FileUploadResponse(
+        job_id=job_id,
+        filename=upload.filename,
+        file_size=upload.size,
+        file_type=os.path.splitext(upload.filename.lower())[1],
+        sha256=upload.sha256,
+        status="processing",
+        message="File uploaded successfully and processing started"
+    )
+
+@router.get("/process", response_model=List[SOPProcessingStatus])
+async def list_processing_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """List recent processing jobs, optionally only those with a status"""
+    return await run_in_threadpool(job_store.list, status, limit)
 
 @router.get("/process/{job_id}", response_model=SOPProcessingStatus)
 async def get_processing_status(job_id: str):
     """Get processing status for a job"""
-    if job_id not in processing_jobs:
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@router.delete("/process/{job_id}", response_model=SOPProcessingStatus)
+async def cancel_processing(job_id: str):
+    """Cancel a queued or running processing job"""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    if not sop_ingestion_executor.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job can no longer be cancelled (status: {job.status})")
     
-    return processing_jobs[job_id]
+    await run_in_threadpool(_update_job, job_id, status="cancelled", message="Processing cancelled")
+    return await run_in_threadpool(job_store.get, job_id)
 
-@router.get("/results", response_model=List[Dict[str, Any]])
-async def get_all_sops():
-    """Get all processed SOPs"""
+@router.get("/process/{job_id}/events")
+async def stream_processing_status(job_id: str):
+    """
+    Stream processing status for a job as Server-Sent Events
+    
+    Sends a "status" event with the current state, then one per stage
+    transition, and ends once the job completes or fails.
+    """
+    if await run_in_threadpool(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        async for job in job_events.subscribe(job_id, heartbeat=JOB_EVENTS_HEARTBEAT):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(job)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/results")
+async def get_all_sops(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    category: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    List processed SOPs
+    
+    Without limit or cursor this returns a list of every SOP (the full SOPs unless
+    fields is given), as it always has. With either, it returns one page
+    ({items, next_cursor}, 50 SOPs unless limit is given). fields is a
+    comma-separated projection (e.g. sop_id,title,category); in pages, original_text
+    is only returned when requested. format=ndjson streams every SOP for exports.
+    """
     try:
-        sops = vector_indexer.get_all_sops()
-        logger.info(f"Retrieved {len(sops)} SOPs")
-        return sops
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        
+        if format == "json" and limit is None and cursor is None:
+            sops = await run_in_threadpool(
+                lambda: list(vector_indexer.iter_sops(field_list or list(LIST_FIELDS), category))
+            )
+            logger.info(f"Retrieved {len(sops)} SOPs")
+            return sops
+        
+        if format == "ndjson":
+            # Validate before streaming so bad fields are a 400, not a broken stream
+            vector_indexer.list_sops(limit=1, fields=field_list, category=category)
+            lines = (json.dumps(sop) + "\n" for sop in vector_indexer.iter_sops(field_list, category))
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        
+        page = await run_in_threadpool(vector_indexer.list_sops, limit or 50, cursor, field_list, category)
+        logger.info(f"Retrieved {len(page['items'])} SOPs")
+        return page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving SOPs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving SOPs: {str(e)}")
@@ -175,22 +260,61 @@ async def delete_sop(sop_id: str):
         logger.error(f"Error deleting SOP {sop_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error deleting SOP: {str(e)}")
 
+@router.post("/bulk", response_model=BulkIndexResult)
+async def bulk_index_sops(sops: List[Dict[str, Any]], chunk_size: Optional[int] = None):
+    """
+    Index a batch of already-structured SOPs (ProcessedSOP JSON objects)
+    Items are written in chunked transactions; invalid items are reported without failing the batch
+    """
+    try:
+        if not sops:
+            raise HTTPException(status_code=400, detail="No SOPs provided")
+        if len(sops) > settings.sop_bulk_max_items:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch of {len(sops)} SOPs exceeds maximum of {settings.sop_bulk_max_items}"
+            )
+        if chunk_size is not None and chunk_size < 1:
+            raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+        
+        # Indexing blocks on embedding and SQLite writes; keep it off the event loop
+        result = await run_in_threadpool(vector_indexer.index_sops, sops, chunk_size)
+        
+        logger.info(f"Bulk SOP indexing: {result.indexed}/{result.total} indexed, {len(result.failed)} failed")
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk indexing SOPs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk indexing failed: {str(e)}")
+
 @router.get("/search")
 async def search_sops(
     query: str,
     n_results: int = 3,
-    similarity_threshold: float = 0.7
+    similarity_threshold: Optional[float] = None,
+    keyword: bool = False,
+    category: Optional[str] = None
 ) -> List[SOPSearchResult]:
-    """Search SOPs using semantic similarity"""
+    """Search SOPs using semantic similarity, or BM25-ranked keyword search with keyword=true"""
     try:
         if not query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
-        results = vector_indexer.search_sops(
-            query=query,
-            n_results=n_results,
-            similarity_threshold=similarity_threshold
-        )
+        if keyword:
+            results = vector_indexer.keyword_search_sops(
+                query=query,
+                n_results=n_results,
+                similarity_threshold=0.0 if similarity_threshold is None else similarity_threshold,
+                category_filter=category
+            )
+        else:
+            results = vector_indexer.search_sops(
+                query=query,
+                n_results=n_results,
+                similarity_threshold=similarity_threshold
+            )
         
         logger.info(f"SOP search for '{query}' returned {len(results)} results")
         return results
@@ -201,6 +325,48 @@ async def search_sops(
         logger.error(f"Error searching SOPs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+def require_admin(x_api_key: Optional[str] = Header(None)):
+    """Require the configured API key (X-API-Key header) when API_KEY_REQUIRED is set"""
+    if settings.api_key_required and x_api_key != settings.api_key:
+        raise HTTPException(status_code=401, detail="Invalid or missing API key")
+
+@router.get("/admin/extraction-cache", dependencies=[Depends(require_admin)])
+async def get_extraction_cache(
+    limit: int = Query(100, ge=1, le=1000),
+    content_hash: Optional[str] = None
+):
+    """Extraction cache statistics and its most recently used entries"""
+    return {
+        "stats": await run_in_threadpool(extraction_cache.stats),
+        "model": sop_extractor.model,
+        "prompt_version": sop_extractor.prompt_version,
+        "entries": await run_in_threadpool(extraction_cache.entries, limit, content_hash)
+    }
+
+@router.get("/admin/extraction-cache/{cache_key}", dependencies=[Depends(require_admin)])
+async def get_extraction_cache_entry(cache_key: str):
+    """One extraction cache entry, including the cached extraction"""
+    entry = await run_in_threadpool(extraction_cache.get_entry, cache_key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Cache entry not found")
+    return entry
+
+@router.delete("/admin/extraction-cache", dependencies=[Depends(require_admin)])
+async def purge_extraction_cache(
+    model: Optional[str] = None,
+    prompt_version: Optional[str] = None
+):
+    """Purge the extraction cache, or only the entries of a model and/or prompt version"""
+    deleted = await run_in_threadpool(extraction_cache.purge, None, model, prompt_version)
+    return {"deleted": deleted}
+
+@router.delete("/admin/extraction-cache/{cache_key}", dependencies=[Depends(require_admin)])
+async def delete_extraction_cache_entry(cache_key: str):
+    """Delete one extraction cache entry"""
+    if not await run_in_threadpool(extraction_cache.purge, cache_key):
+        raise HTTPException(status_code=404, detail="Cache entry not found")
+    return {"deleted": 1}
+
 @router.get("/stats")
 async def get_sop_statistics():
     """Get SOP database statistics"""
@@ -211,29 +377,75 @@ async def get_sop_statistics():
         logger.error(f"Error getting SOP stats: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
 
-# Background processing function
-async def process_sop_file(job_id: str, file_path: str, filename: str):
-    """Background task to process SOP file"""
+@router.get("/{sop_id}")
+async def get_sop(sop_id: str):
+    """Get one SOP, including its original document text"""
+    try:
+        sop = await run_in_threadpool(vector_indexer.get_sop, sop_id)
+        if sop is None:
+            raise HTTPException(status_code=404, detail=f"SOP {sop_id} not found")
+        return sop
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving SOP {sop_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving SOP: {str(e)}")
+
+def _update_job(job_id: str, **fields: Any) -> None:
+    """Record a job's progress and push it to the job's event subscribers"""
+    if job_store.update(job_id, **fields):
+        job = job_store.get(job_id)
+        if job is not None:
+            job_events.publish(job)
+
+def _remove_upload(file_path: str) -> None:
+    """Delete an uploaded temp file and its directory"""
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            # Also remove temp directory if empty
+            temp_dir = os.path.dirname(file_path)
+            try:
+                os.rmdir(temp_dir)
+            except OSError:
+                pass  # Directory not empty or other issue
+    except Exception as e:
+        logger.warning(f"Failed to clean up temp file {file_path}: {str(e)}")
+
+# Ingestion job, run on an ingestion executor worker thread
+def process_sop_file(token: CancellationToken, job_id: str, file_path: str, filename: str):
+    """Extract, validate and index an uploaded SOP file"""
     try:
         logger.info(f"Starting background processing for job {job_id}")
         
         # Update status
-        processing_jobs[job_id].status = "extracting_text"
-        processing_jobs[job_id].progress = 25
-        processing_jobs[job_id].message = "Extracting text from document..."
+        _update_job(
+            job_id,
+            status="extracting_text",
+            progress=25,
+            message="Extracting text from document..."
+        )
         
-        # Extract text from document
-        text_content, error = document_reader.extract_text(file_path)
+        # Extract text from document (in the parsing process pool)
+        text_content, error = sop_ingestion_executor.parse(token, document_reader.extract_text, file_path)
         if error:
-            processing_jobs[job_id].status = "failed"
-            processing_jobs[job_id].error = error
-            processing_jobs[job_id].message = f"Text extraction failed: {error}"
+            _update_job(
+                job_id,
+                status="failed",
+                error=error,
+                message=f"Text extraction failed: {error}"
+            )
             return
         
         # Update status
-        processing_jobs[job_id].status = "extracting_structure"
-        processing_jobs[job_id].progress = 50
-        processing_jobs[job_id].message = "Extracting SOP structure using AI..."
+        token.raise_if_cancelled()
+        _update_job(
+            job_id,
+            status="extracting_structure",
+            progress=50,
+            message="Extracting SOP structure using AI..."
+        )
         
         # Extract SOP structure
         document_title = os.path.splitext(filename)[0]
@@ -241,57 +453,68 @@ async def process_sop_file(job_id: str, file_path: str, filename: str):
             text_content, document_title, filename
         )
         if error:
-            processing_jobs[job_id].status = "failed"
-            processing_jobs[job_id].error = error
-            processing_jobs[job_id].message = f"Structure extraction failed: {error}"
+            _update_job(
+                job_id,
+                status="failed",
+                error=error,
+                message=f"Structure extraction failed: {error}"
+            )
             return
         
         # Validate extraction
         valid, validation_error = sop_extractor.validate_extraction(processed_sop)
         if not valid:
-            processing_jobs[job_id].status = "failed"
-            processing_jobs[job_id].error = validation_error
-            processing_jobs[job_id].message = f"Validation failed: {validation_error}"
+            _update_job(
+                job_id,
+                status="failed",
+                error=validation_error,
+                message=f"Validation failed: {validation_error}"
+            )
             return
         
-        # Update status
-        processing_jobs[job_id].status = "indexing"
-        processing_jobs[job_id].progress = 75
-        processing_jobs[job_id].message = "Creating vector embeddings and storing in database..."
+        # Update status; from here on the job can no longer be cancelled
+        token.commit()
+        _update_job(
+            job_id,
+            status="indexing",
+            progress=75,
+            message="Creating vector embeddings and storing in database..."
+        )
         
         # Index in vector database
         success, error = vector_indexer.index_sop(processed_sop)
         if not success:
-            processing_jobs[job_id].status = "failed"
-            processing_jobs[job_id].error = error
-            processing_jobs[job_id].message = f"Indexing failed: {error}"
+            _update_job(
+                job_id,
+                status="failed",
+                error=error,
+                message=f"Indexing failed: {error}"
+            )
             return
         
         # Complete processing
-        processing_jobs[job_id].status = "completed"
-        processing_jobs[job_id].progress = 100
-        processing_jobs[job_id].message = "SOP processing completed successfully"
-        processing_jobs[job_id].result = processed_sop
-        processing_jobs[job_id].completed_at = datetime.now()
+        _update_job(
+            job_id,
+            status="completed",
+            progress=100,
+            message="SOP processing completed successfully",
+            result_sop_id=processed_sop.sop_id
+        )
         
         logger.info(f"Successfully completed processing for job {job_id}")
         
+    except IngestionCancelledError:
+        logger.info(f"Stopped processing for cancelled job {job_id}")
+        
     except Exception as e:
         logger.error(f"Error in background processing for job {job_id}: {str(e)}")
-        processing_jobs[job_id].status = "failed"
-        processing_jobs[job_id].error = str(e)
-        processing_jobs[job_id].message = f"Processing failed: {str(e)}"
+        _update_job(
+            job_id,
+            status="failed",
+            error=str(e),
+            message=f"Processing failed: {str(e)}"
+        )
         
     finally:
         # Clean up temporary file
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                # Also remove temp directory if empty
-                temp_dir = os.path.dirname(file_path)
-                try:
-                    os.rmdir(temp_dir)
-                except OSError:
-                    pass  # Directory not empty or other issue
-        except Exception as e:
-            logger.warning(f"Failed to clean up temp file {file_path}: {str(e)}")
\ No newline at end of file
+        _remove_upload(file_path)
@@ -0,0 +1,172 @@
+"""
+Section-level extraction of long SOP documents.
+
+Long SOPs (regulatory ones especially) are edited a paragraph at a time, but
+extracting them whole re-sends the entire document to the LLM on every edit.
+Instead a long document is split into sections at its markdown headings
+(.docx headings are converted to markdown headings by DocumentReader), each
+section is extracted on its own through the content-addressed extraction
+cache, and the per-section contributions are merged into one SOP. An edit
+therefore only re-extracts the sections whose text changed.
+
+Sections shorter than MIN_SECTION_CHARS are folded into the following section
+so a document with many tiny headings does not turn into many tiny LLM
+calls. The folding depends only on the section texts, so an unchanged run of
+sections always forms the same groups.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from sop.normalization import normalize_priority, parse_timeline, timeline_urgency_key
+
+# Sections shorter than this (in characters) are merged into the next one
+MIN_SECTION_CHARS = 500
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+# Priorities from most to least urgent
+PRIORITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+
+_UNIVERSAL = {"all_locations", "all_times", "all", "any", "always", "everywhere"}
+
+
+class Section:
+    """A heading and the text under it (the heading line included)"""
+    __slots__ = ("heading", "text")
+
+    def __init__(self, heading: str, text: str):
+        self.heading = heading
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"Section({self.heading!r}, {len(self.text)} chars)"
+
+
+def split_sections(text: str, min_chars: int = MIN_SECTION_CHARS) -> List[Section]:
+    """
+    Split a markdown document at its headings
+
+    Text before the first heading is its own section; headings inside fenced
+    code blocks are ignored.
+
+    Args:
+        text: Document text
+        min_chars: Sections shorter than this are folded into the next one
+
+    Returns:
+        The sections in document order (a single section without headings)
+    """
+    sections: List[Section] = []
+    heading, lines, in_fence = "", [], False
+    for line in text.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match and any(existing.strip() for existing in lines):
+            sections.append(Section(heading, "\n".join(lines).strip()))
+            lines = []
+        if match:
+            heading = match.group(2)
+        lines.append(line)
+    if any(line.strip() for line in lines):
+        sections.append(Section(heading, "\n".join(lines).strip()))
+
+    folded: List[Section] = []
+    pending: Optional[Section] = None
+    for section in sections:
+        if pending is not None:
+            section = Section(pending.heading, pending.text + "\n\n" + section.text)
+            pending = None
+        if len(section.text) < min_chars:
+            pending = section
+        else:
+            folded.append(section)
+    if pending is not None:
+        if folded:
+            last = folded.pop()
+            pending = Section(last.heading, last.text + "\n\n" + pending.text)
+        folded.append(pending)
+    return folded
+
+
+def merge_section_extractions(contributions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-section extractions into the extraction of the whole SOP
+
+    - sop_id, title and category: the first section that gives one
+    - triggers, notifications, actions, regulatory requirements: union, in document order
+    - timeline: the most urgent parseable one (by urgency class, then deadline)
+    - priority_override: the most urgent
+    - locations and times: union of the specific ones, "all_*" when no section restricts them
+    - escalation_required: if any section requires it
+
+    Args:
+        contributions: Extracted fields of each section, in document order
+
+    Returns:
+        Extracted fields in the shape of a whole-document extraction
+    """
+    merged: Dict[str, Any] = {
+        "sop_id": None,
+        "title": None,
+        "category": None,
+        "triggers": [],
+        "priority_override": None,
+        "response_requirements": {"timeline": None, "notifications": [], "required_actions": []},
+        "special_conditions": {"applies_to_locations": [], "applies_to_times": [], "escalation_required": False},
+        "regulatory_requirements": []
+    }
+    best_key = None
+
+    for contribution in contributions:
+        for field in ("sop_id", "title", "category"):
+            if not merged[field] and contribution.get(field):
+                merged[field] = contribution[field]
+
+        _extend(merged["triggers"], contribution.get("triggers"))
+        _extend(merged["regulatory_requirements"], contribution.get("regulatory_requirements"))
+
+        priority = normalize_priority(contribution.get("priority_override"))
+        if priority in PRIORITY_ORDER and (
+            merged["priority_override"] is None
+            or PRIORITY_ORDER.index(priority) < PRIORITY_ORDER.index(merged["priority_override"])
+        ):
+            merged["priority_override"] = priority
+
+        requirements = contribution.get("response_requirements") or {}
+        _extend(merged["response_requirements"]["notifications"], requirements.get("notifications"))
+        _extend(merged["response_requirements"]["required_actions"], requirements.get("required_actions"))
+        timeline = requirements.get("timeline")
+        if timeline:
+            seconds, urgency = parse_timeline(timeline)
+            key = timeline_urgency_key(seconds, urgency) if seconds is not None else None
+            if key is not None and (best_key is None or key < best_key):
+                best_key = key
+                merged["response_requirements"]["timeline"] = timeline
+            elif best_key is None and merged["response_requirements"]["timeline"] is None:
+                merged["response_requirements"]["timeline"] = timeline
+
+        conditions = contribution.get("special_conditions") or {}
+        for field in ("applies_to_locations", "applies_to_times"):
+            _extend(merged["special_conditions"][field], [
+                value for value in conditions.get(field) or [] if "_".join(str(value).lower().split()) not in _UNIVERSAL
+            ])
+        if conditions.get("escalation_required"):
+            merged["special_conditions"]["escalation_required"] = True
+
+    merged["response_requirements"]["timeline"] = merged["response_requirements"]["timeline"] or "Not specified"
+    merged["special_conditions"]["applies_to_locations"] = merged["special_conditions"]["applies_to_locations"] or ["all_locations"]
+    merged["special_conditions"]["applies_to_times"] = merged["special_conditions"]["applies_to_times"] or ["all_times"]
+    return {key: value for key, value in merged.items() if value is not None or key == "priority_override"}
+
+
+def _extend(target: List[Any], values: Optional[List[Any]]) -> None:
+    """Append values not already present (compared case- and whitespace-insensitively)"""
+    seen = {" ".join(str(value).lower().split()) for value in target}
+    for value in values or []:
+        key = " ".join(str(value).lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            target.append(value)
@@ -1,17 +1,39 @@
+import hashlib
 import json
 import logging
 import openai
 import os
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+from config.settings import settings
 from sop.models import ProcessedSOP, ResponseRequirements, SpecialConditions
+from sop.extraction_cache import ExtractionCache
+from sop.sections import Section, split_sections, merge_section_extractions
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are an expert at analyzing Standard Operating Procedures (SOPs) and extracting structured information. You must return valid JSON that matches the expected schema exactly."
+
+# Sampling parameters of the extraction call (part of the prompt version)
+EXTRACTION_TEMPERATURE = 0.1  # Low temperature for consistent extraction
+EXTRACTION_MAX_TOKENS = 2000
+
+# Section extractions of every document being ingested share one pool, so the
+# number of concurrent section LLM calls is bounded however many ingestion
+# workers run (threads are started on first use)
+_section_pool = ThreadPoolExecutor(
+    max_workers=max(1, settings.sop_section_extraction_workers),
+    thread_name_prefix="sop-section"
+)
+
 class SOPExtractor:
     """Extract structured SOP information from document text using LLM"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ExtractionCache] = None):
+        # Extraction results are reused for unchanged documents when a cache is given
+        self.cache = cache
+        
         # Use existing OpenAI configuration
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key or api_key == "test-key-for-testing":
@@ -60,43 +82,24 @@ class SOPExtractor:
                     },
                     "regulatory_requirements": ["Standard compliance"]
                 }
-            else:
-                # Create LLM prompt for structure extraction
-                prompt = self._create_extraction_prompt(document_text, document_title)
-                
-                # Call OpenAI API
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert at analyzing Standard Operating Procedures (SOPs) and extracting structured information. You must return valid JSON that matches the expected schema exactly."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.1,  # Low temperature for consistent extraction
-                    max_tokens=2000
+            elif self._use_sections(document_text):
+                # Long documents are extracted per section so edits only re-extract changed sections
+                sop_data, error = self._extract_by_sections(document_text, document_title)
+                if error:
+                    return None, error
+            elif self.cache is not None:
+                # Identical (modulo whitespace) documents reuse the previous extraction
+                sop_data, error, _ = self.cache.get_or_extract(
+                    document_text, self.model, self.prompt_version,
+                    lambda: self._extract_with_llm(document_text, document_title),
+                    document_title=document_title
                 )
-                
-                # Extract response content
-                response_text = response.choices[0].message.content.strip()
-                
-                # Parse JSON response
-                try:
-                    sop_data = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    # Try to extract JSON from response if it's wrapped in markdown
-                    if "```json" in response_text:
-                        start = response_text.find("```json") + 7
-                        end = response_text.find("```", start)
-                        json_text = response_text[start:end].strip()
-                        sop_data = json.loads(json_text)
-                    else:
-                        logger.error(f"Failed to parse JSON from LLM response: {str(e)}")
-                        return None, f"Failed to parse structured data from LLM response: {str(e)}"
+                if error:
+                    return None, error
+            else:
+                sop_data, error = self._extract_with_llm(document_text, document_title)
+                if error:
+                    return None, error
             
             # Validate and create ProcessedSOP object
             processed_sop = self._create_processed_sop(sop_data, filename, document_text)
@@ -108,6 +111,110 @@ class SOPExtractor:
             logger.error(f"Error extracting SOP structure from {filename}: {str(e)}")
             return None, f"Error extracting SOP structure: {str(e)}"
     
+    @property
+    def prompt_version(self) -> str:
+        """Fingerprint of the extraction prompt and parameters; changes whenever they do"""
+        template = self._create_extraction_prompt("{document_text}", "{document_title}")
+        fingerprint = json.dumps([SYSTEM_PROMPT, template, EXTRACTION_TEMPERATURE, EXTRACTION_MAX_TOKENS])
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+    
+    @property
+    def section_prompt_version(self) -> str:
+        """Fingerprint of the section extraction prompt and parameters"""
+        template = self._create_section_prompt("{section_text}", "{document_title}")
+        fingerprint = json.dumps(["section", SYSTEM_PROMPT, template, EXTRACTION_TEMPERATURE, EXTRACTION_MAX_TOKENS])
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+    
+    def _use_sections(self, document_text: str) -> bool:
+        """Whether a document is long enough to be extracted section by section"""
+        threshold = settings.sop_section_extraction_min_chars
+        return self.cache is not None and self.cache.enabled and threshold > 0 and len(document_text) >= threshold
+    
+    def _extract_by_sections(self, document_text: str, document_title: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Extract a document section by section and merge the results
+        
+        Each section goes through the extraction cache, so only sections whose
+        text changed since a previous extraction cost an LLM call. Sections
+        are extracted concurrently on the shared section pool.
+        
+        Returns:
+            Tuple of (extracted SOP fields, error_message)
+        """
+        sections = split_sections(document_text)
+        if len(sections) < 2:
+            return self.cache.get_or_extract(
+                document_text, self.model, self.prompt_version,
+                lambda: self._extract_with_llm(document_text, document_title),
+                document_title=document_title
+            )[:2]
+        
+        def extract(section: Section):
+            return self.cache.get_or_extract(
+                section.text, self.model, self.section_prompt_version,
+                lambda: self._call_llm(self._create_section_prompt(section.text, document_title)),
+                document_title=f"{document_title} / {section.heading}" if section.heading else document_title
+            )
+        
+        results = list(_section_pool.map(extract, sections))
+        
+        errors = [f"{section.heading or 'preamble'}: {error}" for section, (_, error, _) in zip(sections, results) if error]
+        if errors:
+            return None, f"Section extraction failed ({'; '.join(errors)})"
+        
+        extracted = sum(1 for _, _, hit in results if not hit)
+        logger.info(f"Extracted {extracted} of {len(sections)} sections of {document_title} ({len(sections) - extracted} unchanged)")
+        sop_data = merge_section_extractions([sop_data for sop_data, _, _ in results])
+        # Keep the SOP identity stable across edits when no section names it
+        sop_data.setdefault("sop_id", f"SOP-{hashlib.sha256(document_title.encode('utf-8')).hexdigest()[:8].upper()}")
+        sop_data.setdefault("title", document_title)
+        return sop_data, None
+    
+    def _extract_with_llm(self, document_text: str, document_title: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Ask the LLM for the SOP structure of a document
+        
+        Returns:
+            Tuple of (extracted SOP fields, error_message)
+        """
+        # Create LLM prompt for structure extraction
+        return self._call_llm(self._create_extraction_prompt(document_text, document_title))
+    
+    def _call_llm(self, prompt: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Send an extraction prompt and parse the JSON answer"""
+        # Call OpenAI API
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=EXTRACTION_TEMPERATURE,
+            max_tokens=EXTRACTION_MAX_TOKENS
+        )
+        
+        # Extract response content
+        response_text = response.choices[0].message.content.strip()
+        
+        # Parse JSON response
+        try:
+            return json.loads(response_text), None
+        except json.JSONDecodeError as e:
+            # Try to extract JSON from response if it's wrapped in markdown
+            if "```json" in response_text:
+                start = response_text.find("```json") + 7
+                end = response_text.find("```", start)
+                json_text = response_text[start:end].strip()
+                return json.loads(json_text), None
+            logger.error(f"Failed to parse JSON from LLM response: {str(e)}")
+            return None, f"Failed to parse structured data from LLM response: {str(e)}"
+    
     def _create_extraction_prompt(self, document_text: str, document_title: str) -> str:
         """Create LLM prompt for SOP structure extraction"""
         
@@ -146,6 +253,46 @@ IMPORTANT INSTRUCTIONS:
 4. Use null for priority_override if no specific priority is mentioned
 5. Return ONLY the JSON object, no additional text
 6. Ensure all required fields have appropriate values
+"""
+        
+        return prompt
+    
+    def _create_section_prompt(self, section_text: str, document_title: str) -> str:
+        """Create LLM prompt extracting what one section contributes to its SOP"""
+        
+        prompt = f"""
+The following is ONE SECTION of a longer Standard Operating Procedure document. Extract the structured
+information THIS SECTION contributes, in JSON format. Other sections are extracted separately and merged.
+
+Document Title: {document_title}
+Section Content:
+{section_text}
+
+Return valid JSON in this shape:
+
+{{
+  "sop_id": "A unique ID like SOP-001 for the whole SOP if this section states or implies one, otherwise null",
+  "title": "Descriptive title of the whole SOP if this section gives one, otherwise null",
+  "category": "Category like 'medical_emergency', 'security_incident', 'access_control', 'environmental', etc. if evident, otherwise null",
+  "triggers": ["Event types, keywords, or situations in this section that would trigger the SOP"],
+  "priority_override": "CRITICAL, HIGH, MEDIUM, LOW, or null if this section mentions no priority",
+  "response_requirements": {{
+    "timeline": "Response time requirement stated in this section, or null",
+    "notifications": ["Who this section says must be notified"],
+    "required_actions": ["Specific actions this section says must be taken"]
+  }},
+  "special_conditions": {{
+    "applies_to_locations": ["Locations this section restricts the SOP to, or [] if none"],
+    "applies_to_times": ["Time periods like 'business_hours', 'after_hours' this section restricts the SOP to, or [] if none"],
+    "escalation_required": true/false
+  }},
+  "regulatory_requirements": ["Regulatory/compliance requirements mentioned in this section like OSHA, HIPAA, etc."]
+}}
+
+IMPORTANT INSTRUCTIONS:
+1. Only include information present in this section; use [] or null for anything it does not mention
+2. Extract triggers as specific, searchable keywords
+3. Return ONLY the JSON object, no additional text
 """
         
         return prompt
@@ -0,0 +1,375 @@
+"""
+Process-wide, pre-compiled view of the SOP knowledge base.
+
+SOPContextualSearch used to open a connection, SELECT and json.loads every SOP
+and then compare every event keyword against every trigger on each call. The
+snapshot parses each SOP once into a slotted CompiledSOP and keeps inverted
+indexes from whitespace tokens to the SOPs (and triggers) that contain them,
+so a search only touches the postings its keywords match.
+
+Keywords are matched by substring, exactly like the original scan: because an
+event keyword never contains whitespace, "keyword in text" is equivalent to
+"keyword is a substring of one of text's whitespace tokens". Each distinct
+keyword is expanded against the token vocabulary once and memoized until the
+corpus changes.
+
+VectorIndexer reports the SOP ids it writes or deletes through
+notify_sop_changes(), and the snapshot applies just those rows on its next
+refresh. Writes from other processes are detected with sop_stats.change_count,
+a counter the sops triggers bump on every write, and trigger a full reload.
+Unlike PRAGMA data_version it ignores writes to the other tables sharing the
+database (processing jobs, the extraction cache), so those never invalidate
+the snapshot. Databases without the counter fall back to data_version, which
+is per connection, so the snapshot keeps a dedicated (tuned) connection from
+the shared SOPStorage.
+
+The snapshot also maintains the SOPs' location and time applicability index,
+so a search for a specific event skips SOPs scoped to other sites or hours
+before scoring.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sop.applicability import ApplicabilityIndex
+from sop.storage import get_sop_storage
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledSOP:
+    """Pre-parsed SOP with the lowercased token sets used for matching"""
+
+    __slots__ = (
+        "sop_id", "category", "triggers", "payload",
+        "title_tokens", "text_tokens", "trigger_tokens"
+    )
+
+    def __init__(self, sop_id: str, category: Optional[str], sop_data: Dict[str, Any], search_text: str):
+        self.sop_id = sop_id
+        self.category = category
+        self.triggers: List[str] = sop_data.get('triggers', [])
+        self.payload = {
+            "sop_id": sop_data.get('sop_id'),
+            "title": sop_data.get('title'),
+            "category": sop_data.get('category'),
+            "priority_override": sop_data.get('priority_override'),
+            "response_requirements": sop_data.get('response_requirements'),
+            "special_conditions": sop_data.get('special_conditions'),
+            "regulatory_requirements": sop_data.get('regulatory_requirements', []),
+            "triggers": self.triggers
+        }
+        self.title_tokens: Set[str] = set((sop_data.get('title') or '').lower().split())
+        self.text_tokens: Set[str] = set((search_text or '').lower().split())
+        # token -> indexes of the triggers containing it
+        self.trigger_tokens: Dict[str, Set[int]] = {}
+        for index, trigger in enumerate(self.triggers):
+            for token in trigger.lower().split():
+                self.trigger_tokens.setdefault(token, set()).add(index)
+
+
+class KeywordMatch:
+    """Postings reached by one event keyword"""
+
+    __slots__ = ("trigger_hits", "title_hits", "text_hits")
+
+    def __init__(self):
+        self.trigger_hits: Dict[str, Set[int]] = {}
+        self.title_hits: Set[str] = set()
+        self.text_hits: Set[str] = set()
+
+
+class SOPSnapshot:
+    """In-memory SOP corpus with inverted indexes, refreshed incrementally"""
+
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(db_path)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._change_marker: Optional[Tuple[str, int]] = None
+        self._seen_change_counter = 0
+        self._error: Optional[str] = None
+        self._sops: Dict[str, CompiledSOP] = {}
+        self._trigger_postings: Dict[str, Dict[str, Set[int]]] = {}
+        self._title_postings: Dict[str, Set[str]] = {}
+        self._text_postings: Dict[str, Set[str]] = {}
+        self._keyword_cache: Dict[str, KeywordMatch] = {}
+        self._applicability = ApplicabilityIndex()
+
+    def __len__(self) -> int:
+        return len(self._sops)
+
+    @property
+    def error(self) -> Optional[str]:
+        """Why the snapshot could not be loaded, or None when it is usable"""
+        return self._error
+
+    def refresh(self) -> None:
+        """Bring the snapshot up to date with the database"""
+        with self._lock:
+            try:
+                if self._conn is None and not self._connect():
+                    return
+
+                change_marker = self._read_change_marker()
+                change_counter, upserted, deleted = _take_pending_changes(self.db_path, self._seen_change_counter)
+
+                if self._change_marker is None:
+                    self._full_reload()
+                elif upserted or deleted:
+                    self._apply_changes(upserted, deleted)
+                elif change_marker != self._change_marker:
+                    logger.info(f"SOP database changed outside this process, reloading snapshot for {self.db_path}")
+                    self._full_reload()
+
+                self._change_marker = change_marker
+                self._seen_change_counter = change_counter
+
+            except sqlite3.Error as e:
+                logger.error(f"Error refreshing SOP snapshot: {e}")
+                self._error = f"Database error: {str(e)}"
+                self._close()
+
+    def search(self, event_context: str, category_filter: Optional[str] = None,
+               max_results: int = 3, location: Optional[List[str]] = None,
+               when: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Score SOPs against an event context.
+
+        Scoring matches the original scan: +2 per (trigger, keyword) substring
+        match, +1 per keyword found in the title and +0.5 per keyword found in
+        the searchable text, normalized by the number of keywords. With a
+        location path and/or time, SOPs that do not apply there are skipped.
+        """
+        event_keywords = event_context.lower().split()
+        if not event_keywords:
+            return []
+
+        with self._lock:
+            excluded = self._applicability.excluded(location, when)
+            scores: Dict[str, float] = {}
+            matched_indexes: Dict[str, Set[int]] = {}
+
+            for keyword in event_keywords:
+                match = self._match_keyword(keyword)
+                for sop_id, indexes in match.trigger_hits.items():
+                    if sop_id in excluded:
+                        continue
+                    scores[sop_id] = scores.get(sop_id, 0) + 2 * len(indexes)
+                    matched_indexes.setdefault(sop_id, set()).update(indexes)
+                for sop_id in match.title_hits:
+                    if sop_id not in excluded:
+                        scores[sop_id] = scores.get(sop_id, 0) + 1
+                for sop_id in match.text_hits:
+                    if sop_id not in excluded:
+                        scores[sop_id] = scores.get(sop_id, 0) + 0.5
+
+            candidates = []
+            for sop_id, score in scores.items():
+                compiled = self._sops[sop_id]
+                if category_filter and compiled.category != category_filter:
+                    continue
+                if score > 0:
+                    candidates.append((compiled, min(score / len(event_keywords), 1.0)))
+
+            # Same ordering as before: sop_id DESC, then a stable sort by score
+            candidates.sort(key=lambda item: item[0].sop_id, reverse=True)
+            candidates.sort(key=lambda item: item[1], reverse=True)
+
+            results = []
+            for compiled, similarity_score in candidates[:max_results]:
+                matched_triggers = []
+                for index in sorted(matched_indexes.get(compiled.sop_id, ())):
+                    trigger = compiled.triggers[index]
+                    if trigger not in matched_triggers:
+                        matched_triggers.append(trigger)
+
+                result = dict(compiled.payload)
+                result["similarity_score"] = similarity_score
+                result["matched_triggers"] = matched_triggers
+                results.append(result)
+
+            return results
+
+    def applicable_scope(self, location: Optional[List[str]] = None,
+                         when: Optional[datetime] = None) -> FrozenSet[str]:
+        """The location- or time-scoped SOPs that apply to an event (all other SOPs always apply)"""
+        with self._lock:
+            return self._applicability.applicable(location, when)
+
+    def count(self, category_filter: Optional[str] = None) -> int:
+        """Number of SOPs, optionally restricted to a category"""
+        with self._lock:
+            if not category_filter:
+                return len(self._sops)
+            return sum(1 for compiled in self._sops.values() if compiled.category == category_filter)
+
+    def _connect(self) -> bool:
+        if not os.path.exists(self.db_path):
+            self._error = f"Database file does not exist: {self.db_path}"
+            return False
+        self._conn = get_sop_storage(self.db_path).connect()
+        return True
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._change_marker = None
+
+    def _read_change_marker(self) -> Tuple[str, int]:
+        """Number of writes to sops, or the connection's data_version for databases without the counter"""
+        try:
+            row = self._conn.execute('SELECT change_count FROM sop_stats WHERE id = 1').fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is not None:
+            return "sops", row[0]
+        return "data_version", self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _full_reload(self) -> None:
+        table = self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='sops'"
+        ).fetchone()
+        self._sops.clear()
+        self._trigger_postings.clear()
+        self._title_postings.clear()
+        self._text_postings.clear()
+        self._keyword_cache.clear()
+        self._applicability.clear()
+
+        if not table:
+            self._error = "SOPs table does not exist in database"
+            return
+
+        rows = self._conn.execute('SELECT sop_id, category, data, searchable_text FROM sops').fetchall()
+        for row in rows:
+            self._add_row(row)
+
+        self._error = None
+        self.version += 1
+        logger.info(f"Loaded SOP snapshot with {len(self._sops)} SOPs from {self.db_path}")
+
+    def _apply_changes(self, upserted: Set[str], deleted: Set[str]) -> None:
+        for sop_id in upserted | deleted:
+            self._remove_sop(sop_id)
+
+        if upserted:
+            placeholders = ",".join("?" * len(upserted))
+            rows = self._conn.execute(
+                f'SELECT sop_id, category, data, searchable_text FROM sops WHERE sop_id IN ({placeholders})',
+                tuple(upserted)
+            ).fetchall()
+            for row in rows:
+                self._add_row(row)
+
+        self._keyword_cache.clear()
+        self._error = None
+        self.version += 1
+        logger.debug(f"Applied {len(upserted)} updated and {len(deleted)} deleted SOPs to snapshot")
+
+    def _add_row(self, row: Tuple[str, Optional[str], str, Optional[str]]) -> None:
+        sop_id, category, data_json, search_text = row
+        try:
+            compiled = CompiledSOP(sop_id, category, json.loads(data_json), search_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing SOP data for {sop_id}: {e}")
+            return
+
+        self._sops[sop_id] = compiled
+        self._applicability.add(sop_id, compiled.payload["special_conditions"])
+        for token, indexes in compiled.trigger_tokens.items():
+            self._trigger_postings.setdefault(token, {})[sop_id] = indexes
+        for token in compiled.title_tokens:
+            self._title_postings.setdefault(token, set()).add(sop_id)
+        for token in compiled.text_tokens:
+            self._text_postings.setdefault(token, set()).add(sop_id)
+
+    def _remove_sop(self, sop_id: str) -> None:
+        compiled = self._sops.pop(sop_id, None)
+        if compiled is None:
+            return
+        self._applicability.remove(sop_id)
+
+        for token in compiled.trigger_tokens:
+            postings = self._trigger_postings.get(token)
+            if postings is not None:
+                postings.pop(sop_id, None)
+                if not postings:
+                    del self._trigger_postings[token]
+        for token in compiled.title_tokens:
+            _discard_posting(self._title_postings, token, sop_id)
+        for token in compiled.text_tokens:
+            _discard_posting(self._text_postings, token, sop_id)
+
+    def _match_keyword(self, keyword: str) -> KeywordMatch:
+        match = self._keyword_cache.get(keyword)
+        if match is not None:
+            return match
+
+        match = KeywordMatch()
+        for token, postings in self._trigger_postings.items():
+            if keyword in token:
+                for sop_id, indexes in postings.items():
+                    match.trigger_hits.setdefault(sop_id, set()).update(indexes)
+        for token, sop_ids in self._title_postings.items():
+            if keyword in token:
+                match.title_hits.update(sop_ids)
+        for token, sop_ids in self._text_postings.items():
+            if keyword in token:
+                match.text_hits.update(sop_ids)
+
+        self._keyword_cache[keyword] = match
+        return match
+
+
+def _discard_posting(postings: Dict[str, Set[str]], token: str, sop_id: str) -> None:
+    sop_ids = postings.get(token)
+    if sop_ids is not None:
+        sop_ids.discard(sop_id)
+        if not sop_ids:
+            del postings[token]
+
+
+# Process-wide registry of snapshots and pending in-process changes, keyed by database path
+_registry_lock = threading.Lock()
+_snapshots: Dict[str, SOPSnapshot] = {}
+_change_counters: Dict[str, int] = {}
+_pending_upserts: Dict[str, Set[str]] = {}
+_pending_deletes: Dict[str, Set[str]] = {}
+
+
+def get_sop_snapshot(db_path: str) -> SOPSnapshot:
+    """Get the shared, up-to-date snapshot for a database"""
+    db_path = os.path.abspath(db_path)
+    with _registry_lock:
+        snapshot = _snapshots.get(db_path)
+        if snapshot is None:
+            snapshot = _snapshots[db_path] = SOPSnapshot(db_path)
+    snapshot.refresh()
+    return snapshot
+
+
+def notify_sop_changes(db_path: str, upserted: Iterable[str] = (), deleted: Iterable[str] = ()) -> None:
+    """Record SOP ids written or deleted by this process so snapshots refresh incrementally"""
+    db_path = os.path.abspath(db_path)
+    with _registry_lock:
+        _change_counters[db_path] = _change_counters.get(db_path, 0) + 1
+        # Without a snapshot there is nothing to update incrementally
+        if db_path in _snapshots:
+            _pending_upserts.setdefault(db_path, set()).update(upserted)
+            _pending_deletes.setdefault(db_path, set()).update(deleted)
+
+
+def _take_pending_changes(db_path: str, seen_counter: int) -> Tuple[int, Set[str], Set[str]]:
+    with _registry_lock:
+        counter = _change_counters.get(db_path, 0)
+        if counter == seen_counter:
+            return counter, set(), set()
+        return counter, _pending_upserts.pop(db_path, set()), _pending_deletes.pop(db_path, set())
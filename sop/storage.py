@@ -0,0 +1,147 @@
+"""
+Shared SQLite storage for the SOP knowledge base.
+
+VectorIndexer used to share one connection across FastAPI's threadpool with
+no lock, and SOPContextualSearch opened a new connection on every call. Both
+now go through one SOPStorage per database file:
+
+- the database runs in WAL mode, so readers never block on the writer
+- each thread gets its own long-lived read connection, closed when the
+  thread exits
+- all writes go through a single writer connection, serialized by a lock
+- every connection keeps a cache of prepared statements, so queries written
+  as constant SQL strings are compiled once per connection
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Reader:
+    """Holds a thread's read connection; the connection is closed when the thread's locals are freed"""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class SOPStorage:
+    """Per-thread read connections and a serialized writer for one SOP database"""
+
+    def __init__(self, db_path: str, mmap_size: Optional[int] = None, cache_size_kb: Optional[int] = None,
+                 busy_timeout_ms: Optional[int] = None, cached_statements: Optional[int] = None):
+        self.db_path = os.path.abspath(db_path)
+        self.mmap_size = settings.sop_db_mmap_size if mmap_size is None else mmap_size
+        self.cache_size_kb = settings.sop_db_cache_size if cache_size_kb is None else cache_size_kb
+        self.busy_timeout_ms = settings.sop_db_busy_timeout if busy_timeout_ms is None else busy_timeout_ms
+        self.cached_statements = settings.sop_db_cached_statements if cached_statements is None else cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        # thread id -> read connection, so close() can reach every thread's connection
+        self._readers: Dict[int, sqlite3.Connection] = {}
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new tuned connection (for callers that need a dedicated one)"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = {-int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def read(self) -> sqlite3.Connection:
+        """The calling thread's read connection, opened on first use"""
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            conn = self.connect()
+            reader = self._local.reader = _Reader(conn)
+            ident = threading.get_ident()
+            with self._lock:
+                self._readers[ident] = conn
+            # Short-lived pool threads would otherwise leave their connection open
+            weakref.finalize(reader, self._release_reader, ident, conn)
+        return reader.conn
+
+    def _release_reader(self, ident: int, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if self._readers.get(ident) is conn:
+                del self._readers[ident]
+        conn.close()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the writer connection for one transaction.
+
+        Commits when the block completes and rolls back if it raises. Nested
+        use on the same thread joins the outer transaction.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self.connect()
+            conn = self._writer
+            outermost = not conn.in_transaction
+            try:
+                yield conn
+            except BaseException:
+                if outermost:
+                    conn.rollback()
+                raise
+            else:
+                if outermost:
+                    conn.commit()
+
+    def close(self) -> None:
+        """Close the writer and every thread's read connection"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+        for conn in readers:
+            conn.close()
+        # Threads that cached a closed connection reopen on their next read()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of open connections"""
+        with self._lock:
+            return {
+                "read_connections": len(self._readers),
+                "writer_open": self._writer is not None
+            }
+
+
+# Process-wide storage per database path
+_registry_lock = threading.Lock()
+_storages: Dict[str, SOPStorage] = {}
+
+
+def get_sop_storage(db_path: str) -> SOPStorage:
+    """Get the shared storage for a database, creating it on first use"""
+    db_path = os.path.abspath(db_path)
+    with _registry_lock:
+        storage = _storages.get(db_path)
+        if storage is None:
+            storage = _storages[db_path] = SOPStorage(db_path)
+        return storage
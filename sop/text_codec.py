@@ -0,0 +1,135 @@
+"""
+Compression of stored SOP document text.
+
+Original document text is the largest thing in the SOP database and is only
+read when a single SOP is opened or exported. It is stored compressed with
+zlib, or with zstd when the zstandard package is installed, using a
+dictionary trained on the corpus itself: SOPs share most of their headings
+and boilerplate, which a per-document compressor cannot exploit on its own.
+Texts too short to benefit are stored as-is.
+"""
+
+import logging
+import zlib
+from collections import Counter
+from typing import List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    # zstd is optional; zlib is always available
+    zstandard = None
+
+PLAIN = "plain"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+# Texts shorter than this are not worth compressing
+MIN_COMPRESS_BYTES = 256
+
+# zlib can only reference the last 32 KiB of its preset dictionary
+DICTIONARY_SIZE = 32 * 1024
+
+
+def resolve_codec(name: str) -> str:
+    """
+    Codec to use for a configured name
+
+    Supported values:
+        auto (zstd if installed, otherwise zlib), zstd, zlib, none
+
+    Returns:
+        PLAIN, ZLIB or ZSTD
+    """
+    name = (name or "").strip().lower()
+    if name in ("none", "off", PLAIN):
+        return PLAIN
+    if name in ("auto", ZSTD):
+        if zstandard is not None:
+            return ZSTD
+        if name == ZSTD:
+            logger.warning("zstandard is not installed, compressing SOP text with zlib")
+        return ZLIB
+    if name == ZLIB:
+        return ZLIB
+    raise ValueError(f"Unknown SOP text compression: {name}")
+
+
+def train_dictionary(codec: str, samples: List[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Train a compression dictionary on sample texts
+
+    For zstd this is zstd's own dictionary trainer. For zlib the dictionary
+    is the lines that recur across documents (headings, boilerplate), least
+    common first, since zlib reaches the end of its dictionary most cheaply.
+
+    Args:
+        codec: ZLIB or ZSTD
+        samples: Document texts to train on
+        size: Maximum dictionary size in bytes
+
+    Returns:
+        Dictionary bytes (empty when the samples share nothing useful)
+    """
+    if codec == ZSTD:
+        try:
+            return zstandard.train_dictionary(size, [sample.encode("utf-8") for sample in samples]).as_bytes()
+        except zstandard.ZstdError as e:
+            # The trainer needs a reasonable number of samples; fall back to shared lines
+            logger.warning(f"zstd dictionary training failed ({e}), using shared lines")
+
+    document_frequency = Counter()
+    for sample in samples:
+        document_frequency.update({line.strip() for line in sample.splitlines() if len(line.strip()) > 3})
+    shared = [line for line, count in document_frequency.items() if count > 1]
+    shared.sort(key=lambda line: (document_frequency[line], len(line)))
+
+    dictionary = "\n".join(shared).encode("utf-8")
+    return dictionary[-size:]
+
+
+def compress_text(text: str, codec: str, level: int,
+                  dictionary: Optional[bytes] = None) -> Tuple[str, Union[str, bytes]]:
+    """
+    Compress a document text for storage
+
+    Returns:
+        Tuple of (codec actually used, stored value); short texts and texts
+        that do not shrink are returned unchanged with codec PLAIN
+    """
+    raw = text.encode("utf-8")
+    if codec == PLAIN or len(raw) < MIN_COMPRESS_BYTES:
+        return PLAIN, text
+
+    if codec == ZSTD:
+        compressor = zstandard.ZstdCompressor(
+            level=level,
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        )
+        compressed = compressor.compress(raw)
+    else:
+        compressor = zlib.compressobj(level, zdict=dictionary) if dictionary else zlib.compressobj(level)
+        compressed = compressor.compress(raw) + compressor.flush()
+
+    if len(compressed) >= len(raw):
+        return PLAIN, text
+    return codec, compressed
+
+
+def decompress_text(codec: str, value: Union[str, bytes], dictionary: Optional[bytes] = None) -> str:
+    """Inverse of compress_text"""
+    if codec == PLAIN:
+        return value
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("SOP text is zstd-compressed but zstandard is not installed")
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        )
+        return decompressor.decompress(value).decode("utf-8")
+    if codec == ZLIB:
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return (decompressor.decompress(value) + decompressor.flush()).decode("utf-8")
+    raise ValueError(f"Unknown SOP text codec: {codec}")
@@ -0,0 +1,215 @@
+"""
+Streaming receipt of uploaded SOP documents.
+
+Declaring the upload as an UploadFile makes FastAPI parse the whole multipart
+body before the handler runs, and the handler then read it all into memory
+to check its size. Instead the request body is parsed as it arrives, and the
+file part is written straight to a private temp directory in chunks while
+it is hashed. An upload is rejected as soon as it is known to be too large:
+from its Content-Length before any body is read, otherwise as soon as the
+bytes written pass the limit. Other form fields are discarded unread, so no
+part of the request is ever held in memory whole.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import unicodedata
+from typing import List, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Longest filename kept (bytes on most filesystems)
+MAX_FILENAME_LENGTH = 255
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.\- ]+")
+
+
+class InvalidUploadError(ValueError):
+    """Raised for a request that is not a valid upload of an accepted file"""
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload exceeds the size limit"""
+
+
+class StoredUpload:
+    """An uploaded file written to its own temp directory"""
+    __slots__ = ("filename", "path", "size", "sha256")
+
+    def __init__(self, filename: str, path: str, size: int, sha256: str):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def remove(self) -> None:
+        """Delete the file and its temp directory"""
+        shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """
+    A filename that is safe to create in a temp directory
+
+    Drops any directory components (either separator), control and unusual
+    characters and leading dots, keeping the extension.
+    """
+    name = unicodedata.normalize("NFKC", filename or "").replace("\\", "/").split("/")[-1]
+    name = _UNSAFE_FILENAME_CHARS.sub("_", name).strip(" ._")
+    stem, ext = os.path.splitext(name)
+    if not stem:
+        stem = "upload"
+    return stem[:MAX_FILENAME_LENGTH - len(ext)] + ext
+
+
+async def receive_upload(request: Request, max_bytes: int, allowed_extensions: List[str],
+                         field: str = "file") -> StoredUpload:
+    """
+    Stream a multipart/form-data file upload to disk
+
+    Args:
+        request: The upload request; its body must not have been read
+        max_bytes: Largest file accepted
+        allowed_extensions: Accepted (lowercase) file extensions, e.g. [".md"]
+        field: Form field carrying the file
+
+    Returns:
+        The stored upload; the caller owns (and must remove) the file
+
+    Raises:
+        InvalidUploadError: Not multipart, no file in the field, or an unsupported file type
+        UploadTooLargeError: The file is larger than max_bytes
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLargeError(
+            f"Upload of {content_length} bytes exceeds maximum allowed size of {max_bytes} bytes"
+        )
+
+    state = _UploadState(field, max_bytes, allowed_extensions, tempfile.mkdtemp(prefix="sop-upload-"))
+    parser = MultipartParser(boundary, {
+        "on_part_begin": state.on_part_begin,
+        "on_header_field": state.on_header_field,
+        "on_header_value": state.on_header_value,
+        "on_header_end": state.on_header_end,
+        "on_headers_finished": state.on_headers_finished,
+        "on_part_data": state.on_part_data,
+        "on_part_end": state.on_part_end
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # Disk writes go to the threadpool so the event loop never waits on them
+            await run_in_threadpool(state.flush)
+        parser.finalize()
+        await run_in_threadpool(state.close)
+
+        if state.path is None or not state.finished:
+            raise InvalidUploadError(f"No file found in form field '{field}'")
+        return StoredUpload(state.filename, state.path, state.size, state.hash.hexdigest())
+    except BaseException:
+        state.close()
+        shutil.rmtree(state.directory, ignore_errors=True)
+        raise
+
+
+class _UploadState:
+    """Multipart parser callbacks writing one file field to disk"""
+
+    def __init__(self, field: str, max_bytes: int, allowed_extensions: List[str], directory: str):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.allowed_extensions = allowed_extensions
+        self.directory = directory
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self.finished = False
+        self._handle = None
+        self._pending: List[bytes] = []
+        self._headers: dict = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("utf-8", "replace") != self.field or self.path is not None:
+            return
+        if b"filename" not in options:
+            raise InvalidUploadError(f"Form field '{self.field}' is not a file")
+
+        self.filename = safe_filename(options[b"filename"].decode("utf-8", "replace"))
+        ext = os.path.splitext(self.filename.lower())[1]
+        if ext not in self.allowed_extensions:
+            raise InvalidUploadError(
+                f"Unsupported file type. Supported types: {', '.join(self.allowed_extensions)}"
+            )
+        self.path = os.path.join(self.directory, self.filename)
+        self._handle = open(self.path, "wb")
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(
+                f"File exceeds maximum allowed size of {self.max_bytes} bytes"
+            )
+        piece = data[start:end]
+        self.hash.update(piece)
+        self._pending.append(piece)
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.finished = True
+
+    def flush(self) -> None:
+        if self._pending:
+            self._handle.write(b"".join(self._pending))
+            self._pending = []
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self.flush()
+            self._handle.close()
+            self._handle = None
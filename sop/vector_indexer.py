@@ -1,19 +1,179 @@
 import json
 import logging
 import os
-from typing import List, Dict, Any, Optional
-from sop.models import ProcessedSOP, SOPSearchResult
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+from pydantic import ValidationError
+from config.settings import settings
+from sop.models import ProcessedSOP, SOPSearchResult, BulkIndexResult, BulkIndexFailure
+from sop.embeddings import BaseEmbedder, get_embedder
+from sop.embedding_index import EmbeddingIndex
+from sop.sop_snapshot import notify_sop_changes
+from sop.storage import get_sop_storage
+from sop.normalization import parse_timeline
+from sop.text_codec import PLAIN, resolve_codec, train_dictionary, compress_text, decompress_text
 
-# Use simple in-memory storage instead of vector database for testing
+import numpy as np
 import sqlite3
 import hashlib
+import base64
+import re
 
 logger = logging.getLogger(__name__)
 
+# Sentinel so callers can explicitly pass embedder=None to disable embeddings
+_DEFAULT_EMBEDDER = object()
+
+# Default minimum fraction of query terms matched when searching without embeddings
+TEXT_SIMILARITY_THRESHOLD = 0.7
+
+# BM25 weight of each full-text column (sop_id is stored but not indexed)
+FTS_COLUMN_WEIGHTS = {
+    "sop_id": 0.0,
+    "title": 10.0,
+    "category": 2.0,
+    "triggers": 8.0,
+    "actions": 3.0,
+    "regulatory": 1.5
+}
+
+# Column values of a sops row in the full-text index; {row} is new, old or a table alias
+_FTS_VALUES = """
+    {row}.rowid,
+    {row}.sop_id,
+    {row}.title,
+    {row}.category,
+    (SELECT group_concat(value, '; ') FROM json_each({row}.data, '$.triggers')),
+    (SELECT group_concat(value, '; ') FROM (
+        SELECT value FROM json_each({row}.data, '$.response_requirements.required_actions')
+        UNION ALL
+        SELECT value FROM json_each({row}.data, '$.response_requirements.notifications')
+    )),
+    (SELECT group_concat(value, '; ') FROM json_each({row}.data, '$.regulatory_requirements'))
+"""
+
+_FTS_COLUMNS = "rowid, " + ", ".join(FTS_COLUMN_WEIGHTS)
+
+# Keep sops_fts in sync with every write to sops
+_FTS_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS sops_fts_insert AFTER INSERT ON sops BEGIN
+        INSERT INTO sops_fts ({_FTS_COLUMNS}) VALUES ({_FTS_VALUES.format(row="new")});
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS sops_fts_delete AFTER DELETE ON sops BEGIN
+        DELETE FROM sops_fts WHERE rowid = old.rowid;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS sops_fts_update AFTER UPDATE ON sops BEGIN
+        DELETE FROM sops_fts WHERE rowid = old.rowid;
+        INSERT INTO sops_fts ({_FTS_COLUMNS}) VALUES ({_FTS_VALUES.format(row="new")});
+    END'''
+]
+
+# Single-row summary of the corpus, maintained by triggers so stats never scan sops
+_STATS_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_insert AFTER INSERT ON sops BEGIN
+        UPDATE sop_stats SET
+            sop_count = sop_count + 1,
+            corpus_bytes = corpus_bytes + length(CAST(new.data AS BLOB)),
+            trigger_count = trigger_count + ifnull(json_array_length(new.data, '$.triggers'), 0),
+            last_indexed_at = max(ifnull(last_indexed_at, ''), new.processed_date)
+        WHERE id = 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_update AFTER UPDATE ON sops BEGIN
+        UPDATE sop_stats SET
+            corpus_bytes = corpus_bytes - length(CAST(old.data AS BLOB)) + length(CAST(new.data AS BLOB)),
+            trigger_count = trigger_count - ifnull(json_array_length(old.data, '$.triggers'), 0)
+                + ifnull(json_array_length(new.data, '$.triggers'), 0),
+            last_indexed_at = max(ifnull(last_indexed_at, ''), new.processed_date)
+        WHERE id = 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_delete AFTER DELETE ON sops BEGIN
+        UPDATE sop_stats SET
+            sop_count = sop_count - 1,
+            corpus_bytes = corpus_bytes - length(CAST(old.data AS BLOB)),
+            trigger_count = trigger_count - ifnull(json_array_length(old.data, '$.triggers'), 0)
+        WHERE id = 1;
+    END''',
+    # Stored original text counts towards the corpus size too
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_text_insert AFTER INSERT ON sop_texts BEGIN
+        UPDATE sop_stats SET corpus_bytes = corpus_bytes + length(CAST(new.original_text AS BLOB)) WHERE id = 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_text_update AFTER UPDATE ON sop_texts BEGIN
+        UPDATE sop_stats SET corpus_bytes = corpus_bytes - length(CAST(old.original_text AS BLOB))
+            + length(CAST(new.original_text AS BLOB)) WHERE id = 1;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS sop_stats_text_delete AFTER DELETE ON sop_texts BEGIN
+        UPDATE sop_stats SET corpus_bytes = corpus_bytes - length(CAST(old.original_text AS BLOB)) WHERE id = 1;
+    END'''
+]
+
+# Count writes to sops, so SOPSnapshot can tell SOP changes from writes to the
+# other tables sharing the database (jobs, caches)
+_CHANGE_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS sop_changes_{event.lower()} AFTER {event} ON sops BEGIN
+        UPDATE sop_stats SET change_count = change_count + 1 WHERE id = 1;
+    END'''
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+# Fields list_sops can project, with the SQL that reads each one. Only
+# original_text touches sop_texts; JSON fields are extracted from sops.data.
+LIST_FIELDS = {
+    "sop_id": "s.sop_id",
+    "title": "s.title",
+    "category": "s.category",
+    "triggers": "json_extract(s.data, '$.triggers')",
+    "priority_override": "s.priority_override",
+    "response_requirements": "json_extract(s.data, '$.response_requirements')",
+    "special_conditions": "json_extract(s.data, '$.special_conditions')",
+    "regulatory_requirements": "json_extract(s.data, '$.regulatory_requirements')",
+    "document_source": "s.document_source",
+    "processed_date": "s.processed_date",
+    "original_text": "t.original_text"
+}
+_JSON_LIST_FIELDS = {"triggers", "response_requirements", "special_conditions", "regulatory_requirements"}
+
+# Listing returns everything but the document text unless it is asked for
+DEFAULT_LIST_FIELDS = [field for field in LIST_FIELDS if field != "original_text"]
+
+# Constant SQL for the hot write paths, so each connection's statement cache reuses them
+# Upsert (not INSERT OR REPLACE) so the full-text index update trigger fires
+_UPSERT_SOP_SQL = '''
+    INSERT INTO sops
+    (sop_id, data, title, category, priority_override, document_source, processed_date, searchable_text)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(sop_id) DO UPDATE SET
+        data = excluded.data,
+        title = excluded.title,
+        category = excluded.category,
+        priority_override = excluded.priority_override,
+        document_source = excluded.document_source,
+        processed_date = excluded.processed_date,
+        searchable_text = excluded.searchable_text
+'''
+
+_UPSERT_TEXT_SQL = '''
+    INSERT INTO sop_texts (sop_id, original_text, codec, dict_id, raw_bytes) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(sop_id) DO UPDATE SET
+        original_text = excluded.original_text,
+        codec = excluded.codec,
+        dict_id = excluded.dict_id,
+        raw_bytes = excluded.raw_bytes
+'''
+
+# Texts recompressed per write transaction when a new dictionary is trained
+_RECOMPRESS_BATCH_SIZE = 200
+
+_STORE_EMBEDDINGS_SQL = '''
+    INSERT OR REPLACE INTO sop_embeddings (sop_id, model, dimension, vectors)
+    VALUES (?, ?, ?, ?)
+'''
+
 class VectorIndexer:
-    """Simple SQLite-based storage for SOPs without vector embeddings for testing"""
+    """SQLite-based SOP storage with an in-memory embedding index for semantic search"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, embedder: Optional[BaseEmbedder] = _DEFAULT_EMBEDDER):
         try:
             # Initialize SQLite database with consistent path
             if db_path is None:
@@ -26,20 +186,60 @@ class VectorIndexer:
                 os.makedirs(db_dir, exist_ok=True)
             
             # Create database and table
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS sops (
-                    sop_id TEXT PRIMARY KEY,
-                    data TEXT NOT NULL,
-                    title TEXT,
-                    category TEXT,
-                    priority_override TEXT,
-                    document_source TEXT,
-                    processed_date TEXT,
-                    searchable_text TEXT
-                )
-            ''')
-            self.conn.commit()
+            self.storage = get_sop_storage(self.db_path)
+            with self.storage.write() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS sops (
+                        sop_id TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        title TEXT,
+                        category TEXT,
+                        priority_override TEXT,
+                        document_source TEXT,
+                        processed_date TEXT,
+                        searchable_text TEXT
+                    )
+                ''')
+                # Passage embeddings persisted alongside the SOP rows
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS sop_embeddings (
+                        sop_id TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        dimension INTEGER NOT NULL,
+                        vectors BLOB NOT NULL
+                    )
+                ''')
+                # Original document text is kept out of sops so listings never read it,
+                # compressed with codec (and dictionary dict_id) when that pays off
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS sop_texts (
+                        sop_id TEXT PRIMARY KEY,
+                        original_text TEXT NOT NULL,
+                        codec TEXT NOT NULL DEFAULT 'plain',
+                        dict_id INTEGER,
+                        raw_bytes INTEGER
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS sop_texts_delete AFTER DELETE ON sops BEGIN
+                        DELETE FROM sop_texts WHERE sop_id = old.sop_id;
+                    END
+                ''')
+            self._init_stats()
+            self._init_text_compression()
+            self._migrate_original_text()
+            self._migrate_timelines()
+            self.fts_enabled = self._init_fts()
+            
+            # Build the in-memory search index from persisted embeddings
+            self.embedder = get_embedder() if embedder is _DEFAULT_EMBEDDER else embedder
+            self.embedding_index = EmbeddingIndex(self.embedder.dimension) if self.embedder else None
+            self._search_metadata: Dict[str, Dict[str, Any]] = {}
+            # sop_stats.change_count the in-memory index reflects; other processes' writes move it on
+            self._embeddings_change_count: Optional[int] = None
+            self._embeddings_lock = threading.Lock()
+            if self.embedder:
+                self._load_embeddings()
             
             logger.info(f"Vector indexer initialized with SQLite database at {db_path}")
             
@@ -63,22 +263,25 @@ class VectorIndexer:
             # Create searchable text combining key fields
             searchable_text = self._create_searchable_text(sop)
             
+            # Embed passages at index time so searches only embed the query
+            if self.embedder:
+                vectors = self.embedder.embed_many(self._create_passages(sop, searchable_text))
+            
             # Store in SQLite
-            self.conn.execute('''
-                INSERT OR REPLACE INTO sops 
-                (sop_id, data, title, category, priority_override, document_source, processed_date, searchable_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                sop.sop_id,
-                sop.model_dump_json(),
-                sop.title,
-                sop.category,
-                sop.priority_override,
-                sop.document_source,
-                sop.processed_date.isoformat(),
-                searchable_text
-            ))
-            self.conn.commit()
+            with self.storage.write() as conn:
+                in_sync = self._embeddings_in_sync(conn)
+                conn.execute(_UPSERT_SOP_SQL, self._sop_row(sop, searchable_text))
+                self._store_text(conn, sop.sop_id, sop.original_text)
+                if self.embedder:
+                    self._store_embeddings(conn, sop.sop_id, vectors)
+                self._advance_embeddings(conn, in_sync)
+            
+            notify_sop_changes(self.db_path, upserted=[sop.sop_id])
+            self._maybe_train_text_dictionary()
+            
+            if self.embedder:
+                self.embedding_index.add(sop.sop_id, vectors)
+                self._search_metadata[sop.sop_id] = self._create_search_metadata(sop.model_dump(mode='json'))
             
             logger.info(f"Successfully indexed SOP {sop.sop_id} in database")
             return True, None
@@ -87,14 +290,145 @@ class VectorIndexer:
             logger.error(f"Error indexing SOP {sop.sop_id}: {str(e)}")
             return False, f"Error indexing SOP: {str(e)}"
     
-    def search_sops(self, query: str, n_results: int = 3, similarity_threshold: float = 0.7) -> List[SOPSearchResult]:
+    def index_sops(self, sops: Iterable[Union[ProcessedSOP, Dict[str, Any]]],
+                   chunk_size: Optional[int] = None) -> BulkIndexResult:
+        """
+        Store many SOPs with one write transaction per chunk
+        
+        Each chunk is embedded with a single embed_many call and committed at
+        once, FTS rows included. An item that fails validation, embedding,
+        compression or its insert is reported and skipped; the rest of its
+        chunk is still committed.
+        
+        Args:
+            sops: ProcessedSOP objects or their dicts (validated per item)
+            chunk_size: SOPs per transaction (defaults to settings.sop_bulk_chunk_size)
+            
+        Returns:
+            BulkIndexResult with counts and per-item failures
+        """
+        chunk_size = chunk_size or settings.sop_bulk_chunk_size
+        started = time.monotonic()
+        result = BulkIndexResult()
+        chunk: List[Tuple[int, ProcessedSOP]] = []
+        
+        for index, item in enumerate(sops):
+            result.total += 1
+            try:
+                sop = item if isinstance(item, ProcessedSOP) else ProcessedSOP.model_validate(item)
+            except Exception as e:
+                sop_id = item.get('sop_id') if isinstance(item, dict) else None
+                result.failed.append(BulkIndexFailure(
+                    index=index,
+                    sop_id=sop_id if isinstance(sop_id, str) else None,
+                    error=(
+                        f"Invalid SOP: {e.error_count()} validation errors: {e.errors(include_url=False)}"
+                        if isinstance(e, ValidationError) else f"Invalid SOP: {str(e)}"
+                    )
+                ))
+                continue
+            
+            chunk.append((index, sop))
+            if len(chunk) >= chunk_size:
+                self._index_chunk(chunk, result)
+                chunk = []
+        
+        if chunk:
+            self._index_chunk(chunk, result)
+        
+        self._maybe_train_text_dictionary()
+        result.failed.sort(key=lambda failure: failure.index)
+        result.duration_seconds = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Bulk indexed {result.indexed}/{result.total} SOPs in {result.chunks} transactions "
+            f"({len(result.failed)} failed, {result.duration_seconds}s)"
+        )
+        return result
+    
+    def _index_chunk(self, chunk: List[Tuple[int, ProcessedSOP]], result: BulkIndexResult) -> None:
+        """Embed and write one chunk of SOPs in a single transaction"""
+        failed: List[BulkIndexFailure] = []
+        
+        def fail(index: int, sop: ProcessedSOP, error: Exception) -> None:
+            failed.append(BulkIndexFailure(index=index, sop_id=sop.sop_id, error=f"Error indexing SOP: {str(error)}"))
+        
+        prepared: List[Tuple[int, ProcessedSOP, str, List[str]]] = []
+        for index, sop in chunk:
+            try:
+                searchable_text = self._create_searchable_text(sop)
+                passages = self._create_passages(sop, searchable_text) if self.embedder else []
+            except Exception as e:
+                fail(index, sop, e)
+                continue
+            prepared.append((index, sop, searchable_text, passages))
+        
+        vectors: List[Optional[np.ndarray]] = [None] * len(prepared)
+        if self.embedder and prepared:
+            try:
+                matrix = self.embedder.embed_many([passage for *_, passages in prepared for passage in passages])
+                offsets = np.cumsum([0] + [len(passages) for *_, passages in prepared])
+                vectors = [matrix[offsets[i]:offsets[i + 1]] for i in range(len(prepared))]
+            except Exception:
+                # Embed item by item so only the ones that fail are dropped
+                embedded = []
+                for item in prepared:
+                    try:
+                        embedded.append((item, self.embedder.embed_many(item[3])))
+                    except Exception as e:
+                        fail(item[0], item[1], e)
+                prepared = [item for item, _ in embedded]
+                vectors = [item_vectors for _, item_vectors in embedded]
+        
+        indexed: List[Tuple[ProcessedSOP, Optional[np.ndarray]]] = []
+        try:
+            with self.storage.write() as conn:
+                conn.execute('BEGIN')
+                in_sync = self._embeddings_in_sync(conn)
+                for (index, sop, searchable_text, _), sop_vectors in zip(prepared, vectors):
+                    # A savepoint per item, so one bad row does not abort the chunk
+                    conn.execute('SAVEPOINT bulk_item')
+                    try:
+                        conn.execute(_UPSERT_SOP_SQL, self._sop_row(sop, searchable_text))
+                        self._store_text(conn, sop.sop_id, sop.original_text)
+                        if self.embedder:
+                            self._store_embeddings(conn, sop.sop_id, sop_vectors)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO bulk_item')
+                        fail(index, sop, e)
+                    else:
+                        indexed.append((sop, sop_vectors))
+                    conn.execute('RELEASE bulk_item')
+                self._advance_embeddings(conn, in_sync)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing bulk index chunk of {len(chunk)} SOPs: {str(e)}")
+            result.failed.extend(
+                BulkIndexFailure(index=index, sop_id=sop.sop_id, error=f"Error indexing SOP: {str(e)}")
+                for index, sop in chunk
+            )
+            return
+        
+        result.chunks += 1
+        result.indexed += len(indexed)
+        result.failed.extend(failed)
+        if not indexed:
+            return
+        
+        notify_sop_changes(self.db_path, upserted=[sop.sop_id for sop, _ in indexed])
+        if self.embedder:
+            for sop, sop_vectors in indexed:
+                self.embedding_index.add(sop.sop_id, sop_vectors)
+                self._search_metadata[sop.sop_id] = self._create_search_metadata(sop.model_dump(mode='json'))
+    
+    def search_sops(self, query: str, n_results: int = 3, similarity_threshold: Optional[float] = None) -> List[SOPSearchResult]:
         """
-        Search for relevant SOPs using text matching
+        Search for relevant SOPs using embedding similarity
         
         Args:
             query: Search query (event description, keywords, etc.)
             n_results: Maximum number of results to return
             similarity_threshold: Minimum similarity score to include result
+                (defaults to the embedder's calibrated threshold, or
+                TEXT_SIMILARITY_THRESHOLD without embeddings)
             
         Returns:
             List of SOPSearchResult objects
@@ -102,57 +436,33 @@ class VectorIndexer:
         try:
             logger.info(f"Searching SOPs for query: '{query}'")
             
-            # Simple text search in SQLite
-            cursor = self.conn.execute('''
-                SELECT sop_id, data, title, category, priority_override, searchable_text
-                FROM sops 
-                WHERE searchable_text LIKE ? 
-                ORDER BY 
-                    CASE 
-                        WHEN title LIKE ? THEN 1
-                        WHEN category LIKE ? THEN 2
-                        ELSE 3
-                    END
-                LIMIT ?
-            ''', (f'%{query}%', f'%{query}%', f'%{query}%', n_results))
+            if similarity_threshold is None:
+                similarity_threshold = self.embedder.similarity_threshold if self.embedder else TEXT_SIMILARITY_THRESHOLD
+            
+            if not self.embedder:
+                if self.fts_enabled:
+                    return self.keyword_search_sops(query, n_results, similarity_threshold)
+                return self._text_search_sops(query, n_results, similarity_threshold)
+            
+            self._refresh_embeddings()
+            query_vector = self.embedder.embed(query)
+            matches = self.embedding_index.search(query_vector, n_results, similarity_threshold)
             
             search_results = []
             
-            for row in cursor.fetchall():
-                try:
-                    sop_id, data_json, title, category, priority_override, searchable_text = row
-                    
-                    # Parse stored SOP data
-                    sop_data = json.loads(data_json)
-                    
-                    # Simple similarity score based on keyword matches
-                    query_words = query.lower().split()
-                    searchable_lower = searchable_text.lower()
-                    matches = sum(1 for word in query_words if word in searchable_lower)
-                    similarity_score = min(1.0, matches / max(1, len(query_words)))
-                    
-                    if similarity_score < 0.1:  # Lower threshold for text search
-                        continue
-                    
-                    # Extract matched triggers
-                    triggers = sop_data.get('triggers', [])
-                    matched_triggers = self._find_matched_triggers(query.lower(), triggers)
-                    
-                    # Create search result
-                    search_result = SOPSearchResult(
-                        sop_id=sop_id,
-                        title=title,
-                        similarity_score=round(similarity_score, 3),
-                        priority_override=priority_override,
-                        response_requirements=sop_data['response_requirements'],
-                        matched_triggers=matched_triggers
-                    )
-                    
-                    search_results.append(search_result)
-                    
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.error(f"Error parsing search result: {str(e)}")
+            for sop_id, score in matches:
+                metadata = self._search_metadata.get(sop_id)
+                if metadata is None:
                     continue
+                
+                search_results.append(SOPSearchResult(
+                    sop_id=sop_id,
+                    title=metadata['title'],
+                    similarity_score=round(score, 3),
+                    priority_override=metadata['priority_override'],
+                    response_requirements=metadata['response_requirements'],
+                    matched_triggers=self._find_matched_triggers(query.lower(), metadata['triggers'])
+                ))
             
             logger.info(f"Found {len(search_results)} relevant SOPs for query")
             return search_results
@@ -161,21 +471,138 @@ class VectorIndexer:
             logger.error(f"Error searching SOPs: {str(e)}")
             return []
     
+    def keyword_search_sops(self, query: str, n_results: int = 3, similarity_threshold: float = 0.0,
+                            category_filter: Optional[str] = None) -> List[SOPSearchResult]:
+        """
+        Ranked keyword search over the FTS5 index
+        
+        The query is tokenized into terms and any term may match; results are
+        ranked by BM25 with FTS_COLUMN_WEIGHTS. The similarity score is the
+        fraction of query terms an SOP matches.
+        
+        Args:
+            query: Search query (event description, keywords, etc.)
+            n_results: Maximum number of results to return
+            similarity_threshold: Minimum fraction of query terms matched
+            category_filter: Only return SOPs in this category
+            
+        Returns:
+            List of SOPSearchResult objects with snippets, best first
+        """
+        if not self.fts_enabled:
+            return self._text_search_sops(query, n_results, similarity_threshold)
+        
+        terms = list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+        if not terms:
+            return []
+        
+        phrases = [f'"{term}"' for term in terms]
+        term_matches = " + ".join(
+            "(f.rowid IN (SELECT rowid FROM sops_fts WHERE sops_fts MATCH ?))" for _ in phrases
+        )
+        weights = ", ".join(str(weight) for weight in FTS_COLUMN_WEIGHTS.values())
+        category_clause = "AND s.category = ?" if category_filter else ""
+        
+        cursor = self.storage.read().execute(f'''
+            SELECT sop_id, data, title, priority_override, snippet, matched_terms
+            FROM (
+                SELECT s.sop_id, s.data, s.title, s.priority_override,
+                       bm25(sops_fts, {weights}) AS rank,
+                       snippet(sops_fts, -1, '[', ']', '...', 12) AS snippet,
+                       {term_matches} AS matched_terms
+                FROM sops_fts f JOIN sops s ON s.rowid = f.rowid
+                WHERE sops_fts MATCH ? {category_clause}
+            )
+            WHERE matched_terms >= ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (
+            *phrases,
+            " OR ".join(phrases),
+            *([category_filter] if category_filter else []),
+            similarity_threshold * len(terms) - 1e-9,
+            n_results
+        ))
+        
+        search_results = []
+        
+        for sop_id, data_json, title, priority_override, snippet, matched_terms in cursor.fetchall():
+            try:
+                sop_data = json.loads(data_json)
+                search_results.append(SOPSearchResult(
+                    sop_id=sop_id,
+                    title=title,
+                    similarity_score=round(matched_terms / len(terms), 3),
+                    priority_override=priority_override,
+                    response_requirements=sop_data['response_requirements'],
+                    matched_triggers=self._find_matched_triggers(query.lower(), sop_data.get('triggers', [])),
+                    snippet=snippet
+                ))
+                
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.error(f"Error parsing search result: {str(e)}")
+                continue
+        
+        logger.info(f"Found {len(search_results)} relevant SOPs for query")
+        return search_results
+    
+    def _text_search_sops(self, query: str, n_results: int, similarity_threshold: float) -> List[SOPSearchResult]:
+        """Substring search used when neither embeddings nor FTS5 are available"""
+        cursor = self.storage.read().execute('''
+            SELECT sop_id, data, title, category, priority_override, searchable_text
+            FROM sops 
+            WHERE searchable_text LIKE ? 
+            ORDER BY 
+                CASE 
+                    WHEN title LIKE ? THEN 1
+                    WHEN category LIKE ? THEN 2
+                    ELSE 3
+                END
+            LIMIT ?
+        ''', (f'%{query}%', f'%{query}%', f'%{query}%', n_results))
+        
+        search_results = []
+        
+        for row in cursor.fetchall():
+            try:
+                sop_id, data_json, title, category, priority_override, searchable_text = row
+                
+                # Parse stored SOP data
+                sop_data = json.loads(data_json)
+                
+                # Simple similarity score based on keyword matches
+                query_words = query.lower().split()
+                searchable_lower = searchable_text.lower()
+                matches = sum(1 for word in query_words if word in searchable_lower)
+                similarity_score = min(1.0, matches / max(1, len(query_words)))
+                
+                if similarity_score < similarity_threshold:
+                    continue
+                
+                # Extract matched triggers
+                triggers = sop_data.get('triggers', [])
+                matched_triggers = self._find_matched_triggers(query.lower(), triggers)
+                
+                search_results.append(SOPSearchResult(
+                    sop_id=sop_id,
+                    title=title,
+                    similarity_score=round(similarity_score, 3),
+                    priority_override=priority_override,
+                    response_requirements=sop_data['response_requirements'],
+                    matched_triggers=matched_triggers
+                ))
+                
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.error(f"Error parsing search result: {str(e)}")
+                continue
+        
+        logger.info(f"Found {len(search_results)} relevant SOPs for query")
+        return search_results
+    
     def get_all_sops(self) -> List[Dict[str, Any]]:
-        """Get all stored SOPs with metadata"""
+        """Get all stored SOPs, including their original text"""
         try:
-            cursor = self.conn.execute('SELECT data FROM sops')
-            
-            sops = []
-            for row in cursor.fetchall():
-                try:
-                    sop_data = json.loads(row[0])
-                    sops.append(sop_data)
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parsing stored SOP: {str(e)}")
-                    continue
-            
+            sops = list(self.iter_sops(fields=list(LIST_FIELDS)))
             logger.info(f"Retrieved {len(sops)} SOPs from database")
             return sops
             
@@ -183,17 +610,133 @@ class VectorIndexer:
             logger.error(f"Error retrieving all SOPs: {str(e)}")
             return []
     
+    def get_sop(self, sop_id: str) -> Optional[Dict[str, Any]]:
+        """Get one full SOP, including its original text, or None if it does not exist"""
+        row = self.storage.read().execute(
+            '''SELECT s.data, t.original_text, t.codec, t.dict_id
+               FROM sops s LEFT JOIN sop_texts t ON t.sop_id = s.sop_id WHERE s.sop_id = ?''',
+            (sop_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, original_text, codec, dict_id = row
+        sop_data = json.loads(data)
+        if original_text is not None:
+            sop_data['original_text'] = self._decode_text(original_text, codec, dict_id)
+        return sop_data
+    
+    def list_sops(self, limit: int = 50, cursor: Optional[str] = None,
+                  fields: Optional[List[str]] = None, category: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of SOPs in sop_id order, reading only the requested fields
+        
+        Args:
+            limit: Maximum number of SOPs in the page
+            cursor: next_cursor from the previous page, or None for the first page
+            fields: Fields to return (defaults to DEFAULT_LIST_FIELDS); see LIST_FIELDS
+            category: Only list SOPs in this category
+            
+        Returns:
+            Dict with the page's items and the next_cursor (None on the last page)
+        
+        Raises:
+            ValueError: Unknown field or malformed cursor
+        """
+        fields = self._validate_fields(fields)
+        after = _decode_cursor(cursor) if cursor else None
+        
+        items = self._select_sops(fields, after, limit + 1, category)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = _encode_cursor(items[-1][1])
+        
+        return {
+            "items": [item for item, _ in items],
+            "next_cursor": next_cursor
+        }
+    
+    def iter_sops(self, fields: Optional[List[str]] = None, category: Optional[str] = None,
+                  batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every SOP page by page, for exports
+        
+        Only one batch is held in memory at a time.
+        """
+        fields = self._validate_fields(fields)
+        after = None
+        while True:
+            items = self._select_sops(fields, after, batch_size, category)
+            for item, _ in items:
+                yield item
+            if len(items) < batch_size:
+                return
+            after = items[-1][1]
+    
+    def _validate_fields(self, fields: Optional[List[str]]) -> List[str]:
+        if not fields:
+            return DEFAULT_LIST_FIELDS
+        unknown = [field for field in fields if field not in LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}. Must be among: {list(LIST_FIELDS)}")
+        return list(dict.fromkeys(fields))
+    
+    def _select_sops(self, fields: List[str], after: Optional[str], limit: int,
+                     category: Optional[str]) -> List[Tuple[Dict[str, Any], str]]:
+        """Keyset-paginated select of the given fields; returns (item, sop_id) pairs"""
+        columns = ", ".join(LIST_FIELDS[field] for field in fields)
+        with_text = "original_text" in fields
+        if with_text:
+            # The text is decompressed per row, so read how it was stored as well
+            columns += ", t.codec, t.dict_id"
+        join = "LEFT JOIN sop_texts t ON t.sop_id = s.sop_id" if with_text else ""
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("s.sop_id > ?")
+            params.append(after)
+        if category:
+            conditions.append("s.category = ?")
+            params.append(category)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        rows = self.storage.read().execute(
+            f'SELECT s.sop_id, {columns} FROM sops s {join} {where} ORDER BY s.sop_id LIMIT ?',
+            (*params, limit)
+        ).fetchall()
+        
+        items = []
+        for sop_id, *values in rows:
+            if with_text:
+                *values, codec, dict_id = values
+            item = {}
+            for field, value in zip(fields, values):
+                if field in _JSON_LIST_FIELDS and value is not None:
+                    value = json.loads(value)
+                elif field == "original_text" and value is not None:
+                    value = self._decode_text(value, codec, dict_id)
+                item[field] = value
+            items.append((item, sop_id))
+        return items
+    
     def delete_sop(self, sop_id: str) -> tuple[bool, Optional[str]]:
         """Delete SOP from database"""
         try:
-            # Check if SOP exists
-            cursor = self.conn.execute('SELECT sop_id FROM sops WHERE sop_id = ?', (sop_id,))
-            if not cursor.fetchone():
-                return False, f"SOP {sop_id} not found in database"
+            with self.storage.write() as conn:
+                # Check if SOP exists
+                cursor = conn.execute('SELECT sop_id FROM sops WHERE sop_id = ?', (sop_id,))
+                if not cursor.fetchone():
+                    return False, f"SOP {sop_id} not found in database"
+                
+                # Delete from database
+                in_sync = self._embeddings_in_sync(conn)
+                conn.execute('DELETE FROM sops WHERE sop_id = ?', (sop_id,))
+                conn.execute('DELETE FROM sop_embeddings WHERE sop_id = ?', (sop_id,))
+                self._advance_embeddings(conn, in_sync)
+            notify_sop_changes(self.db_path, deleted=[sop_id])
             
-            # Delete from database
-            self.conn.execute('DELETE FROM sops WHERE sop_id = ?', (sop_id,))
-            self.conn.commit()
+            if self.embedder:
+                self.embedding_index.remove(sop_id)
+                self._search_metadata.pop(sop_id, None)
             
             logger.info(f"Successfully deleted SOP {sop_id}")
             return True, None
@@ -203,31 +746,31 @@ class VectorIndexer:
             return False, f"Error deleting SOP: {str(e)}"
     
     def get_database_stats(self) -> Dict[str, Any]:
-        """Get statistics about the SOP database"""
+        """Get statistics about the SOP database from indexed aggregates and the summary table"""
         try:
-            # Get count
-            cursor = self.conn.execute('SELECT COUNT(*) FROM sops')
-            count = cursor.fetchone()[0]
+            conn = self.storage.read()
             
-            # Get all SOPs for category breakdown
-            all_sops = self.get_all_sops()
+            sop_count, corpus_bytes, trigger_count, last_indexed_at = conn.execute(
+                'SELECT sop_count, corpus_bytes, trigger_count, last_indexed_at FROM sop_stats WHERE id = 1'
+            ).fetchone()
             
-            # Calculate category breakdown
-            categories = {}
-            priorities = {}
-            
-            for sop in all_sops:
-                category = sop.get('category', 'unknown')
-                priority = sop.get('priority_override', 'not_specified')
-                
-                categories[category] = categories.get(category, 0) + 1
-                priorities[priority] = priorities.get(priority, 0) + 1
+            # Category and priority breakdowns from the column indexes
+            categories = dict(conn.execute(
+                "SELECT ifnull(category, 'unknown'), COUNT(*) FROM sops GROUP BY category"
+            ).fetchall())
+            priorities = dict(conn.execute(
+                "SELECT ifnull(priority_override, 'not_specified'), COUNT(*) FROM sops GROUP BY priority_override"
+            ).fetchall())
             
             stats = {
-                "total_sops": count,
+                "total_sops": sop_count,
                 "database_path": self.db_path,
                 "categories": categories,
                 "priorities": priorities,
+                "corpus_bytes": corpus_bytes,
+                "trigger_count": trigger_count,
+                "last_indexed_at": last_indexed_at,
+                "text_codec": self.text_codec,
                 "storage_type": "SQLite"
             }
             
@@ -237,6 +780,285 @@ class VectorIndexer:
             logger.error(f"Error getting database stats: {str(e)}")
             return {"error": str(e)}
     
+    def _init_stats(self) -> None:
+        """Create the indexes and the trigger-maintained summary table used by get_database_stats and SOPSnapshot"""
+        with self.storage.write() as conn:
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sops_category ON sops(category)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sops_priority_override ON sops(priority_override)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sop_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    sop_count INTEGER NOT NULL,
+                    corpus_bytes INTEGER NOT NULL,
+                    trigger_count INTEGER NOT NULL,
+                    last_indexed_at TEXT,
+                    change_count INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(sop_stats)')}
+            if 'change_count' not in columns:
+                conn.execute('ALTER TABLE sop_stats ADD COLUMN change_count INTEGER NOT NULL DEFAULT 0')
+            for trigger_sql in _STATS_TRIGGERS + _CHANGE_TRIGGERS:
+                conn.execute(trigger_sql)
+            
+            # Recompute for databases created before the summary existed or written without the triggers
+            summary = conn.execute('SELECT sop_count FROM sop_stats WHERE id = 1').fetchone()
+            total = conn.execute('SELECT COUNT(*) FROM sops').fetchone()[0]
+            if summary is None or summary[0] != total:
+                conn.execute('''
+                    INSERT INTO sop_stats (id, sop_count, corpus_bytes, trigger_count, last_indexed_at)
+                    SELECT 1, COUNT(*),
+                           ifnull(SUM(length(CAST(data AS BLOB))), 0)
+                               + (SELECT ifnull(SUM(length(CAST(original_text AS BLOB))), 0) FROM sop_texts),
+                           ifnull(SUM(ifnull(json_array_length(data, '$.triggers'), 0)), 0), MAX(processed_date)
+                    FROM sops
+                    WHERE true
+                    ON CONFLICT(id) DO UPDATE SET
+                        sop_count = excluded.sop_count,
+                        corpus_bytes = excluded.corpus_bytes,
+                        trigger_count = excluded.trigger_count,
+                        last_indexed_at = excluded.last_indexed_at
+                ''')
+                logger.info(f"Rebuilt SOP statistics summary for {total} SOPs")
+    
+    def _migrate_original_text(self) -> None:
+        """Move original_text out of the sops JSON of databases written before sop_texts existed"""
+        with self.storage.write() as conn:
+            moved = conn.execute('''
+                INSERT INTO sop_texts (sop_id, original_text)
+                SELECT sop_id, json_extract(data, '$.original_text') FROM sops
+                WHERE json_type(data, '$.original_text') = 'text'
+                ON CONFLICT(sop_id) DO UPDATE SET
+                    original_text = excluded.original_text, codec = 'plain', dict_id = NULL, raw_bytes = NULL
+            ''').rowcount
+            if moved:
+                conn.execute('''
+                    UPDATE sops SET data = json_remove(data, '$.original_text')
+                    WHERE json_type(data, '$.original_text') IS NOT NULL
+                ''')
+                logger.info(f"Moved original text of {moved} SOPs into sop_texts")
+    
+    def _migrate_timelines(self) -> None:
+        """Parse the timelines of SOPs stored before timeline_seconds was computed at ingest"""
+        with self.storage.write() as conn:
+            rows = conn.execute('''
+                SELECT sop_id, json_extract(data, '$.response_requirements.timeline') FROM sops
+                WHERE json_type(data, '$.response_requirements') = 'object'
+                AND json_type(data, '$.response_requirements.timeline_seconds') IS NULL
+            ''').fetchall()
+            for sop_id, timeline in rows:
+                seconds, urgency = parse_timeline(timeline)
+                conn.execute(
+                    '''UPDATE sops SET data = json_set(data,
+                        '$.response_requirements.timeline_seconds', ?, '$.response_requirements.urgency', ?)
+                       WHERE sop_id = ?''',
+                    (seconds, urgency, sop_id)
+                )
+        if rows:
+            logger.info(f"Parsed response timelines of {len(rows)} existing SOPs")
+    
+    def _init_text_compression(self) -> None:
+        """Create the compression dictionary table and load the current dictionary"""
+        self.text_codec = resolve_codec(settings.sop_text_compression)
+        self._text_dictionaries: Dict[int, bytes] = {}
+        self._text_dict_id: Optional[int] = None
+        self._text_dict_lock = threading.Lock()
+        
+        with self.storage.write() as conn:
+            # sop_texts created before compression only has the text column
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(sop_texts)')}
+            if 'codec' not in columns:
+                conn.execute("ALTER TABLE sop_texts ADD COLUMN codec TEXT NOT NULL DEFAULT 'plain'")
+                conn.execute('ALTER TABLE sop_texts ADD COLUMN dict_id INTEGER')
+                conn.execute('ALTER TABLE sop_texts ADD COLUMN raw_bytes INTEGER')
+            # Dictionaries are never deleted: rows (and other indexers) may still use old ones
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sop_text_dicts (
+                    dict_id INTEGER PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    samples INTEGER NOT NULL,
+                    trained_at TEXT NOT NULL
+                )
+            ''')
+            self._load_text_dictionary(conn)
+    
+    def _load_text_dictionary(self, conn: sqlite3.Connection) -> None:
+        """Use the newest dictionary for the codec, which may have been trained by another indexer"""
+        row = conn.execute(
+            'SELECT dict_id, data FROM sop_text_dicts WHERE codec = ? ORDER BY dict_id DESC LIMIT 1',
+            (self.text_codec,)
+        ).fetchone()
+        if row:
+            self._text_dictionaries[row[0]] = row[1]
+            self._text_dict_id = row[0]
+    
+    def train_text_dictionary(self, sample_limit: int = 1000, replace: bool = True) -> Dict[str, Any]:
+        """
+        Train a new compression dictionary on the stored texts and recompress them all with it
+        
+        Runs automatically once the corpus reaches settings.sop_text_dict_min_samples
+        SOPs; call again after the corpus has changed substantially. Training
+        happens outside the writer lock and texts are recompressed in short
+        batch transactions, so SOP writes carry on meanwhile.
+        
+        Args:
+            sample_limit: Maximum number of texts (randomly chosen) to train on
+            replace: When False, keep a dictionary another indexer stored while this one trained
+            
+        Returns:
+            Dict with the new dict_id, codec and the raw and stored text sizes
+        """
+        if self.text_codec == PLAIN:
+            return {"dict_id": None, "codec": PLAIN, "texts": 0, "raw_bytes": 0, "stored_bytes": 0}
+        
+        samples = [
+            self._decode_text(*row) for row in self.storage.read().execute(
+                'SELECT original_text, codec, dict_id FROM sop_texts ORDER BY random() LIMIT ?', (sample_limit,)
+            )
+        ]
+        dictionary = train_dictionary(self.text_codec, samples)
+        
+        with self.storage.write() as conn:
+            if not replace:
+                self._load_text_dictionary(conn)
+                if self._text_dict_id is not None:
+                    logger.info(f"Using {self.text_codec} dictionary {self._text_dict_id} trained by another indexer")
+                    return {"dict_id": self._text_dict_id, "codec": self.text_codec, "texts": 0, "raw_bytes": 0, "stored_bytes": 0}
+            dict_id = conn.execute(
+                'INSERT INTO sop_text_dicts (codec, data, samples, trained_at) VALUES (?, ?, ?, ?)',
+                (self.text_codec, dictionary, len(samples), datetime.now().isoformat())
+            ).lastrowid
+        # Texts written from now on use the new dictionary
+        self._text_dictionaries[dict_id] = dictionary
+        self._text_dict_id = dict_id
+        
+        # Recompress in sop_id batches, one short transaction each, so the whole
+        # corpus is never in memory and the writer lock is never held for long
+        raw_bytes = stored_bytes = texts = 0
+        after = ''
+        while True:
+            with self.storage.write() as conn:
+                rows = conn.execute(
+                    'SELECT sop_id, original_text, codec, dict_id FROM sop_texts WHERE sop_id > ? ORDER BY sop_id LIMIT ?',
+                    (after, _RECOMPRESS_BATCH_SIZE)
+                ).fetchall()
+                for sop_id, original_text, codec, old_dict_id in rows:
+                    text = self._decode_text(original_text, codec, old_dict_id)
+                    stored = self._store_text(conn, sop_id, text, dict_id)
+                    raw_bytes += len(text.encode('utf-8'))
+                    stored_bytes += stored
+                    texts += 1
+            if len(rows) < _RECOMPRESS_BATCH_SIZE:
+                break
+            after = rows[-1][0]
+        
+        logger.info(
+            f"Trained {self.text_codec} dictionary {dict_id} ({len(dictionary)} bytes) on {len(samples)} texts; "
+            f"recompressed {texts} texts from {raw_bytes} to {stored_bytes} bytes"
+        )
+        return {
+            "dict_id": dict_id,
+            "codec": self.text_codec,
+            "dictionary_bytes": len(dictionary),
+            "texts": texts,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes
+        }
+    
+    def _maybe_train_text_dictionary(self) -> None:
+        """Train the first dictionary once there are enough texts to learn from"""
+        if self.text_codec == PLAIN or self._text_dict_id is not None:
+            return
+        # Another process may have trained one since this indexer started
+        self._load_text_dictionary(self.storage.read())
+        if self._text_dict_id is not None:
+            return
+        sop_count = self.storage.read().execute('SELECT sop_count FROM sop_stats WHERE id = 1').fetchone()[0]
+        if sop_count < settings.sop_text_dict_min_samples:
+            return
+        # Concurrent writers in this process leave the training to the first one
+        if not self._text_dict_lock.acquire(blocking=False):
+            return
+        try:
+            if self._text_dict_id is None:
+                self.train_text_dictionary(replace=False)
+        except Exception as e:
+            logger.error(f"Error training SOP text dictionary: {str(e)}")
+        finally:
+            self._text_dict_lock.release()
+    
+    def _store_text(self, conn: sqlite3.Connection, sop_id: str, text: str,
+                    dict_id: Optional[int] = None) -> int:
+        """Write an SOP's original text, compressed; returns the stored size in bytes"""
+        dict_id = self._text_dict_id if dict_id is None else dict_id
+        codec, value = compress_text(
+            text, self.text_codec, settings.sop_text_compression_level, self._text_dictionaries.get(dict_id)
+        )
+        if codec == PLAIN:
+            dict_id = None
+        raw_bytes = len(text.encode('utf-8'))
+        conn.execute(_UPSERT_TEXT_SQL, (sop_id, value, codec, dict_id, raw_bytes))
+        return len(value) if isinstance(value, bytes) else raw_bytes
+    
+    def _decode_text(self, value: Union[str, bytes], codec: Optional[str], dict_id: Optional[int]) -> str:
+        """Decompress a stored original text"""
+        dictionary = None
+        if dict_id is not None:
+            dictionary = self._text_dictionaries.get(dict_id)
+            if dictionary is None:
+                # Trained by another indexer on the same database
+                dictionary = self.storage.read().execute(
+                    'SELECT data FROM sop_text_dicts WHERE dict_id = ?', (dict_id,)
+                ).fetchone()[0]
+                self._text_dictionaries[dict_id] = dictionary
+        return decompress_text(codec or PLAIN, value, dictionary)
+    
+    def _init_fts(self) -> bool:
+        """
+        Create the FTS5 index and the triggers that keep it in sync with sops
+        
+        Returns:
+            False when this SQLite build has no FTS5 support
+        """
+        try:
+            with self.storage.write() as conn:
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS sops_fts USING fts5(
+                        sop_id UNINDEXED, title, category, triggers, actions, regulatory,
+                        tokenize = 'porter unicode61'
+                    )
+                ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable ({e}), keyword search will use substring matching")
+            return False
+        
+        with self.storage.write() as conn:
+            for trigger_sql in _FTS_TRIGGERS:
+                conn.execute(trigger_sql)
+            
+            # Backfill databases created before the index existed
+            indexed = conn.execute('SELECT COUNT(*) FROM sops_fts').fetchone()[0]
+            total = conn.execute('SELECT COUNT(*) FROM sops').fetchone()[0]
+            if indexed != total:
+                conn.execute('DELETE FROM sops_fts')
+                conn.execute(f'INSERT INTO sops_fts ({_FTS_COLUMNS}) SELECT {_FTS_VALUES.format(row="s")} FROM sops s')
+                logger.info(f"Rebuilt full-text index for {total} SOPs")
+        return True
+    
+    def _sop_row(self, sop: ProcessedSOP, searchable_text: str) -> tuple:
+        """Parameters for _UPSERT_SOP_SQL"""
+        return (
+            sop.sop_id,
+            sop.model_dump_json(exclude={'original_text'}),
+            sop.title,
+            sop.category,
+            sop.priority_override,
+            sop.document_source,
+            sop.processed_date.isoformat(),
+            searchable_text
+        )
+    
     def _create_searchable_text(self, sop: ProcessedSOP) -> str:
         """Create combined text for embedding generation"""
         
@@ -255,6 +1077,95 @@ class VectorIndexer:
         
         return searchable_text
     
+    def _create_passages(self, sop: ProcessedSOP, searchable_text: str) -> List[str]:
+        """Split an SOP into the passages that are embedded for search"""
+        passages = [sop.title] + [trigger for trigger in sop.triggers if trigger.strip()]
+        passages.append(searchable_text)
+        return passages
+    
+    def _create_search_metadata(self, sop_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep the fields needed to build search results in memory"""
+        return {
+            "title": sop_data.get('title'),
+            "priority_override": sop_data.get('priority_override'),
+            "response_requirements": sop_data['response_requirements'],
+            "triggers": sop_data.get('triggers', [])
+        }
+    
+    def _store_embeddings(self, conn: sqlite3.Connection, sop_id: str, vectors: np.ndarray) -> None:
+        """Persist passage embeddings for an SOP within the caller's write transaction"""
+        conn.execute(_STORE_EMBEDDINGS_SQL, (
+            sop_id,
+            self.embedder.name,
+            self.embedder.dimension,
+            np.asarray(vectors, dtype=np.float32).tobytes()
+        ))
+    
+    def _load_embeddings(self) -> None:
+        """Load persisted embeddings, re-embedding SOPs indexed with another model"""
+        change_count = self._read_change_count(self.storage.read())
+        embedding_index = EmbeddingIndex(self.embedder.dimension)
+        search_metadata: Dict[str, Dict[str, Any]] = {}
+        cursor = self.storage.read().execute('''
+            SELECT s.sop_id, s.data, e.model, e.dimension, e.vectors
+            FROM sops s LEFT JOIN sop_embeddings e ON e.sop_id = s.sop_id
+        ''')
+        
+        reembedded: Dict[str, np.ndarray] = {}
+        for sop_id, data_json, model, dimension, blob in cursor.fetchall():
+            try:
+                sop_data = json.loads(data_json)
+                
+                if model == self.embedder.name and dimension == self.embedder.dimension:
+                    vectors = np.frombuffer(blob, dtype=np.float32).reshape(-1, dimension)
+                else:
+                    # original_text lives in sop_texts and is not part of the passages
+                    sop = ProcessedSOP(**{'original_text': '', **sop_data})
+                    passages = self._create_passages(sop, self._create_searchable_text(sop))
+                    vectors = self.embedder.embed_many(passages)
+                    reembedded[sop_id] = vectors
+                
+                embedding_index.add(sop_id, vectors)
+                search_metadata[sop_id] = self._create_search_metadata(sop_data)
+                
+            except Exception as e:
+                logger.error(f"Error loading embeddings for SOP {sop_id}: {str(e)}")
+                continue
+        
+        if reembedded:
+            with self.storage.write() as conn:
+                for sop_id, vectors in reembedded.items():
+                    self._store_embeddings(conn, sop_id, vectors)
+            logger.info(f"Re-embedded {len(reembedded)} SOPs with {self.embedder.name}")
+        
+        self.embedding_index = embedding_index
+        self._search_metadata = search_metadata
+        self._embeddings_change_count = change_count
+        logger.info(f"Loaded {len(embedding_index)} SOPs into embedding index ({self.embedder.name})")
+    
+    def _refresh_embeddings(self) -> None:
+        """Reload the embedding index when another process has written SOPs since it was loaded"""
+        if self._read_change_count(self.storage.read()) == self._embeddings_change_count:
+            return
+        with self._embeddings_lock:
+            if self._read_change_count(self.storage.read()) != self._embeddings_change_count:
+                logger.info(f"SOP database changed outside this indexer, reloading embedding index for {self.db_path}")
+                self._load_embeddings()
+    
+    def _embeddings_in_sync(self, conn: sqlite3.Connection) -> bool:
+        """Whether the embedding index reflects every SOP write before the caller's transaction"""
+        return self._read_change_count(conn) == self._embeddings_change_count
+    
+    def _advance_embeddings(self, conn: sqlite3.Connection, in_sync: bool) -> None:
+        """Count the caller's own writes as applied to the embedding index (which it updates after commit)"""
+        if in_sync:
+            self._embeddings_change_count = self._read_change_count(conn)
+    
+    @staticmethod
+    def _read_change_count(conn: sqlite3.Connection) -> Optional[int]:
+        row = conn.execute('SELECT change_count FROM sop_stats WHERE id = 1').fetchone()
+        return row[0] if row else None
+    
     def _find_matched_triggers(self, query: str, triggers: List[str]) -> List[str]:
         """Find triggers that match the query"""
         matched = []
@@ -266,4 +1177,16 @@ class VectorIndexer:
             if trigger_lower in query or any(word in trigger_lower for word in query_words):
                 matched.append(trigger)
         
-        return matched
\ No newline at end of file
+        return matched
+
+
+def _encode_cursor(sop_id: str) -> str:
+    """Opaque pagination cursor for the last sop_id of a page"""
+    return base64.urlsafe_b64encode(sop_id.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (ValueError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
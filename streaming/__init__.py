@@ -0,0 +1 @@
+# Streaming event ingestion for continuous CV and access control feeds
@@ -0,0 +1,220 @@
+"""
+In-order triage pipeline for continuous event feeds.
+
+Records are validated once as they arrive and their analysis is started
+immediately on the shared analysis executor, so many events are in flight at
+once. Results are emitted in arrival order. The number of in-flight events is
+bounded by an internal queue: when it is full the pipeline stops reading from
+the client, which pushes back on the sender through the transport (TCP for
+chunked HTTP, the receive loop for WebSockets).
+
+Stream records share the analysis executor with the regular /analyze
+endpoints, so all streams together only hold a share of its workers
+(STREAM_WORKER_SHARE) on the executor at a time. The other records wait for
+one of those slots rather than retrying against the shared queue, which
+leaves the queue to regular requests.
+
+A record that cannot be parsed, is too long or fails analysis produces an
+error line for that record only; the rest of the stream carries on.
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from agents.analysis_cache import run_cached_sop_enhanced_analysis
+from agents.analysis_executor import analysis_executor, ExecutorSaturatedError
+from agents.triage_agent import run_triage_analysis
+from agents.triage_scheduler import pre_score
+from models.event_models import CVThreatEvent, AccessControlEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_MODELS = {
+    "CV_Threat_Detection": CVThreatEvent,
+    "Access_Control_System": AccessControlEvent
+}
+
+# Share of the analysis executor's workers that stream records may occupy at once
+STREAM_WORKER_SHARE = 0.5
+
+# Delay before resubmitting when regular requests have filled the analysis queue,
+# doubled on each retry up to the maximum
+SATURATION_BACKOFF = 0.01
+MAX_SATURATION_BACKOFF = 1.0
+
+# Executor slots shared by every stream, one semaphore per event loop
+_stream_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+class StreamRecordError(ValueError):
+    """Raised for a record that cannot be parsed or validated"""
+
+
+# iter_lines yields a StreamRecordError in place of a line that was too long
+Record = Union[str, bytes, StreamRecordError]
+
+
+def parse_record(raw: Record, event_type: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Validate one stream record.
+
+    With an event_type for the whole stream, each record is the bare event and
+    is validated straight from its JSON text. Otherwise each record is an
+    envelope: {"event_type": "...", "event": {...}}.
+
+    Returns:
+        Tuple of (event_type, event data)
+    """
+    try:
+        if event_type is not None:
+            model = EVENT_MODELS[event_type]
+            return event_type, model.model_validate_json(raw).model_dump()
+
+        envelope = json.loads(raw)
+        if not isinstance(envelope, dict):
+            raise StreamRecordError("Record must be a JSON object")
+        record_type = envelope.get('event_type')
+        model = EVENT_MODELS.get(record_type)
+        if model is None:
+            raise StreamRecordError(f"Invalid event type: {record_type}. Must be one of: {list(EVENT_MODELS)}")
+        return record_type, model.model_validate(envelope.get('event')).model_dump()
+
+    except json.JSONDecodeError as e:
+        raise StreamRecordError(f"Invalid JSON: {e}")
+    except UnicodeDecodeError as e:
+        raise StreamRecordError(f"Invalid UTF-8: {e}")
+    except ValidationError as e:
+        raise StreamRecordError(f"Invalid event: {e.error_count()} validation errors: {e.errors(include_url=False)}")
+
+
+async def triage_stream(records: AsyncIterator[Record], event_type: Optional[str] = None,
+                        use_sop: bool = False, queue_size: int = 256,
+                        max_record_bytes: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Triage a stream of records, yielding one result per record in arrival order.
+
+    Args:
+        records: Raw JSON records (blank records are skipped)
+        event_type: Event type of every record, or None for envelope records
+        use_sop: Run the SOP-enhanced analysis instead of the standard triage
+        queue_size: Maximum number of records in flight
+        max_record_bytes: Longer records are rejected with an error line
+
+    Yields:
+        {"seq", "event_type", "result"} per event, or {"seq", "error"} for
+        records that could not be validated or analyzed
+    """
+    if event_type is not None and event_type not in EVENT_MODELS:
+        raise ValueError(f"Invalid event type: {event_type}. Must be one of: {list(EVENT_MODELS)}")
+
+    pending: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    done = object()
+
+    async def produce():
+        seq = 0
+        try:
+            async for raw in records:
+                if not isinstance(raw, StreamRecordError) and not raw.strip():
+                    continue
+                await pending.put(_start(seq, raw, event_type, use_sop, max_record_bytes))
+                seq += 1
+            await pending.put(done)
+        except Exception as e:
+            await pending.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await pending.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield await item
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if isinstance(item, asyncio.Future):
+                item.cancel()
+
+
+def _start(seq: int, raw: Record, event_type: Optional[str], use_sop: bool,
+           max_record_bytes: Optional[int] = None) -> asyncio.Future:
+    """Validate a record and start its analysis; returns a future for its result line"""
+    try:
+        if isinstance(raw, StreamRecordError):
+            raise raw
+        if max_record_bytes is not None and len(raw) > max_record_bytes:
+            raise StreamRecordError(f"Record exceeds {max_record_bytes} bytes")
+        record_type, event_data = parse_record(raw, event_type)
+    except Exception as e:
+        if not isinstance(e, StreamRecordError):
+            logger.error(f"Stream record {seq} could not be parsed: {e}")
+        future = asyncio.get_running_loop().create_future()
+        future.set_result({"seq": seq, "error": str(e) if isinstance(e, StreamRecordError) else f"Invalid record: {e}"})
+        return future
+
+    return asyncio.ensure_future(_analyze(seq, record_type, event_data, use_sop))
+
+
+def stream_slots() -> asyncio.Semaphore:
+    """Semaphore bounding the analyses all streams have on the executor at once"""
+    loop = asyncio.get_running_loop()
+    slots = _stream_slots.get(loop)
+    if slots is None:
+        slots = _stream_slots[loop] = asyncio.Semaphore(max(1, int(analysis_executor.workers * STREAM_WORKER_SHARE)))
+    return slots
+
+
+async def _analyze(seq: int, event_type: str, event_data: Dict[str, Any], use_sop: bool) -> Dict[str, Any]:
+    analyze = run_cached_sop_enhanced_analysis if use_sop else run_triage_analysis
+    try:
+        priority = pre_score(event_data, event_type)
+        async with stream_slots():
+            backoff = SATURATION_BACKOFF
+            while True:
+                try:
+                    result = await analysis_executor.run_prioritized(priority, analyze, event_data, event_type)
+                    return {"seq": seq, "event_type": event_type, "result": result}
+                except ExecutorSaturatedError:
+                    # Streams wait for capacity instead of failing the record
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_SATURATION_BACKOFF)
+    except Exception as e:
+        logger.error(f"Stream analysis failed for record {seq} ({event_type}): {e}")
+        return {"seq": seq, "event_type": event_type, "error": f"Analysis failed: {str(e)}"}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: Optional[int] = None) -> AsyncIterator[Record]:
+    """
+    Split a chunked byte stream into NDJSON lines
+
+    A line longer than max_line_bytes is not buffered: the rest of it is
+    discarded and a StreamRecordError is yielded in its place.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized:
+                # Tail of a line already reported as too long
+                oversized = False
+                continue
+            if max_line_bytes is not None and len(line) > max_line_bytes:
+                yield StreamRecordError(f"Record exceeds {max_line_bytes} bytes")
+                continue
+            yield line
+        if max_line_bytes is not None and len(buffer) > max_line_bytes:
+            if not oversized:
+                yield StreamRecordError(f"Record exceeds {max_line_bytes} bytes")
+                oversized = True
+            buffer = b""
+    if buffer and not oversized:
+        yield buffer
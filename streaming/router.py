@@ -0,0 +1,105 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+import json
+import logging
+from typing import Optional
+
+from config.settings import settings
+from streaming.pipeline import EVENT_MODELS, triage_stream, iter_lines
+
+logger = logging.getLogger(__name__)
+
+# Initialize router
+router = APIRouter(prefix="/stream", tags=["streaming"])
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for handlers that keep reading the request body while responding.
+
+    StreamingResponse listens for client disconnects by consuming receive(),
+    which would swallow the request body chunks. Here the body reader is the
+    only consumer and surfaces disconnects itself (ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _validate_event_type(event_type: Optional[str]) -> None:
+    if event_type is not None and event_type not in EVENT_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid event type: {event_type}. Must be one of: {list(EVENT_MODELS)}"
+        )
+
+
+@router.post("/events")
+async def stream_events(request: Request, event_type: Optional[str] = None, use_sop: bool = False):
+    """
+    Triage an NDJSON event feed sent as a chunked upload.
+    
+    Each line is an event of `event_type`, or an envelope
+    {"event_type": ..., "event": {...}} when no event_type is given.
+    Results are streamed back as NDJSON in the same order.
+    """
+    _validate_event_type(event_type)
+    logger.info(f"Starting NDJSON event stream (event_type={event_type}, use_sop={use_sop})")
+
+    async def results():
+        count = 0
+        try:
+            async for result in triage_stream(
+                iter_lines(request.stream(), max_line_bytes=settings.stream_max_record_bytes),
+                event_type=event_type,
+                use_sop=use_sop,
+                queue_size=settings.stream_queue_size
+            ):
+                count += 1
+                yield json.dumps(result) + "\n"
+        except ClientDisconnect:
+            logger.info(f"NDJSON event stream disconnected after {count} records")
+            return
+        logger.info(f"NDJSON event stream completed: {count} records")
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.websocket("/ws")
+async def stream_events_ws(websocket: WebSocket, event_type: Optional[str] = None, use_sop: bool = False):
+    """
+    Triage events sent as WebSocket text messages, one event per message.
+    
+    Results are sent back as JSON messages in the same order.
+    """
+    await websocket.accept()
+    if event_type is not None and event_type not in EVENT_MODELS:
+        await websocket.close(code=1008, reason=f"Invalid event type: {event_type}")
+        return
+
+    async def messages():
+        try:
+            while True:
+                yield await websocket.receive_text()
+        except WebSocketDisconnect:
+            return
+
+    count = 0
+    try:
+        async for result in triage_stream(
+            messages(),
+            event_type=event_type,
+            use_sop=use_sop,
+            queue_size=settings.stream_queue_size,
+            max_record_bytes=settings.stream_max_record_bytes
+        ):
+            await websocket.send_text(json.dumps(result))
+            count += 1
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket event stream disconnected after {count} records")
+        return
+
+    logger.info(f"WebSocket event stream completed: {count} records")
@@ -0,0 +1,153 @@
+import threading
+from functools import partial
+import pytest
+from agents.analysis_cache import AnalysisCache, sop_event_scope
+from sop.models import SpecialConditions
+from sop.vector_indexer import VectorIndexer
+from tests.test_sop_search import SAMPLE_SOPS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAnalysisCache:
+    """Test suite for the SOP-enhanced analysis result cache."""
+
+    def setup_method(self):
+        """Set up a cache with a controllable clock and corpus version."""
+        self.clock = FakeClock()
+        self.version = 1
+        self.calls = []
+        self.cache = AnalysisCache(
+            max_entries=2,
+            ttl_seconds=60,
+            version_provider=lambda: self.version,
+            scope_provider=lambda event_data, event_type: None,
+            clock=self.clock
+        )
+
+    def analyze(self, detection_name, severity="HIGH", camera_name="Lobby"):
+        event = {"detection_name": detection_name, "severity": severity, "site_name": "HQ", "camera_name": camera_name}
+
+        def compute():
+            self.calls.append(detection_name)
+            return {"final_threat_level": "HIGH", "event_summary": detection_name}
+
+        return self.cache.get_or_compute(event, "CV_Threat_Detection", compute)
+
+    def test_repeated_signature_hits_cache(self):
+        """Test that equivalent events are served from the cache."""
+        self.analyze("Person Falling Down")
+        self.analyze("  person falling down ", severity="high")
+
+        assert self.calls == ["Person Falling Down"]
+        stats = self.cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    def test_results_are_copies(self):
+        """Test that callers cannot mutate cached results."""
+        self.analyze("Tailgating")["final_threat_level"] = "LOW"
+        assert self.analyze("Tailgating")["final_threat_level"] == "HIGH"
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        self.analyze("A")
+        self.analyze("B")
+        self.analyze("A")
+        self.analyze("C")
+        self.analyze("A")
+        self.analyze("B")
+
+        assert self.calls == ["A", "B", "C", "B"]
+        assert self.cache.stats()["evictions"] == 2
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        self.analyze("A")
+        self.clock.now = 61
+        self.analyze("A")
+
+        assert self.calls == ["A", "A"]
+        assert self.cache.stats()["expirations"] == 1
+
+    def test_corpus_version_invalidates(self):
+        """Test that SOP changes invalidate cached results."""
+        self.analyze("A")
+        self.version = 2
+        self.analyze("A")
+
+        assert self.calls == ["A", "A"]
+        assert self.cache.stats()["invalidations"] == 1
+
+    def test_failed_results_not_cached(self):
+        """Test that failed analyses are recomputed."""
+        event = {"alarm_name": "Door Forced Open", "device_id": "D1"}
+        for _ in range(2):
+            self.cache.get_or_compute(event, "Access_Control_System", lambda: self.calls.append(1) or {"sop_analysis_failed": True})
+        assert len(self.calls) == 2
+
+    def test_unknown_event_type_bypasses_cache(self):
+        """Test that event types without a normalizer are not cached."""
+        for _ in range(2):
+            self.cache.get_or_compute({}, "Unknown", lambda: self.calls.append(1) or {})
+        assert len(self.calls) == 2
+        assert self.cache.stats()["misses"] == 0
+
+    def test_custom_key_normalizer(self):
+        """Test registering a coarser signature for an event type."""
+        self.cache.set_key_normalizer("CV_Threat_Detection", lambda event: event.get("detection_name"))
+        self.analyze("A", camera_name="Lobby")
+        self.analyze("A", camera_name="Garage")
+        assert self.calls == ["A"]
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that concurrent requests for one signature share a computation."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_compute():
+            self.calls.append("slow")
+            started.set()
+            release.wait(5)
+            return {"final_threat_level": "HIGH"}
+
+        event = {"detection_name": "Smoke or Fire", "severity": "HIGH"}
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute(event, "CV_Threat_Detection", slow_compute)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert self.calls == ["slow"]
+        assert len(results) == 4
+
+    def test_scoped_sops_split_keys(self, tmp_path):
+        """Test that a daytime result is not served for an after-hours event or another site."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "scoped.db"), embedder=None)
+        indexer.index_sop(SAMPLE_SOPS[2].model_copy(update={
+            "special_conditions": SpecialConditions(applies_to_locations=["all_locations"], applies_to_times=["after_hours"])
+        }))
+        indexer.index_sop(SAMPLE_SOPS[0].model_copy(update={
+            "special_conditions": SpecialConditions(applies_to_locations=["Austin"], applies_to_times=["all_times"])
+        }))
+        cache = AnalysisCache(version_provider=lambda: 1, scope_provider=partial(sop_event_scope, db_path=indexer.db_path))
+
+        def key(timestamp, site_name="San Jose"):
+            event = {"alarm_name": "Door Held Open", "device_id": "D-100", "site_name": site_name, "timestamp": timestamp}
+            return cache.make_key(event, "Access_Control_System")
+
+        day, night = key("2025-07-09T12:00:00Z"), key("2025-07-09T23:00:00Z")
+        assert day != night
+        assert day == key("2025-07-09T13:30:00Z")
+        assert key("2025-07-09T12:00:00Z", site_name="Austin") != day
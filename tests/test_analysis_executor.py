@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from agents import analysis_executor as executor_module
+from agents.analysis_executor import AnalysisExecutor, ExecutorSaturatedError, ExecutorUnavailableError
+
+
+class TestAnalysisExecutor:
+    """Test suite for the bounded analysis executor."""
+
+    def setup_method(self):
+        """Start a small executor whose workers can be held busy."""
+        self.release = threading.Event()
+        self.executor = AnalysisExecutor(workers=2, queue_size=2, name="test")
+        self.executor.start()
+
+    def teardown_method(self):
+        self.release.set()
+        self.executor.stop()
+
+    def block(self):
+        self.release.wait(5)
+        return "done"
+
+    def saturate(self):
+        """Occupy both workers and fill the queue."""
+        started = threading.Barrier(3)
+
+        def busy():
+            started.wait(5)
+            return self.block()
+
+        futures = [self.executor.submit(busy) for _ in range(2)]
+        started.wait(5)
+        futures += [self.executor.submit(self.block) for _ in range(2)]
+        return futures
+
+    def test_submit_returns_result(self):
+        """Test that submitted work runs on a worker thread."""
+        future = self.executor.submit(lambda a, b=0: (threading.current_thread().name, a + b), 1, b=2)
+        thread_name, total = future.result(5)
+
+        assert thread_name.startswith("test-worker-")
+        assert total == 3
+
+    def test_exceptions_propagate(self):
+        """Test that worker exceptions surface on the future."""
+        future = self.executor.submit(lambda: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            future.result(5)
+        assert self.executor.stats()["failed"] == 1
+
+    def test_full_queue_rejects(self):
+        """Test backpressure when every worker is busy and the queue is full."""
+        futures = self.saturate()
+
+        with pytest.raises(ExecutorSaturatedError):
+            self.executor.submit(self.block)
+
+        stats = self.executor.stats()
+        assert (stats["busy_workers"], stats["queued"], stats["rejected"]) == (2, 2, 1)
+
+        self.release.set()
+        assert [future.result(5) for future in futures] == ["done"] * 4
+
+    def test_stopped_executor_rejects(self):
+        """Test that work submitted after stop is rejected and queued work is cancelled."""
+        futures = self.saturate()
+        self.release.set()
+        self.executor.stop()
+
+        with pytest.raises(ExecutorUnavailableError):
+            self.executor.submit(self.block)
+        assert all(future.done() for future in futures)
+
+    def test_run_analysis_maps_backpressure_to_http(self, monkeypatch):
+        """Test the 429/503 responses returned to API handlers."""
+        monkeypatch.setattr(executor_module, "analysis_executor", self.executor)
+        self.saturate()
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(executor_module.run_analysis(self.block))
+        assert error.value.status_code == 429
+
+        self.release.set()
+        self.executor.stop()
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(executor_module.run_analysis(self.block))
+        assert error.value.status_code == 503
+
+    def test_event_loop_not_blocked(self):
+        """Test that awaiting slow work leaves the event loop free for other requests."""
+        async def scenario():
+            slow = asyncio.ensure_future(self.executor.run(self.block))
+            await asyncio.sleep(0.05)
+            assert not slow.done()
+            self.release.set()
+            return await slow
+
+        assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,121 @@
+import time
+import pytest
+from agents import triage_agent
+from agents.analysis_executor import AnalysisExecutor, ExecutorSaturatedError
+from agents.triage_agent import batch_analyze_events
+
+
+class TestBatchAnalysis:
+    """Test suite for concurrent batch analysis."""
+
+    @pytest.fixture
+    def slow_analysis(self, monkeypatch):
+        """Replace the triage analysis with one that sleeps for event['delay'] seconds."""
+        def analyze(event_data, event_type):
+            time.sleep(event_data.get("delay", 0))
+            if event_data.get("fail"):
+                raise RuntimeError("analyzer crashed")
+            return {"event_type": event_type, "event_id": event_data["id"]}
+
+        monkeypatch.setattr(triage_agent, "run_triage_analysis", analyze)
+
+    def test_results_preserve_input_order(self, slow_analysis):
+        """Test that results come back in input order regardless of completion order."""
+        events = [{"id": i, "delay": 0.05 * (5 - i)} for i in range(5)]
+        results = batch_analyze_events(events, ["CV_Threat_Detection"] * 5)
+
+        assert [result["event_id"] for result in results] == list(range(5))
+
+    def test_batch_runs_concurrently(self, slow_analysis):
+        """Test that a batch takes about as long as its slowest event."""
+        events = [{"id": i, "delay": 0.2} for i in range(20)]
+
+        start = time.monotonic()
+        results = batch_analyze_events(events, ["Access_Control_System"] * 20, max_workers=20)
+
+        assert len(results) == 20
+        assert time.monotonic() - start < 1.0
+
+    def test_per_event_timeout(self, slow_analysis):
+        """Test that a slow event gets an error result without delaying the others."""
+        events = [{"id": 0, "delay": 2}, {"id": 1}]
+
+        start = time.monotonic()
+        results = batch_analyze_events(events, ["CV_Threat_Detection"] * 2, timeout=0.2)
+
+        assert time.monotonic() - start < 1.0
+        assert "timed out" in results[0]["analysis_reasoning"]
+        assert results[1]["event_id"] == 1
+
+    def test_failed_event_gets_error_result(self, slow_analysis):
+        """Test that one failing event does not fail the batch."""
+        results = batch_analyze_events([{"id": 0, "fail": True}, {"id": 1}], ["CV_Threat_Detection"] * 2)
+
+        assert "analyzer crashed" in results[0]["analysis_reasoning"]
+        assert results[0]["escalation_required"] is True
+        assert results[1]["event_id"] == 1
+
+    def test_batch_size_limit(self, slow_analysis):
+        """Test that settings.max_batch_size is enforced."""
+        size = triage_agent.settings.max_batch_size + 1
+        with pytest.raises(ValueError):
+            batch_analyze_events([{"id": i} for i in range(size)], ["CV_Threat_Detection"] * size)
+
+    def test_mismatched_event_types(self, slow_analysis):
+        """Test that events and event types must line up."""
+        with pytest.raises(ValueError):
+            batch_analyze_events([{"id": 0}], [])
+
+    def test_events_run_on_shared_executor_by_priority(self, slow_analysis):
+        """Test that each event is queued on the given executor at its own pre-score priority."""
+        executor = AnalysisExecutor(workers=2, queue_size=8, name="test-batch")
+        executor.start()
+        try:
+            events = [
+                {"id": 0, "detection_name": "Person Brandishing Firearm", "severity": "SEV0"},
+                {"id": 1, "alarm_name": "Door Held Open", "device_id": "door-1"},
+            ]
+            results = batch_analyze_events(events, ["CV_Threat_Detection", "Access_Control_System"], executor=executor)
+
+            assert [result["event_id"] for result in results] == [0, 1]
+            stats = executor.stats()
+            assert stats["completed"] == 2
+            assert stats["levels"]["CRITICAL"]["admitted"] == 1
+        finally:
+            executor.stop()
+
+    def test_batch_larger_than_queue(self, slow_analysis):
+        """Test that a batch larger than the shared queue runs without preempting its own events."""
+        executor = AnalysisExecutor(workers=2, queue_size=4, name="test-batch-window")
+        executor.start()
+        try:
+            events = [
+                {"id": i, "detection_name": "Person Brandishing Firearm", "severity": "SEV0"} if i % 3 == 0
+                else {"id": i, "alarm_name": "Door Held Open", "device_id": f"door-{i}"}
+                for i in range(30)
+            ]
+            event_types = ["CV_Threat_Detection" if i % 3 == 0 else "Access_Control_System" for i in range(30)]
+            results = batch_analyze_events(events, event_types, executor=executor)
+
+            assert [result["event_id"] for result in results] == list(range(30))
+            stats = executor.stats()
+            assert stats["completed"] == 30
+            assert stats["rejected"] == 0
+            assert all(level["preempted"] == 0 for level in stats["levels"].values())
+        finally:
+            executor.stop()
+
+    def test_batch_rejected_when_executor_full(self, slow_analysis):
+        """Test that a batch is rejected when the shared queue has no room for any of its events."""
+        executor = AnalysisExecutor(workers=1, queue_size=2, name="test-batch-full")
+        executor.start()
+        try:
+            running = executor.submit_prioritized("CRITICAL", time.sleep, 0.3)
+            while not running.running():
+                time.sleep(0.01)
+            for _ in range(2):
+                executor.submit_prioritized("CRITICAL", time.sleep, 0.1)
+            with pytest.raises(ExecutorSaturatedError):
+                batch_analyze_events([{"id": i} for i in range(5)], ["Access_Control_System"] * 5, executor=executor)
+        finally:
+            executor.stop()
@@ -0,0 +1,105 @@
+import itertools
+import pytest
+from agents.tools import access_analyzer, cv_analyzer
+from agents.tools.cv_analyzer import CVThreatAnalyzer
+from agents.tools.access_analyzer import AccessControlAnalyzer
+from agents.triage_agent import bulk_triage_analysis, run_triage_analysis
+
+DETECTION_NAMES = [
+    "Person Brandishing Firearm", "Fire Detected", "Smoke Detected", "Person Falling Down",
+    "Person Jumping Fence", "Door Propped Open", "Tailgating", "Unauthorized Person",
+    "Suspicious Loitering", "Unattended Bag", "Knife Detected", "Vehicle Detected", ""
+]
+SEVERITIES = ["SEV0", "SEV1", "SEV2", "SEV3", "UNKNOWN"]
+CAMERAS = [("HQ", "Lobby Cam 1"), ("Warehouse", "Secure Area"), ("Plant", "Restricted Zone"), ("Plant", "Parking")]
+
+ALARM_NAMES = [
+    "Forced Entry", "Duress Alarm", "Door Held Open", "Invalid Card", "Access Denied",
+    "Door Ajar", "Communication Lost", "Battery Low", "Heartbeat", "Door Status Unknown",
+    "Unknown Alarm Type", "Card Format Error"
+]
+DEVICES = ["Reader-01", "Door-Contact-02", "Keypad-03", "Controller-04", "Emergency-Exit-05", "Lock-06"]
+
+
+def cv_events():
+    return [
+        {"detection_name": name, "severity": severity, "site_name": site, "camera_name": camera}
+        for name, severity, (site, camera) in itertools.product(DETECTION_NAMES, SEVERITIES, CAMERAS)
+    ]
+
+
+def access_events():
+    return [
+        {"alarm_name": alarm, "device_id": device, "controller_id": "CTRL-1", "timestamp": "2025-07-08T18:30:03Z"}
+        for alarm, device in itertools.product(ALARM_NAMES, DEVICES)
+    ]
+
+
+class TestBulkAnalysis:
+    """Test suite for the analyzers' bulk analyze_many path."""
+
+    def test_cv_matches_scalar_path(self):
+        """Test that CV bulk analysis is identical to per-event analysis."""
+        analyzer = CVThreatAnalyzer()
+        events = cv_events() * 2
+
+        assert analyzer.analyze_many(events) == [analyzer._run(event) for event in events]
+
+    def test_access_matches_scalar_path(self):
+        """Test that access control bulk analysis is identical to per-event analysis."""
+        analyzer = AccessControlAnalyzer()
+        events = access_events() * 2
+
+        assert analyzer.analyze_many(events) == [analyzer._run(event) for event in events]
+
+    def test_every_indicator_classified_alike(self):
+        """Test that single and bulk analysis give the same threat level for every indicator."""
+        cv = CVThreatAnalyzer()
+        cv_lists = [cv_analyzer.CRITICAL_INDICATORS, cv_analyzer.HIGH_INDICATORS, cv_analyzer.MEDIUM_INDICATORS]
+        cv_events = [
+            {"detection_name": f"Person {indicator.title()} Near Gate", "severity": "SEV3"}
+            for indicators in cv_lists for indicator in indicators
+        ]
+        assert [result["ai_threat_level"] for result in cv.analyze_many(cv_events)] == [
+            cv._run(event)["ai_threat_level"] for event in cv_events
+        ]
+
+        access = AccessControlAnalyzer()
+        access_lists = [
+            access_analyzer.CRITICAL_INDICATORS, access_analyzer.HIGH_INDICATORS,
+            access_analyzer.MEDIUM_INDICATORS, access_analyzer.LOW_INDICATORS
+        ]
+        access_events = [
+            {"alarm_name": indicator.upper(), "device_id": "Door-Contact-01"}
+            for indicators in access_lists for indicator in indicators
+        ]
+        levels = [result["ai_threat_level"] for result in access.analyze_many(access_events)]
+        assert levels == [access._run(event)["ai_threat_level"] for event in access_events]
+        assert levels[0] == "CRITICAL" and levels[-1] == "LOW"
+
+    def test_results_are_independent(self):
+        """Test that events sharing a signature do not share result objects."""
+        event = {"detection_name": "Person Brandishing Firearm", "severity": "SEV0"}
+        first, second = CVThreatAnalyzer().analyze_many([event, dict(event)])
+
+        first["recommended_actions"].append("extra")
+        assert "extra" not in second["recommended_actions"]
+
+    def test_bulk_triage_mixed_types(self):
+        """Test that mixed and unknown event types keep input order and scalar output."""
+        events = [cv_events()[0], access_events()[0], {"alarm_name": "Forced Entry"}, cv_events()[-1]]
+        event_types = ["CV_Threat_Detection", "Access_Control_System", "Unknown_Type", "CV_Threat_Detection"]
+
+        results = bulk_triage_analysis(events, event_types)
+
+        assert results == [run_triage_analysis(event, event_type) for event, event_type in zip(events, event_types)]
+        assert "Unknown event type" in results[2]["analysis_reasoning"]
+
+    def test_malformed_event_falls_back(self):
+        """Test that a malformed event only gets an error result for itself."""
+        events = access_events()[:2] + [{"alarm_name": None, "device_id": "Reader-01"}]
+
+        results = bulk_triage_analysis(events, ["Access_Control_System"] * 3)
+
+        assert results[:2] == [run_triage_analysis(event, "Access_Control_System") for event in events[:2]]
+        assert results[2]["analysis_reasoning"].startswith("Analysis failed")
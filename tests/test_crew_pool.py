@@ -0,0 +1,70 @@
+import threading
+import pytest
+from crewai import Agent, Crew, Task
+from agents import crew_pool
+from agents.crew_pool import get_pooled_crew
+
+
+def make_agent():
+    return Agent(role="Tester", goal="Test pooling", backstory="Unit test agent", verbose=False, allow_delegation=False)
+
+
+class TestCrewPool:
+    """Test suite for the per-worker agent and crew pool."""
+
+    @pytest.fixture(autouse=True)
+    def fake_kickoff(self, monkeypatch):
+        """Record kickoffs instead of calling the LLM."""
+        self.kickoffs = []
+
+        def kickoff(crew, inputs=None):
+            self.kickoffs.append((id(crew), [task.description for task in crew.tasks]))
+            crew.agents[0].tools_results.append({"tool": "SOP Contextual Search"})
+            return "done"
+
+        monkeypatch.setattr(Crew, "kickoff", kickoff)
+        monkeypatch.setattr(crew_pool, "_local", threading.local())
+
+    def task(self, description):
+        return Task(description=description, expected_output="Nothing")
+
+    def test_agent_and_crew_reused_per_thread(self):
+        """Test that one thread reuses its agent and crew with per-request tasks."""
+        factory_calls = []
+
+        def factory():
+            factory_calls.append(1)
+            return make_agent()
+
+        first = get_pooled_crew("test", factory, verbose=False)
+        assert first.kickoff(self.task("event 1")) == "done"
+        second = get_pooled_crew("test", factory, verbose=False)
+        second.kickoff(self.task("event 2"))
+
+        assert first is second
+        assert len(factory_calls) == 1
+        assert self.kickoffs[0][0] == self.kickoffs[1][0]
+        assert [tasks for _, tasks in self.kickoffs] == [["event 1"], ["event 2"]]
+
+    def test_state_reset_between_events(self):
+        """Test that tool results, tool cache and tasks are cleared after each event."""
+        pooled = get_pooled_crew("test", make_agent, verbose=False)
+        pooled.agent.cache_handler.add("SOP Contextual Search", "fall", "cached result")
+        pooled.kickoff(self.task("event"))
+
+        assert pooled.agent.tools_results == []
+        assert pooled.agent.cache_handler.read("SOP Contextual Search", "fall") is None
+        assert pooled.crew.tasks == []
+        assert pooled.runs == 1
+
+    def test_threads_get_separate_crews(self):
+        """Test that agents are never shared between worker threads."""
+        pooled = []
+        threads = [threading.Thread(target=lambda: pooled.append(get_pooled_crew("test", make_agent, verbose=False))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert pooled[0] is not pooled[1]
+        assert pooled[0].agent is not pooled[1].agent
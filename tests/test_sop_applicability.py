@@ -0,0 +1,83 @@
+import pytest
+from datetime import datetime, timezone
+from sop.applicability import ApplicabilityIndex, compile_window, normalize_path, MINUTES_PER_DAY
+from sop.models import SpecialConditions
+from sop.sop_snapshot import get_sop_snapshot
+from sop.vector_indexer import VectorIndexer
+from agents.sop_rule_engine import run_rule_based_sop_analysis
+from tests.test_sop_search import SAMPLE_SOPS
+
+# Wednesday 2025-07-09
+WEDNESDAY_NOON = datetime(2025, 7, 9, 12, 0, tzinfo=timezone.utc)
+WEDNESDAY_NIGHT = datetime(2025, 7, 9, 23, 0, tzinfo=timezone.utc)
+SATURDAY_NOON = datetime(2025, 7, 12, 12, 0, tzinfo=timezone.utc)
+
+
+class TestSOPApplicability:
+    """Test suite for location- and time-scoped SOP applicability."""
+
+    @pytest.fixture
+    def index(self):
+        index = ApplicabilityIndex()
+        index.add("ANYWHERE", {"applies_to_locations": ["all_locations"], "applies_to_times": ["all_times"]})
+        index.add("BUILDING", {"applies_to_locations": ["San Jose > Building 1"], "applies_to_times": []})
+        index.add("SERVER-ROOM", {"applies_to_locations": ["Server Room"], "applies_to_times": ["all_times"]})
+        index.add("AFTER-HOURS", {"applies_to_locations": [], "applies_to_times": ["after_hours"]})
+        return index
+
+    def test_location_trie(self, index):
+        """Test that path scopes match the subtree and single names match anywhere in the path."""
+        office = normalize_path("San Jose > Building 1 > Floor 2 > Office")
+        assert index.applicable(office, WEDNESDAY_NOON) == {"BUILDING"}
+        assert index.applicable(["San Jose", "Building 2", "Server Room"], WEDNESDAY_NOON) == {"SERVER-ROOM"}
+        assert index.applicable(["San Jose"], WEDNESDAY_NOON) == set()
+        assert "ANYWHERE" not in index.applicable(None, None)
+
+    def test_time_windows(self, index):
+        """Test business-hours calendars, including weekends and unknown event times."""
+        assert index.applicable(["Austin"], WEDNESDAY_NOON) == set()
+        assert index.applicable(["Austin"], WEDNESDAY_NIGHT) == {"AFTER-HOURS"}
+        assert index.applicable(["Austin"], SATURDAY_NOON) == {"AFTER-HOURS"}
+        assert index.applicable(["Austin"], None) == {"AFTER-HOURS"}
+
+    def test_custom_ranges_wrap_midnight(self):
+        """Test that a range ending before it starts continues into the next day (and week)."""
+        mask = compile_window("Sun 23:00-01:00")
+        sunday_2330 = 6 * MINUTES_PER_DAY + 23 * 60 + 30
+        assert mask >> sunday_2330 & 1
+        assert mask >> 30 & 1
+        assert not mask >> 90 & 1
+        assert compile_window("24/7") is None
+        with pytest.raises(ValueError):
+            compile_window("when the moon is full")
+
+    def test_unrecognized_window_never_prunes(self, index):
+        """Test that an SOP with an unparseable schedule is treated as always applicable."""
+        index.add("ODD", {"applies_to_times": ["when the moon is full"], "applies_to_locations": ["Austin"]})
+        assert "ODD" in index.applicable(["Austin"], WEDNESDAY_NOON)
+
+        index.remove("ODD")
+        index.remove("BUILDING")
+        assert index.applicable(normalize_path("San Jose > Building 1"), WEDNESDAY_NOON) == set()
+
+    def test_scoped_sops_pruned_from_search_and_analysis(self, tmp_path):
+        """Test that SOPs for other sites or hours are skipped by the snapshot and the rule engine."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "scoped.db"), embedder=None)
+        indexer.index_sop(SAMPLE_SOPS[0].model_copy(update={
+            "special_conditions": SpecialConditions(applies_to_locations=["Austin"], applies_to_times=["all_times"])
+        }))
+        indexer.index_sop(SAMPLE_SOPS[2].model_copy(update={
+            "special_conditions": SpecialConditions(applies_to_locations=["all_locations"], applies_to_times=["after_hours"])
+        }))
+
+        snapshot = get_sop_snapshot(indexer.db_path)
+        assert [sop["sop_id"] for sop in snapshot.search("person falling", location=["austin", "lobby"])] == ["SOP-001"]
+        assert snapshot.search("person falling", location=["san jose", "lobby"]) == []
+
+        def access_event(timestamp):
+            return {"alarm_id": "A1", "alarm_name": "Door Held Open", "device_id": "D-100", "timestamp": timestamp}
+
+        result, _ = run_rule_based_sop_analysis(access_event("2025-07-09T23:00:00Z"), "Access_Control_System", indexer.db_path)
+        assert [sop["sop_id"] for sop in result["applicable_sops"]] == ["SOP-003"]
+        result, _ = run_rule_based_sop_analysis(access_event("2025-07-09T12:00:00Z"), "Access_Control_System", indexer.db_path)
+        assert result["applicable_sops"] == []
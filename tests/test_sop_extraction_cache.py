@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from sop.extraction_cache import ExtractionCache, content_hash
+from sop.sop_extractor import SOPExtractor
+
+DOCUMENT = """# Fire Evacuation
+
+When the fire alarm sounds,   evacuate the building immediately.
+Notify the fire department and account for all staff.
+"""
+
+SOP_DATA = {
+    "sop_id": "SOP-FIRE-001",
+    "title": "Fire Evacuation",
+    "category": "environmental",
+    "triggers": ["fire alarm", "smoke"],
+    "priority_override": "CRITICAL",
+    "response_requirements": {
+        "timeline": "IMMEDIATE",
+        "notifications": ["Fire Department"],
+        "required_actions": ["Evacuate building", "Account for staff"]
+    },
+    "special_conditions": {
+        "applies_to_locations": ["all_locations"],
+        "applies_to_times": ["all_times"],
+        "escalation_required": True
+    },
+    "regulatory_requirements": ["OSHA"]
+}
+
+
+class FakeCompletions:
+    def __init__(self, content=json.dumps(SOP_DATA), delay=0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+class TestSOPExtractionCache:
+    """Test suite for the content-addressed SOP extraction cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return ExtractionCache(str(tmp_path / "cache.db"), max_entries=10, ttl_seconds=3600)
+
+    def extractor(self, cache, completions):
+        extractor = SOPExtractor(cache=cache)
+        extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return extractor
+
+    def test_unchanged_documents_skip_the_llm(self, cache):
+        """Test that a re-upload differing only in whitespace is served from the cache."""
+        completions = FakeCompletions()
+        extractor = self.extractor(cache, completions)
+
+        first, error = extractor.extract_sop_structure(DOCUMENT, "Fire Evacuation", "fire.md")
+        assert error is None
+        reformatted = "\n\n".join(" ".join(line.split()) for line in DOCUMENT.splitlines()) + "\n\n"
+        second, error = extractor.extract_sop_structure(reformatted, "fire-v2", "fire-v2.md")
+
+        assert completions.calls == 1
+        assert second.sop_id == first.sop_id == "SOP-FIRE-001"
+        assert second.document_source == "fire-v2.md"
+        assert second.original_text == reformatted
+        assert cache.stats()["hits"] == 1
+
+    def test_model_prompt_and_failures_miss(self, cache):
+        """Test that a different model or prompt re-extracts and failed extractions are not cached."""
+        completions = FakeCompletions()
+        extractor = self.extractor(cache, completions)
+        extractor.extract_sop_structure(DOCUMENT, "Fire Evacuation", "fire.md")
+
+        extractor.model = "gpt-4o"
+        extractor.extract_sop_structure(DOCUMENT, "Fire Evacuation", "fire.md")
+        assert completions.calls == 2
+
+        other = ExtractionCache(cache.storage.db_path, max_entries=10, ttl_seconds=3600)
+        assert other.get_or_extract(DOCUMENT, "gpt-4", "old-prompt", lambda: ({"a": 1}, None))[2] is False
+
+        broken = self.extractor(cache, FakeCompletions(content="not json"))
+        _, error = broken.extract_sop_structure("A different document", "Other", "other.md")
+        assert "Failed to parse" in error
+        assert len(cache.entries(content_hash=content_hash("A different document"))) == 0
+
+    def test_concurrent_misses_extract_once(self, cache):
+        """Test that simultaneous uploads of the same document make a single LLM call."""
+        completions = FakeCompletions(delay=0.1)
+        extractor = self.extractor(cache, completions)
+        threads = [
+            threading.Thread(target=extractor.extract_sop_structure, args=(DOCUMENT, "Fire", "fire.md"))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert completions.calls == 1
+        assert cache._inflight == {}
+
+    def test_inspect_evict_and_purge(self, cache):
+        """Test listing, size-bounded eviction, expiry and purging of entries."""
+        cache.max_entries = 3
+        for n in range(5):
+            cache.get_or_extract(f"document {n}", "gpt-4", "v1", lambda: (SOP_DATA, None), document_title=f"Doc {n}")
+
+        entries = cache.entries()
+        assert [entry["document_title"] for entry in entries] == ["Doc 4", "Doc 3", "Doc 2"]
+        assert cache.get_entry(entries[0]["cache_key"])["data"] == SOP_DATA
+
+        cache.get_or_extract("document 9", "gpt-4", "v2", lambda: (SOP_DATA, None))
+        assert cache.purge(prompt_version="v1") == 2
+        assert cache.purge(key=entries[0]["cache_key"]) == 0
+        assert cache.purge() == 1
+
+        cache.ttl_seconds = 0
+        assert cache.get_or_extract("document 1", "gpt-4", "v1", lambda: (SOP_DATA, None))[2] is False
+        assert cache.get_or_extract("document 1", "gpt-4", "v1", lambda: (SOP_DATA, None))[2] is False
+
+    def test_hits_do_not_write(self, cache):
+        """Test that a hit only reads, and its recency is recorded with the next stored extraction."""
+        cache.max_entries = 2
+        cache.get_or_extract("document 0", "gpt-4", "v1", lambda: (SOP_DATA, None))
+        cache.get_or_extract("document 1", "gpt-4", "v1", lambda: (SOP_DATA, None))
+
+        observer = cache.storage.connect()
+        data_version = observer.execute('PRAGMA data_version').fetchone()[0]
+        assert cache.get_or_extract("document 0", "gpt-4", "v1", lambda: (None, "unexpected"))[2] is True
+        assert observer.execute('PRAGMA data_version').fetchone()[0] == data_version
+        observer.close()
+
+        cache.get_or_extract("document 2", "gpt-4", "v1", lambda: (SOP_DATA, None))
+        assert len(cache.entries(content_hash=content_hash("document 1"))) == 0
+        assert cache.entries(content_hash=content_hash("document 0"))[0]["hits"] == 1
@@ -0,0 +1,98 @@
+import os
+import threading
+import pytest
+from agents.analysis_executor import ExecutorSaturatedError
+from sop.ingestion_executor import SOPIngestionExecutor, IngestionCancelledError
+
+
+def stages(token, started, release, log):
+    """An ingestion job with two stages, blocked between them until released"""
+    started.set()
+    release.wait(5)
+    token.raise_if_cancelled()
+    log.append("structure")
+    token.commit()
+    log.append("indexed")
+
+
+class TestSOPIngestionExecutor:
+    """Test suite for the SOP ingestion executor."""
+
+    @pytest.fixture
+    def executor(self):
+        executor = SOPIngestionExecutor(workers=1, queue_size=1, parse_workers=0, name="ingestion-test")
+        executor.start()
+        yield executor
+        executor.stop()
+
+    def test_cancel_queued_and_running_jobs(self, executor):
+        """Test that a queued job never runs and a running job stops at its next stage."""
+        started, release, log = threading.Event(), threading.Event(), []
+        running = executor.submit("running", stages, started, release, log)
+        assert started.wait(5)
+        queued = executor.submit("queued", stages, threading.Event(), release, log)
+
+        assert executor.cancel("queued")
+        assert queued.cancelled()
+        assert executor.cancel("running")
+        release.set()
+
+        with pytest.raises(IngestionCancelledError):
+            running.result(5)
+        assert log == []
+        assert not executor.cancel("running")
+        assert executor.stats()["cancelled"] == 2
+
+    def test_committed_job_cannot_be_cancelled(self, executor):
+        """Test that once a job starts writing its result, cancellation is refused."""
+        committed, release = threading.Event(), threading.Event()
+
+        def job(token):
+            token.commit()
+            committed.set()
+            release.wait(5)
+            return "indexed"
+
+        future = executor.submit("job-1", job)
+        assert committed.wait(5)
+        assert not executor.cancel("job-1")
+        release.set()
+        assert future.result(5) == "indexed"
+
+    def test_queue_is_bounded(self, executor):
+        """Test that uploads beyond the worker and queue capacity are rejected."""
+        started, release = threading.Event(), threading.Event()
+        executor.submit("job-1", stages, started, release, [])
+        assert started.wait(5)
+        executor.submit("job-2", stages, threading.Event(), release, [])
+
+        with pytest.raises(ExecutorSaturatedError):
+            executor.submit("job-3", stages, threading.Event(), release, [])
+        release.set()
+
+    def test_parsing_runs_in_process_pool(self):
+        """Test that documents are parsed outside the API process."""
+        executor = SOPIngestionExecutor(workers=1, queue_size=1, parse_workers=1, name="ingestion-test")
+        executor.start()
+        try:
+            future = executor.submit("job-1", lambda token: executor.parse(token, os.getpid))
+            assert future.result(30) != os.getpid()
+        finally:
+            executor.stop()
+
+    def test_parse_stops_waiting_when_cancelled(self):
+        """Test that a parse still running in the pool is abandoned once its job is cancelled."""
+        from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+        from types import SimpleNamespace
+        from sop.ingestion_executor import CancellationToken
+
+        class PendingFuture(Future):
+            def result(self, timeout=None):
+                token.cancel()
+                raise FutureTimeoutError()
+
+        token = CancellationToken()
+        executor = SOPIngestionExecutor(workers=1, queue_size=1, parse_workers=0, name="ingestion-test")
+        executor._parse_pool = SimpleNamespace(submit=lambda fn, *args: PendingFuture())
+        with pytest.raises(IngestionCancelledError):
+            executor.parse(token, os.getpid)
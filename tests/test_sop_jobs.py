@@ -0,0 +1,117 @@
+import asyncio
+import time
+import pytest
+from sop.job_events import JobEventBroadcaster
+from sop.job_store import SOPJobStore
+from sop.models import SOPProcessingStatus
+
+
+def make_job(job_id, status="uploaded"):
+    return SOPProcessingStatus(job_id=job_id, status=status, filename=f"{job_id}.md", file_size=100, progress=10)
+
+
+class TestSOPJobStore:
+    """Test suite for the persistent SOP processing job store."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SOPJobStore(str(tmp_path / "jobs.db"), ttl_seconds=60, stale_after_seconds=60)
+
+    def test_job_lifecycle(self, store):
+        """Test that updates are persisted and completion records a reference to the SOP."""
+        store.create(make_job("job-1"))
+        assert store.update("job-1", status="indexing", progress=75, message="Indexing...")
+        assert store.get("job-1").status == "indexing"
+        assert store.get("job-1").completed_at is None
+
+        store.update("job-1", status="completed", progress=100, result_sop_id="SOP-001")
+        job = store.get("job-1")
+        assert job.result_sop_id == "SOP-001"
+        assert job.completed_at is not None
+
+        assert store.get("missing") is None
+        assert not store.update("missing", progress=50)
+        with pytest.raises(ValueError):
+            store.update("job-1", filename="other.md")
+
+    def test_jobs_shared_between_stores(self, store):
+        """Test that a job created by one worker is visible to another opening the same database."""
+        store.create(make_job("job-1"))
+        other = SOPJobStore(store.storage.db_path, ttl_seconds=60, stale_after_seconds=60)
+        other.update("job-1", status="failed", error="boom")
+        assert store.get("job-1").error == "boom"
+
+    def test_list_by_status(self, store):
+        """Test listing recent jobs, filtered by status."""
+        for job_id in ("job-1", "job-2", "job-3"):
+            store.create(make_job(job_id))
+        store.update("job-2", status="completed", result_sop_id="SOP-002")
+
+        assert [job.job_id for job in store.list(status="completed")] == ["job-2"]
+        assert {job.job_id for job in store.list(status="uploaded")} == {"job-1", "job-3"}
+        assert len(store.list(limit=2)) == 2
+
+    def test_finished_jobs_expire(self, store):
+        """Test that finished jobs are evicted after their TTL while running jobs are kept."""
+        store.ttl_seconds = 0
+        store.create(make_job("running"))
+        store.create(make_job("done"))
+        store.update("done", status="completed", result_sop_id="SOP-001")
+
+        assert store.get("done") is None
+        assert store.evict() == {"stalled": 0, "expired": 1}
+        assert store.get("running") is not None
+
+    def test_stalled_jobs_marked_failed(self, store):
+        """Test that jobs whose worker stopped making progress are failed, then expire."""
+        store.create(make_job("job-1"))
+        with store.storage.write() as conn:
+            conn.execute("UPDATE sop_jobs SET updated_at = ?", (time.time() - 120,))
+
+        assert store.evict()["stalled"] == 1
+        job = store.get("job-1")
+        assert job.status == "failed"
+        assert job.error == "Processing was interrupted"
+
+
+class TestSOPJobEvents:
+    """Test suite for pushed SOP job progress."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = SOPJobStore(str(tmp_path / "jobs.db"), ttl_seconds=60, stale_after_seconds=60)
+        store.create(make_job("job-1"))
+        return store
+
+    async def collect(self, broadcaster, job_id):
+        return [job["status"] async for job in broadcaster.subscribe(job_id)]
+
+    def test_published_transitions_fan_out(self, store):
+        """Test that every subscriber gets each stage once and its stream ends when the job finishes."""
+        broadcaster = JobEventBroadcaster(store, poll_interval=60)
+
+        async def run():
+            subscribers = [asyncio.create_task(self.collect(broadcaster, "job-1")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            for status in ("extracting_text", "extracting_text", "indexing", "completed"):
+                store.update("job-1", status=status)
+                broadcaster.publish(store.get("job-1"))
+            return await asyncio.gather(*subscribers)
+
+        results = asyncio.run(run())
+        assert results == [["uploaded", "extracting_text", "indexing", "completed"]] * 3
+        assert broadcaster.subscriber_count == 0
+
+    def test_changes_from_other_workers_are_polled(self, store):
+        """Test that updates written by another process reach subscribers without a publish."""
+        broadcaster = JobEventBroadcaster(store, poll_interval=0.01)
+        other_worker = SOPJobStore(store.storage.db_path)
+
+        async def run():
+            subscriber = asyncio.create_task(self.collect(broadcaster, "job-1"))
+            await asyncio.sleep(0.05)
+            other_worker.update("job-1", status="failed", error="boom")
+            return await asyncio.wait_for(subscriber, 5)
+
+        assert asyncio.run(run()) == ["uploaded", "failed"]
+        assert asyncio.run(self.collect(broadcaster, "missing")) == []
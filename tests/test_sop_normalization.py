@@ -0,0 +1,83 @@
+import json
+import pytest
+from sop.models import ProcessedSOP, ResponseRequirements
+from sop.normalization import parse_timeline
+from sop.sections import merge_section_extractions
+from sop.vector_indexer import VectorIndexer
+from agents.tools.sop_search import merge_response_requirements
+from tests.test_sop_search import SAMPLE_SOPS
+
+
+class TestSOPNormalization:
+    """Test suite for SOP timeline and priority normalization at ingest."""
+
+    @pytest.mark.parametrize("timeline,expected", [
+        ("IMMEDIATE", (0, "IMMEDIATE")),
+        ("IMMEDIATE (within 30 seconds)", (30, "IMMEDIATE")),
+        ("URGENT (within 2 minutes)", (120, "URGENT")),
+        ("within two minutes", (120, "URGENT")),
+        ("15 minutes", (900, "PROMPT")),
+        ("half an hour", (1800, "PROMPT")),
+        ("Respond within 1.5 hours", (5400, "ROUTINE")),
+        ("Immediate notification; investigation within 24 hours", (0, "IMMEDIATE")),
+        ("Not specified", (None, None)),
+    ])
+    def test_parse_timeline(self, timeline, expected):
+        """Test that free-text timelines parse to a deadline and urgency class."""
+        assert parse_timeline(timeline) == expected
+
+    def test_requirements_parsed_at_ingest(self):
+        """Test that models carry the parsed timeline and a canonical priority."""
+        requirements = ResponseRequirements(timeline="within 45 seconds")
+        assert requirements.timeline_seconds == 45
+        assert requirements.urgency == "IMMEDIATE"
+
+        data = SAMPLE_SOPS[0].model_dump()
+        assert ProcessedSOP.model_validate(dict(data, priority_override=" high ")).priority_override == "HIGH"
+        assert ProcessedSOP.model_validate(dict(data, priority_override="None")).priority_override is None
+
+    def test_merge_picks_shortest_deadline(self):
+        """Test that merging compares deadlines, whatever the wording."""
+        sops = [
+            {"response_requirements": ResponseRequirements(timeline=timeline).model_dump(mode="json")}
+            for timeline in ["URGENT", "Not specified", "within ninety seconds", "15 minutes"]
+        ]
+        merged = merge_response_requirements(sops)
+
+        assert merged["timeline"] == "within ninety seconds"
+        assert merged["timeline_seconds"] == 90
+        assert merged["urgency"] == "URGENT"
+        assert merge_response_requirements(sops[1:2])["timeline"] == "Not specified"
+
+    def test_merge_named_urgency_beats_shorter_deadline(self):
+        """Test that an IMMEDIATE timeline with a long follow-up step still beats "within 1 hour"."""
+        mixed = "Immediate notification; investigation within 24 hours"
+        sops = [
+            {"response_requirements": ResponseRequirements(timeline="within 1 hour").model_dump(mode="json")},
+            {"response_requirements": ResponseRequirements(timeline=mixed).model_dump(mode="json")},
+            # Stored before named urgencies capped the deadline
+            {"response_requirements": {"timeline": mixed, "timeline_seconds": 86400, "urgency": "IMMEDIATE"}},
+        ]
+
+        assert merge_response_requirements(sops)["timeline"] == mixed
+        assert merge_response_requirements([sops[0], sops[2]])["urgency"] == "IMMEDIATE"
+        merged = merge_section_extractions([
+            {"response_requirements": {"timeline": "within 1 hour"}},
+            {"response_requirements": {"timeline": mixed}},
+        ])
+        assert merged["response_requirements"]["timeline"] == mixed
+
+    def test_existing_sops_migrated(self, tmp_path):
+        """Test that SOPs stored without parsed timelines get them when the database is opened."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "timelines.db"), embedder=None)
+        indexer.index_sop(SAMPLE_SOPS[2])
+        with indexer.storage.write() as conn:
+            conn.execute(
+                "UPDATE sops SET data = json_remove(data, '$.response_requirements.timeline_seconds', "
+                "'$.response_requirements.urgency')"
+            )
+
+        reopened = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        data = json.loads(reopened.storage.read().execute("SELECT data FROM sops").fetchone()[0])
+        assert data["response_requirements"]["timeline_seconds"] == 300
+        assert data["response_requirements"]["urgency"] == "URGENT"
@@ -0,0 +1,136 @@
+import pytest
+from functools import partial
+from sop.vector_indexer import VectorIndexer
+from agents import triage_agent
+from agents.sop_rule_engine import KNOWN_EVENT_SIGNATURES, get_sop_decision_table, run_rule_based_sop_analysis
+from tests.test_sop_search import SAMPLE_SOPS
+
+
+class TestSOPRuleEngine:
+    """Test suite for the deterministic SOP-enhanced analysis."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        """Index the sample SOPs into a fresh database."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "sops.db"))
+        for sop in SAMPLE_SOPS:
+            indexer.index_sop(sop)
+        return indexer.db_path
+
+    def cv_event(self, detection_name):
+        return {
+            "alert_event_id": "1001",
+            "detection_name": detection_name,
+            "severity": "HIGH",
+            "site_name": "San Jose",
+            "camera_name": "Lobby"
+        }
+
+    def test_sop_override_supersedes_ai_assessment(self, db_path):
+        """Test that a matching SOP overrides the AI threat level and merges actions."""
+        result, decisive = run_rule_based_sop_analysis(self.cv_event("Person Falling Down"), "CV_Threat_Detection", db_path)
+
+        assert decisive
+        assert result["original_security_analysis"]["ai_threat_level"] == "LOW"
+        assert result["sop_priority_override"] == "HIGH"
+        assert result["final_threat_level"] == "HIGH"
+        assert result["final_priority_score"] == 9
+        assert [sop["sop_id"] for sop in result["applicable_sops"]] == ["SOP-001"]
+        assert result["merged_response_actions"][:2] == ["Dispatch first aid responder", "Contact emergency services"]
+        assert result["response_timeline"] == "IMMEDIATE (within 30 seconds)"
+        assert result["escalation_required"]
+        assert result["regulatory_requirements"] == ["OSHA Incident Reporting"]
+        assert result["analysis_engine"] == "rule_based"
+
+    def test_access_event_matches_access_sop(self, db_path):
+        """Test SOP matching for access control events."""
+        event = {"alarm_id": "A1", "alarm_name": "Door Held Open", "device_id": "D-100"}
+        result, decisive = run_rule_based_sop_analysis(event, "Access_Control_System", db_path)
+
+        assert decisive
+        assert result["applicable_sops"][0]["sop_id"] == "SOP-003"
+        assert result["final_threat_level"] == "MEDIUM"
+        assert result["final_priority_score"] == 6
+
+    def test_no_matching_sop_is_not_decisive(self, db_path):
+        """Test that events without an applicable SOP keep the AI assessment."""
+        result, decisive = run_rule_based_sop_analysis(self.cv_event("Tailgating"), "CV_Threat_Detection", db_path)
+
+        assert not decisive
+        assert result["applicable_sops"] == []
+        assert result["sop_priority_override"] is None
+        assert result["final_threat_level"] == result["original_security_analysis"]["ai_threat_level"]
+        assert result["final_priority_score"] == result["original_security_analysis"]["priority_score"]
+
+    def test_unknown_event_type_raises(self, db_path):
+        """Test that unknown event types are rejected."""
+        with pytest.raises(ValueError):
+            run_rule_based_sop_analysis({}, "Unknown", db_path)
+
+    def test_crew_only_used_when_not_decisive(self, db_path, monkeypatch):
+        """Test that run_sop_enhanced_analysis escalates only non-decisive events."""
+        crew_calls = []
+        monkeypatch.setattr(triage_agent, "run_rule_based_sop_analysis", partial(run_rule_based_sop_analysis, db_path=db_path))
+        monkeypatch.setattr(triage_agent, "run_crew_sop_analysis", lambda event_data, event_type, fallback_result=None: crew_calls.append(event_type) or {"analysis_engine": "crew"})
+
+        result = triage_agent.run_sop_enhanced_analysis(self.cv_event("Person Brandishing Firearm"), "CV_Threat_Detection")
+        assert result["final_threat_level"] == "CRITICAL"
+        assert crew_calls == []
+
+        result = triage_agent.run_sop_enhanced_analysis(self.cv_event("Tailgating"), "CV_Threat_Detection")
+        assert result == {"analysis_engine": "crew"}
+
+        result = triage_agent.run_sop_enhanced_analysis(self.cv_event("Tailgating"), "CV_Threat_Detection", allow_crew=False)
+        assert result["analysis_engine"] == "rule_based"
+        assert crew_calls == ["CV_Threat_Detection"]
+
+    def test_crew_failure_returns_rule_based_result(self, db_path, monkeypatch):
+        """Test that a failing crew falls back to the rule-based result instead of a generic error."""
+        def unavailable(*args, **kwargs):
+            raise RuntimeError("OpenAI API key is not configured")
+
+        monkeypatch.setattr(triage_agent, "run_rule_based_sop_analysis", partial(run_rule_based_sop_analysis, db_path=db_path))
+        monkeypatch.setattr(triage_agent, "get_pooled_crew", unavailable)
+        expected, decisive = run_rule_based_sop_analysis(self.cv_event("Tailgating"), "CV_Threat_Detection", db_path)
+        assert not decisive
+
+        result = triage_agent.run_sop_enhanced_analysis(self.cv_event("Tailgating"), "CV_Threat_Detection")
+        assert result["analysis_engine"] == "rule_based"
+        assert result["crew_error"] == "OpenAI API key is not configured"
+        assert result["final_threat_level"] == expected["final_threat_level"]
+        assert result["sop_analysis_failed"] is False
+
+    def test_decision_table_precomputes_known_signatures(self, db_path):
+        """Test that known event names are resolved up front and then served from the table."""
+        table = get_sop_decision_table(db_path)
+        run_rule_based_sop_analysis(self.cv_event("Person Falling Down"), "CV_Threat_Detection", db_path)
+        run_rule_based_sop_analysis(self.cv_event("  person   FALLING down "), "CV_Threat_Detection", db_path)
+
+        stats = table.stats()
+        assert stats["entries"] == sum(len(names) for names in KNOWN_EVENT_SIGNATURES.values())
+        assert stats["hits"] == 2 and stats["misses"] == 0
+
+        decision = table.lookup("CV_Threat_Detection", "Person Falling Down")
+        assert decision.priority_override == "HIGH"
+        assert decision.requirements["timeline"] == "IMMEDIATE (within 30 seconds)"
+        assert [sop["sop_id"] for sop in decision.applicable_sops] == ["SOP-001"]
+
+    def test_decision_table_rebuilt_on_sop_changes(self, db_path):
+        """Test that indexing or deleting an SOP rebuilds the table."""
+        table = get_sop_decision_table(db_path)
+        assert table.lookup("CV_Threat_Detection", "Tailgating").applicable_sops == []
+
+        indexer = VectorIndexer(db_path=db_path)
+        indexer.index_sop(SAMPLE_SOPS[2].model_copy(update={"sop_id": "SOP-004", "triggers": ["tailgating"]}))
+        assert [sop["sop_id"] for sop in table.lookup("CV_Threat_Detection", "Tailgating").applicable_sops] == ["SOP-004"]
+
+        indexer.delete_sop("SOP-004")
+        assert table.lookup("CV_Threat_Detection", "Tailgating").applicable_sops == []
+        assert table.stats()["rebuilds"] == 3
+
+    def test_simulated_event_names_are_precomputed(self):
+        """Test that every name the simulator produces has a precomputed decision."""
+        from simulation.simulator import EVENT_TYPE_MAPPING
+
+        known = {name for names in KNOWN_EVENT_SIGNATURES.values() for name in names}
+        assert set(EVENT_TYPE_MAPPING) == known
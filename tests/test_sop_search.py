@@ -0,0 +1,563 @@
+import json
+import sqlite3
+import pytest
+from sop.extraction_cache import ExtractionCache
+from sop.job_store import SOPJobStore
+from sop.models import ProcessedSOP, ResponseRequirements, SOPProcessingStatus, SpecialConditions
+from sop.vector_indexer import VectorIndexer
+from sop.sop_snapshot import get_sop_snapshot
+from agents.tools.sop_search import SOPContextualSearch
+
+
+def make_sop(sop_id, title, category, triggers, priority, timeline, actions, notifications=None, regulatory=None):
+    """Build a ProcessedSOP fixture without going through the LLM extractor."""
+    return ProcessedSOP(
+        sop_id=sop_id,
+        title=title,
+        category=category,
+        triggers=triggers,
+        priority_override=priority,
+        response_requirements=ResponseRequirements(
+            timeline=timeline,
+            notifications=notifications or [],
+            required_actions=actions
+        ),
+        special_conditions=SpecialConditions(
+            applies_to_locations=["all_locations"],
+            applies_to_times=["all_times"],
+            escalation_required=priority in ("CRITICAL", "HIGH")
+        ),
+        regulatory_requirements=regulatory or [],
+        document_source=f"{sop_id}.md",
+        original_text=f"{title}. " * 10
+    )
+
+
+SAMPLE_SOPS = [
+    make_sop(
+        "SOP-001", "Medical Emergency Response Protocol", "medical_emergency",
+        ["fall detection", "person down", "person falling", "medical alert", "unconscious individual"],
+        "HIGH", "IMMEDIATE (within 30 seconds)",
+        ["Dispatch first aid responder", "Contact emergency services"],
+        ["Medical team", "Facilities management"], ["OSHA Incident Reporting"]
+    ),
+    make_sop(
+        "SOP-002", "Weapon Incident Protocol", "security_incident",
+        ["firearm detected", "person brandishing weapon", "gun", "knife"],
+        "CRITICAL", "IMMEDIATE",
+        ["Contact law enforcement", "Initiate lockdown"],
+        ["Law enforcement", "Security supervisor"]
+    ),
+    make_sop(
+        "SOP-003", "After Hours Access Protocol", "access_control",
+        ["after hours access", "door forced open", "invalid badge", "door held open"],
+        "MEDIUM", "URGENT (within 5 minutes)",
+        ["Verify badge holder identity", "Review access logs"],
+        ["Security supervisor"]
+    ),
+]
+
+
+class TestSOPVectorSearch:
+    """Test suite for embedding-backed SOP search."""
+
+    @pytest.fixture
+    def indexer(self, tmp_path):
+        """Index the sample SOPs into a fresh database."""
+        self.db_path = str(tmp_path / "sops.db")
+        indexer = VectorIndexer(db_path=self.db_path)
+        for sop in SAMPLE_SOPS:
+            success, error = indexer.index_sop(sop)
+            assert success, error
+        return indexer
+
+    def test_multi_word_query_finds_relevant_sop(self, indexer):
+        """Test that event descriptions longer than one word still match."""
+        results = indexer.search_sops("Person Falling Down detected in lobby", n_results=3, similarity_threshold=0.2)
+
+        assert results
+        assert results[0].sop_id == "SOP-001"
+        assert "person falling" in results[0].matched_triggers
+
+    def test_weapon_query_ranks_weapon_sop_first(self, indexer):
+        """Test ranking for a firearm detection."""
+        results = indexer.search_sops("Person Brandishing Firearm", n_results=3, similarity_threshold=0.0)
+
+        assert results[0].sop_id == "SOP-002"
+        assert results[0].priority_override == "CRITICAL"
+        scores = [result.similarity_score for result in results]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_similarity_threshold_filters_results(self, indexer):
+        """Test that similarity_threshold removes weak matches."""
+        loose = indexer.search_sops("door held open", n_results=3, similarity_threshold=0.0)
+        strict = indexer.search_sops("door held open", n_results=3, similarity_threshold=0.9)
+
+        assert len(loose) == 3
+        assert [result.sop_id for result in strict] == ["SOP-003"]
+        assert all(result.similarity_score >= 0.9 for result in strict)
+
+    def test_n_results_limits_output(self, indexer):
+        """Test that top-k is respected."""
+        results = indexer.search_sops("security", n_results=1, similarity_threshold=0.0)
+        assert len(results) == 1
+
+    def test_delete_removes_sop_from_index(self, indexer):
+        """Test that deleted SOPs are no longer returned."""
+        success, _ = indexer.delete_sop("SOP-002")
+        assert success
+
+        results = indexer.search_sops("firearm", n_results=3, similarity_threshold=0.0)
+        assert "SOP-002" not in [result.sop_id for result in results]
+
+    def test_embeddings_persist_across_instances(self, indexer):
+        """Test that a new indexer loads persisted embeddings."""
+        reloaded = VectorIndexer(db_path=self.db_path)
+
+        assert len(reloaded.embedding_index) == len(SAMPLE_SOPS)
+        results = reloaded.search_sops("medical alert", n_results=1, similarity_threshold=0.5)
+        assert [result.sop_id for result in results] == ["SOP-001"]
+
+    def test_search_sees_writes_from_other_indexers(self, indexer, monkeypatch):
+        """Test that SOPs indexed or deleted by another worker are picked up before searching."""
+        other = VectorIndexer(db_path=self.db_path)
+        other.index_sop(make_sop(
+            "SOP-004", "Fire Alarm Response", "environmental",
+            ["smoke detected", "fire alarm"], "HIGH", "IMMEDIATE", ["Evacuate building"]
+        ))
+        other.delete_sop("SOP-002")
+
+        assert [result.sop_id for result in indexer.search_sops("fire alarm", n_results=1)] == ["SOP-004"]
+        assert "SOP-002" not in [result.sop_id for result in indexer.search_sops("firearm", n_results=3)]
+
+        reloads = []
+        monkeypatch.setattr(indexer, "_load_embeddings", lambda: reloads.append(1))
+        indexer.delete_sop("SOP-003")
+        indexer.search_sops("door held open", n_results=3)
+        assert reloads == []
+
+    @pytest.mark.parametrize("query,sop_id", [
+        ("firearm", "SOP-002"),
+        ("Person Falling Down detected in lobby", "SOP-001"),
+        ("door held open", "SOP-003"),
+    ])
+    def test_default_threshold_finds_sample_sops(self, indexer, query, sop_id):
+        """Test that the embedder's default threshold keeps relevant SOPs and drops unrelated ones."""
+        results = indexer.search_sops(query, n_results=3)
+        assert [result.sop_id for result in results] == [sop_id]
+        assert indexer.search_sops("quarterly budget spreadsheet", n_results=3) == []
+
+    def test_search_without_embedder_uses_text_matching(self, tmp_path):
+        """Test the fallback path when embeddings are disabled."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "plain.db"), embedder=None)
+        for sop in SAMPLE_SOPS:
+            indexer.index_sop(sop)
+
+        results = indexer.search_sops("firearm", n_results=3, similarity_threshold=0.5)
+        assert [result.sop_id for result in results] == ["SOP-002"]
+
+
+class TestSOPContextualSearch:
+    """Test suite for the snapshot-backed SOP contextual search tool."""
+
+    @pytest.fixture
+    def indexer(self, tmp_path):
+        """Index the sample SOPs into a fresh database."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "sops.db"))
+        for sop in SAMPLE_SOPS:
+            indexer.index_sop(sop)
+        return indexer
+
+    def search(self, indexer, context, category_filter=None, max_results=3):
+        tool = SOPContextualSearch(db_path=indexer.db_path)
+        return json.loads(tool._run(context, category_filter, max_results))
+
+    def test_scoring_and_matched_triggers(self, indexer):
+        """Test trigger, title and text scoring for an event context."""
+        result = self.search(indexer, "falling down")
+        top = result["relevant_sops"][0]
+
+        assert top["sop_id"] == "SOP-001"
+        assert top["similarity_score"] == 1.0
+        assert top["matched_triggers"] == ["person down", "person falling"]
+        assert top["priority_override"] == "HIGH"
+
+    def test_category_filter(self, indexer):
+        """Test that the category filter restricts candidates."""
+        result = self.search(indexer, "door person", category_filter="access_control")
+        assert [sop["sop_id"] for sop in result["relevant_sops"]] == ["SOP-003"]
+
+        result = self.search(indexer, "door", category_filter="unknown_category")
+        assert result["relevant_sops"] == []
+        assert result["message"] == "No SOPs found in knowledge base"
+
+    def test_snapshot_refreshes_incrementally(self, indexer):
+        """Test that index_sop and delete_sop are visible without a full reload."""
+        self.search(indexer, "smoke")
+        snapshot = get_sop_snapshot(indexer.db_path)
+        version = snapshot.version
+
+        indexer.index_sop(make_sop(
+            "SOP-004", "Fire Alarm Response", "environmental",
+            ["smoke detected", "fire alarm"], "HIGH", "IMMEDIATE", ["Evacuate building"]
+        ))
+        indexer.delete_sop("SOP-002")
+
+        result = self.search(indexer, "smoke")
+        assert [sop["sop_id"] for sop in result["relevant_sops"]] == ["SOP-004"]
+        assert not self.search(indexer, "firearm")["relevant_sops"]
+        assert snapshot.version == version + 1
+
+    def test_snapshot_detects_external_writes(self, indexer):
+        """Test that writes from another connection trigger a reload."""
+        self.search(indexer, "door")
+
+        conn = sqlite3.connect(indexer.db_path)
+        conn.execute("DELETE FROM sops WHERE sop_id = 'SOP-003'")
+        conn.commit()
+        conn.close()
+
+        result = self.search(indexer, "door")
+        assert "SOP-003" not in [sop["sop_id"] for sop in result["relevant_sops"]]
+
+    def test_snapshot_ignores_other_tables(self, indexer):
+        """Test that job and extraction cache writes sharing the SOP database do not reload the snapshot."""
+        self.search(indexer, "door")
+        snapshot = get_sop_snapshot(indexer.db_path)
+        version = snapshot.version
+
+        jobs = SOPJobStore(indexer.db_path)
+        jobs.create(SOPProcessingStatus(job_id="job-1", status="uploaded", filename="a.md", file_size=1, progress=10))
+        jobs.update("job-1", status="indexing", progress=75)
+        cache = ExtractionCache(indexer.db_path, max_entries=10, ttl_seconds=3600)
+        cache.get_or_extract("document", "gpt-4", "v1", lambda: ({"title": "Cached"}, None))
+
+        self.search(indexer, "door")
+        assert snapshot.version == version
+
+    def test_missing_database_reports_error(self, tmp_path):
+        """Test the error payload when the database does not exist."""
+        tool = SOPContextualSearch(db_path=str(tmp_path / "missing.db"))
+        result = json.loads(tool._run("door held open"))
+
+        assert result["relevant_sops"] == []
+        assert "does not exist" in result["error"]
+
+
+class TestSOPKeywordSearch:
+    """Test suite for the FTS5 keyword search."""
+
+    @pytest.fixture
+    def indexer(self, tmp_path):
+        """Index the sample SOPs into a fresh database without embeddings."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "fts.db"), embedder=None)
+        for sop in SAMPLE_SOPS:
+            success, error = indexer.index_sop(sop)
+            assert success, error
+        return indexer
+
+    def test_bm25_ranking_and_snippet(self, indexer):
+        """Test that multi-term queries are ranked and return highlighted snippets."""
+        results = indexer.keyword_search_sops("Person Falling Down detected in lobby", n_results=3)
+
+        assert indexer.fts_enabled
+        assert results[0].sop_id == "SOP-001"
+        assert results[0].similarity_score > results[1].similarity_score
+        assert "[falling]" in results[0].snippet
+        assert "person falling" in results[0].matched_triggers
+
+    def test_threshold_and_category_filter(self, indexer):
+        """Test term coverage threshold and category filtering."""
+        results = indexer.keyword_search_sops("door held open", n_results=3, similarity_threshold=0.9)
+        assert [result.sop_id for result in results] == ["SOP-003"]
+
+        results = indexer.keyword_search_sops("security", n_results=3, category_filter="access_control")
+        assert [result.sop_id for result in results] == ["SOP-003"]
+
+    def test_index_tracks_updates_and_deletes(self, indexer):
+        """Test that the triggers keep the index in sync with index_sop and delete_sop."""
+        indexer.index_sop(SAMPLE_SOPS[1].model_copy(update={"triggers": ["armed intruder"]}))
+        assert not indexer.keyword_search_sops("firearm")
+        assert [result.sop_id for result in indexer.keyword_search_sops("intruder")] == ["SOP-002"]
+
+        indexer.delete_sop("SOP-002")
+        assert not indexer.keyword_search_sops("intruder")
+        assert indexer.storage.read().execute("SELECT COUNT(*) FROM sops_fts").fetchone()[0] == 2
+
+    def test_existing_database_is_backfilled(self, indexer):
+        """Test that a database without the index is backfilled on open."""
+        with indexer.storage.write() as conn:
+            conn.execute("DROP TABLE sops_fts")
+
+        reopened = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        assert [result.sop_id for result in reopened.keyword_search_sops("badge")] == ["SOP-003"]
+
+
+class TestSOPBulkIndexing:
+    """Test suite for chunked bulk SOP indexing."""
+
+    def bulk_sops(self, count):
+        return [
+            make_sop(f"BULK-{i:03d}", f"Fire Procedure {i}", "environmental",
+                     [f"smoke zone {i}", "fire alarm"], "HIGH", "IMMEDIATE", ["Evacuate building"])
+            for i in range(count)
+        ]
+
+    def test_bulk_index_in_chunks(self, tmp_path):
+        """Test that SOPs are written in chunked transactions and are searchable."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "bulk.db"))
+        result = indexer.index_sops(self.bulk_sops(25), chunk_size=10)
+
+        assert (result.total, result.indexed, result.chunks, result.failed) == (25, 25, 3, [])
+        assert len(indexer.get_all_sops()) == 25
+        assert len(indexer.embedding_index) == 25
+        assert indexer.keyword_search_sops("zone 7", n_results=1)[0].sop_id == "BULK-007"
+        assert get_sop_snapshot(indexer.db_path).count() == 25
+
+    def test_invalid_items_reported_without_aborting(self, tmp_path):
+        """Test that validation and insert failures are reported per item."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "bulk.db"), embedder=None)
+        with indexer.storage.write() as conn:
+            conn.execute(
+                "CREATE TRIGGER reject_sop BEFORE INSERT ON sops WHEN new.sop_id = 'BULK-002' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        items = [sop.model_dump(mode='json') for sop in self.bulk_sops(4)] + [{"sop_id": "BROKEN"}]
+
+        result = indexer.index_sops(items)
+
+        assert result.indexed == 3
+        assert [(failure.index, failure.sop_id) for failure in result.failed] == [(2, "BULK-002"), (4, "BROKEN")]
+        assert "rejected" in result.failed[0].error
+        assert "validation errors" in result.failed[1].error
+        assert sorted(sop["sop_id"] for sop in indexer.get_all_sops()) == ["BULK-000", "BULK-001", "BULK-003"]
+
+    def test_item_errors_of_any_kind_reported_per_item(self, tmp_path, monkeypatch):
+        """Test that non-SQLite errors from preparing, embedding or storing one SOP only fail that SOP."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "bulk.db"))
+        create_text, embed_many, store_text = indexer._create_searchable_text, indexer.embedder.embed_many, indexer._store_text
+
+        def searchable_text(sop):
+            if sop.sop_id == "BULK-001":
+                raise KeyError("title")
+            return create_text(sop)
+
+        def embed(passages):
+            if any("Procedure 2" in passage for passage in passages):
+                raise TypeError("cannot embed")
+            return embed_many(passages)
+
+        def store(conn, sop_id, text, dict_id=None):
+            if sop_id == "BULK-003":
+                raise ValueError("cannot compress")
+            return store_text(conn, sop_id, text, dict_id)
+
+        monkeypatch.setattr(indexer, "_create_searchable_text", searchable_text)
+        monkeypatch.setattr(indexer.embedder, "embed_many", embed)
+        monkeypatch.setattr(indexer, "_store_text", store)
+        result = indexer.index_sops(self.bulk_sops(5), chunk_size=10)
+
+        assert (result.indexed, result.chunks) == (2, 1)
+        assert [(failure.index, failure.sop_id) for failure in result.failed] == [
+            (1, "BULK-001"), (2, "BULK-002"), (3, "BULK-003")
+        ]
+        assert "cannot compress" in result.failed[2].error
+        assert sorted(sop["sop_id"] for sop in indexer.get_all_sops()) == ["BULK-000", "BULK-004"]
+        assert sorted(indexer._search_metadata) == ["BULK-000", "BULK-004"]
+
+
+class TestSOPDatabaseStats:
+    """Test suite for SQL-aggregated SOP statistics."""
+
+    def expected_stats(self, indexer):
+        """Recompute the stats the slow way, from every stored SOP."""
+        sops = indexer.get_all_sops()
+        categories, priorities = {}, {}
+        for sop in sops:
+            categories[sop["category"]] = categories.get(sop["category"], 0) + 1
+            priority = sop["priority_override"] or "not_specified"
+            priorities[priority] = priorities.get(priority, 0) + 1
+        return len(sops), categories, priorities, sum(len(sop["triggers"]) for sop in sops)
+
+    def actual_stats(self, indexer):
+        stats = indexer.get_database_stats()
+        return stats["total_sops"], stats["categories"], stats["priorities"], stats["trigger_count"]
+
+    def test_stats_track_writes(self, tmp_path):
+        """Test that the summary stays in sync through inserts, updates and deletes."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "stats.db"), embedder=None)
+        for sop in SAMPLE_SOPS:
+            indexer.index_sop(sop)
+        indexer.index_sop(SAMPLE_SOPS[0].model_copy(update={"priority_override": None, "triggers": ["fall"]}))
+        indexer.delete_sop("SOP-002")
+
+        stats = indexer.get_database_stats()
+        assert self.actual_stats(indexer) == self.expected_stats(indexer)
+        assert stats["priorities"] == {"not_specified": 1, "MEDIUM": 1}
+        assert stats["corpus_bytes"] > 0
+        assert stats["last_indexed_at"]
+
+    def test_summary_rebuilt_for_existing_database(self, tmp_path):
+        """Test that a database without the summary table gets it backfilled."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "stats.db"), embedder=None)
+        indexer.index_sops(SAMPLE_SOPS)
+        with indexer.storage.write() as conn:
+            conn.execute("DROP TABLE sop_stats")
+
+        reopened = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        assert self.actual_stats(reopened) == self.expected_stats(reopened)
+
+
+class TestSOPListing:
+    """Test suite for paginated, projected SOP listing."""
+
+    @pytest.fixture
+    def indexer(self, tmp_path):
+        indexer = VectorIndexer(db_path=str(tmp_path / "listing.db"), embedder=None)
+        indexer.index_sops([
+            sop.model_copy(update={"sop_id": f"{sop.sop_id}-{n}"}) for n in range(3) for sop in SAMPLE_SOPS
+        ])
+        return indexer
+
+    def test_cursor_pages_cover_every_sop_once(self, indexer):
+        """Test that following next_cursor returns every SOP exactly once, in order."""
+        seen, cursor = [], None
+        while True:
+            page = indexer.list_sops(limit=4, cursor=cursor, fields=["sop_id"])
+            seen.extend(item["sop_id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == sorted(sop["sop_id"] for sop in indexer.get_all_sops())
+        assert len(seen) == 9
+
+    def test_projection_and_category_filter(self, indexer):
+        """Test that only requested fields are returned, decoded from JSON where needed."""
+        page = indexer.list_sops(fields=["sop_id", "triggers"], category="security_incident")
+
+        assert len(page["items"]) == 3
+        assert all(set(item) == {"sop_id", "triggers"} for item in page["items"])
+        assert "gun" in page["items"][0]["triggers"]
+
+    def test_original_text_only_on_request(self, indexer):
+        """Test that the document text is left out of listings unless asked for."""
+        listed = indexer.list_sops(limit=1)["items"][0]
+        assert "original_text" not in listed
+        assert "title" in listed
+
+        sop = indexer.get_sop(listed["sop_id"])
+        assert sop["original_text"].startswith(sop["title"])
+        assert indexer.get_sop("SOP-404") is None
+
+    def test_unknown_field_and_bad_cursor_rejected(self, indexer):
+        """Test that invalid projections and cursors raise ValueError."""
+        with pytest.raises(ValueError):
+            indexer.list_sops(fields=["sop_id", "password"])
+        with pytest.raises(ValueError):
+            indexer.list_sops(cursor="not a cursor")
+
+    def test_legacy_original_text_migrated(self, tmp_path):
+        """Test that text stored inside the sops JSON is moved to sop_texts on open."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "legacy.db"), embedder=None)
+        indexer.index_sop(SAMPLE_SOPS[0])
+        with indexer.storage.write() as conn:
+            conn.execute("DELETE FROM sop_texts")
+            conn.execute(
+                "UPDATE sops SET data = json_set(data, '$.original_text', 'legacy text') WHERE sop_id = ?",
+                ("SOP-001",)
+            )
+
+        reopened = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        assert reopened.get_sop("SOP-001")["original_text"] == "legacy text"
+        data = reopened.storage.read().execute("SELECT data FROM sops").fetchone()[0]
+        assert "original_text" not in json.loads(data)
+
+
+class TestSOPTextCompression:
+    """Test suite for compressed storage of SOP document text."""
+
+    BOILERPLATE = "\n".join([
+        "STANDARD OPERATING PROCEDURE",
+        "Purpose: This procedure defines how security personnel respond.",
+        "Scope: Applies to all security personnel at all monitored sites.",
+        "Escalation: Notify the security supervisor immediately.",
+        "Documentation: Record the incident in the incident management system."
+    ])
+
+    def corpus(self, count):
+        return [
+            SAMPLE_SOPS[n % 3].model_copy(update={
+                "sop_id": f"TXT-{n:03d}",
+                "original_text": f"{self.BOILERPLATE}\nStep {n}: check door {n} and camera {n * 7}.\n{self.BOILERPLATE}"
+            })
+            for n in range(count)
+        ]
+
+    def stored_texts(self, indexer):
+        return indexer.storage.read().execute(
+            "SELECT codec, dict_id, length(CAST(original_text AS BLOB)), raw_bytes FROM sop_texts"
+        ).fetchall()
+
+    def test_dictionary_trained_and_texts_round_trip(self, tmp_path, monkeypatch):
+        """Test that a corpus dictionary is trained and every text decompresses unchanged."""
+        monkeypatch.setattr("sop.vector_indexer.settings.sop_text_dict_min_samples", 8)
+        indexer = VectorIndexer(db_path=str(tmp_path / "texts.db"), embedder=None)
+        sops = self.corpus(12)
+        indexer.index_sops(sops)
+
+        rows = self.stored_texts(indexer)
+        assert all(codec != "plain" and dict_id is not None for codec, dict_id, _, _ in rows)
+        assert sum(stored for _, _, stored, _ in rows) * 3 < sum(raw for _, _, _, raw in rows)
+
+        reopened = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        assert [reopened.get_sop(sop.sop_id)["original_text"] for sop in sops] == [sop.original_text for sop in sops]
+        assert [sop["original_text"] for sop in reopened.iter_sops(fields=["original_text"])] == \
+            [sop.original_text for sop in sops]
+
+    def test_dictionary_trained_once_without_blocking_writes(self, tmp_path, monkeypatch):
+        """Test that training leaves the writer free and other indexers reuse the stored dictionary."""
+        import threading
+        from sop import vector_indexer
+        monkeypatch.setattr("sop.vector_indexer.settings.sop_text_dict_min_samples", 8)
+        indexer = VectorIndexer(db_path=str(tmp_path / "texts.db"), embedder=None)
+        other = VectorIndexer(db_path=indexer.db_path, embedder=None)
+        train = vector_indexer.train_dictionary
+        writes = []
+
+        def train_while_writing(codec, samples):
+            def write():
+                with indexer.storage.write() as conn:
+                    writes.append(conn.execute("SELECT COUNT(*) FROM sops").fetchone()[0])
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(2)
+            return train(codec, samples)
+
+        monkeypatch.setattr(vector_indexer, "train_dictionary", train_while_writing)
+        sops = self.corpus(12)
+        indexer.index_sops(sops[:8])
+        assert writes == [8]
+
+        other.index_sop(sops[8])
+        assert indexer.storage.read().execute("SELECT COUNT(*) FROM sop_text_dicts").fetchone()[0] == 1
+        assert other.get_sop(sops[8].sop_id)["original_text"] == sops[8].original_text
+
+    def test_short_text_stored_plain(self, tmp_path):
+        """Test that texts too short to benefit are not compressed."""
+        indexer = VectorIndexer(db_path=str(tmp_path / "texts.db"), embedder=None)
+        indexer.index_sop(SAMPLE_SOPS[0].model_copy(update={"original_text": "Short SOP text."}))
+
+        assert self.stored_texts(indexer)[0][:2] == ("plain", None)
+        assert indexer.get_sop("SOP-001")["original_text"] == "Short SOP text."
+
+    def test_compression_disabled(self, tmp_path, monkeypatch):
+        """Test that SOP_TEXT_COMPRESSION=none keeps texts plain and readable."""
+        monkeypatch.setattr("sop.vector_indexer.settings.sop_text_compression", "none")
+        monkeypatch.setattr("sop.vector_indexer.settings.sop_text_dict_min_samples", 1)
+        indexer = VectorIndexer(db_path=str(tmp_path / "texts.db"), embedder=None)
+        sops = self.corpus(3)
+        indexer.index_sops(sops)
+
+        assert all(codec == "plain" for codec, _, _, _ in self.stored_texts(indexer))
+        assert indexer.get_sop("TXT-002")["original_text"] == sops[2].original_text
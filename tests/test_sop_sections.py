@@ -0,0 +1,137 @@
+import json
+import re
+from types import SimpleNamespace
+import pytest
+from sop.document_reader import DocumentReader
+from sop.extraction_cache import ExtractionCache
+from sop.sections import split_sections, merge_section_extractions
+from sop.sop_extractor import SOPExtractor
+
+SECTION_BODY = "Procedure text for this part of the SOP. " * 20
+
+DOCUMENT = "\n\n".join([
+    "# Hazardous Materials Response",
+    "Applies to every site handling regulated chemicals. " * 12,
+    "## Detection",
+    SECTION_BODY,
+    "## Notifications",
+    SECTION_BODY,
+    "## Containment",
+    SECTION_BODY,
+    "```\n# not a heading\n```",
+])
+
+
+class SectionCompletions:
+    """Fake LLM answering each section prompt with the section's heading as its trigger"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        heading = re.search(r"^#+ (.+)$", prompt, re.MULTILINE).group(1)
+        data = {
+            "sop_id": "SOP-HAZMAT" if heading.startswith("Hazardous") else None,
+            "title": "Hazardous Materials Response" if heading.startswith("Hazardous") else None,
+            "triggers": [heading.lower()],
+            "priority_override": "CRITICAL" if heading == "Detection" else None,
+            "response_requirements": {
+                "timeline": "within 5 minutes" if heading == "Notifications" else None,
+                "notifications": ["EHS Team"] if heading == "Notifications" else [],
+                "required_actions": [f"Perform {heading.lower()}"]
+            },
+            "special_conditions": {"applies_to_locations": [], "applies_to_times": [], "escalation_required": False},
+            "regulatory_requirements": ["OSHA"]
+        }
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(data)))])
+
+
+class TestSOPSections:
+    """Test suite for section-level incremental SOP extraction."""
+
+    @pytest.fixture
+    def extractor(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sop.sop_extractor.settings.sop_section_extraction_min_chars", 1000)
+        extractor = SOPExtractor(cache=ExtractionCache(str(tmp_path / "sections.db"), max_entries=100, ttl_seconds=3600))
+        extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=SectionCompletions()))
+        return extractor
+
+    def test_split_at_headings(self):
+        """Test splitting at headings, ignoring fenced code and folding short sections forward."""
+        sections = split_sections(DOCUMENT)
+        assert [section.heading for section in sections] == [
+            "Hazardous Materials Response", "Detection", "Notifications", "Containment"
+        ]
+        assert "# not a heading" in sections[-1].text
+
+        short = split_sections("# A\nshort\n## B\nalso short\n## C\n" + SECTION_BODY)
+        assert [section.heading for section in short] == ["A"]
+        assert split_sections("no headings at all")[0].heading == ""
+
+    def test_merge_contributions(self):
+        """Test that lists are unioned and the strictest timeline and priority win."""
+        merged = merge_section_extractions([
+            {"title": "Fire", "triggers": ["Smoke"], "priority_override": "medium",
+             "response_requirements": {"timeline": "within 15 minutes", "required_actions": ["Evacuate"]},
+             "special_conditions": {"applies_to_locations": ["all_locations"]}},
+            {"title": "Ignored", "triggers": ["smoke", "Heat"], "priority_override": "HIGH",
+             "response_requirements": {"timeline": "IMMEDIATE", "required_actions": ["evacuate", "Call 911"]},
+             "special_conditions": {"applies_to_locations": ["Warehouse"], "escalation_required": True}},
+        ])
+
+        assert merged["title"] == "Fire"
+        assert merged["triggers"] == ["Smoke", "Heat"]
+        assert merged["priority_override"] == "HIGH"
+        assert merged["response_requirements"]["timeline"] == "IMMEDIATE"
+        assert merged["response_requirements"]["required_actions"] == ["Evacuate", "Call 911"]
+        assert merged["special_conditions"]["applies_to_locations"] == ["Warehouse"]
+        assert merged["special_conditions"]["applies_to_times"] == ["all_times"]
+        assert merged["special_conditions"]["escalation_required"] is True
+
+    def test_only_edited_sections_reextracted(self, extractor):
+        """Test that editing one section costs one LLM call and the SOP is rebuilt from all sections."""
+        completions = extractor.client.chat.completions
+        sop, error = extractor.extract_sop_structure(DOCUMENT, "HazMat", "hazmat.md")
+        assert error is None
+        assert len(completions.prompts) == 4
+        assert sop.sop_id == "SOP-HAZMAT"
+        assert sop.priority_override == "CRITICAL"
+        assert sop.response_requirements.timeline_seconds == 300
+        assert sop.triggers == ["hazardous materials response", "detection", "notifications", "containment"]
+
+        edited = DOCUMENT.replace("## Notifications\n\n" + SECTION_BODY, "## Notifications\n\nCall the EHS team. " + SECTION_BODY)
+        sop, error = extractor.extract_sop_structure(edited, "HazMat", "hazmat.md")
+        assert error is None
+        assert len(completions.prompts) == 5
+        assert "Call the EHS team" in completions.prompts[-1]
+        assert sop.sop_id == "SOP-HAZMAT"
+        assert sop.original_text == edited
+
+    def test_short_documents_extracted_whole(self, extractor):
+        """Test that documents under the threshold still use a single whole-document call."""
+        extractor.extract_sop_structure("# Short\n\nA short SOP.", "Short", "short.md")
+        assert "Extract the following information" in extractor.client.chat.completions.prompts[-1]
+
+    def test_docx_headings_preserved(self):
+        """Test that mammoth's HTML headings become markdown headings for splitting."""
+        html = "<h1>Lockdown</h1><p>Secure <strong>all</strong> doors.</p><ul><li>Call 911</li></ul><h2>Recovery</h2><p>Resume.</p>"
+        text = DocumentReader()._html_to_text(html)
+        assert text == "# Lockdown\n\nSecure all doors.\n\n- Call 911\n\n## Recovery\n\nResume."
+        assert [section.heading for section in split_sections(text, min_chars=0)] == ["Lockdown", "Recovery"]
+
+    def test_docx_tables_and_lists_with_paragraphs(self):
+        """Test that mammoth's <p>-wrapped table cells and list items stay on one line."""
+        html = (
+            "<h1>Fire</h1>"
+            "<table><tr><th><p>Alarm</p></th><th><p>Action</p></th></tr>"
+            "<tr><td><p>Smoke</p></td><td><p>Evacuate</p><p>Call 911</p></td></tr></table>"
+            "<ul><li><p>Notify security</p><ul><li><p>Log the call</p></li></ul></li></ul>"
+            "<p>Done.</p>"
+        )
+        text = DocumentReader()._html_to_text(html)
+        assert text == (
+            "# Fire\n\nAlarm | Action\n\nSmoke | Evacuate Call 911\n\n"
+            "- Notify security\n\n- Log the call\n\nDone."
+        )
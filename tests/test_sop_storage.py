@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import pytest
+from sop.storage import SOPStorage, get_sop_storage
+
+
+class TestSOPStorage:
+    """Test suite for the shared SOP database storage layer."""
+
+    @pytest.fixture
+    def storage(self, tmp_path):
+        """Storage with a small table on a fresh database."""
+        storage = SOPStorage(str(tmp_path / "storage.db"))
+        with storage.write() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+        yield storage
+        storage.close()
+
+    def test_wal_mode_and_tuning(self, storage):
+        """Test that connections run in WAL mode with the configured pragmas."""
+        conn = storage.read()
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -storage.cache_size_kb
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == storage.busy_timeout_ms
+
+    def test_read_connection_per_thread(self, storage):
+        """Test that each thread reuses its own read connection."""
+        assert storage.read() is storage.read()
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(storage.read()))
+        thread.start()
+        thread.join()
+
+        assert other[0] is not storage.read()
+        assert storage.stats()["read_connections"] == 1
+
+    def test_read_connections_closed_when_threads_exit(self, storage):
+        """Test that short-lived threads do not leave read connections behind."""
+        storage.read()
+        connections = []
+        for _ in range(20):
+            thread = threading.Thread(target=lambda: connections.append(storage.read().execute("SELECT 1") and storage.read()))
+            thread.start()
+            thread.join()
+
+        assert storage.stats()["read_connections"] == 1
+        with pytest.raises(sqlite3.ProgrammingError):
+            connections[0].execute("SELECT 1")
+
+    def test_write_rolls_back_on_error(self, storage):
+        """Test that a failed write transaction leaves no changes."""
+        with pytest.raises(RuntimeError):
+            with storage.write() as conn:
+                conn.execute("INSERT INTO items (value) VALUES ('lost')")
+                raise RuntimeError("boom")
+
+        assert storage.read().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    def test_concurrent_reads_and_writes(self, storage):
+        """Test that concurrent writers are serialized and readers see committed rows."""
+        errors = []
+
+        def work(worker):
+            try:
+                for i in range(25):
+                    with storage.write() as conn:
+                        conn.execute("INSERT INTO items (value) VALUES (?)", (f"{worker}-{i}",))
+                    storage.read().execute("SELECT COUNT(*) FROM items").fetchone()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert storage.read().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 200
+
+    def test_shared_storage_per_path(self, tmp_path):
+        """Test that one storage is shared per database file."""
+        path = str(tmp_path / "shared.db")
+        assert get_sop_storage(path) is get_sop_storage(str(tmp_path / "." / "shared.db"))
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import os
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from sop.uploads import receive_upload, safe_filename, InvalidUploadError, UploadTooLargeError
+
+MAX_BYTES = 256 * 1024
+
+app = FastAPI()
+stored = []
+
+
+@app.post("/upload")
+async def upload(request: Request):
+    try:
+        upload = await receive_upload(request, max_bytes=MAX_BYTES, allowed_extensions=[".md", ".docx"])
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stored.append(upload)
+    with open(upload.path, "rb") as f:
+        content = f.read()
+    return {"filename": upload.filename, "size": upload.size, "sha256": upload.sha256, "content": content.decode()}
+
+
+class TestSOPUploads:
+    """Test suite for streaming SOP document uploads."""
+
+    @pytest.fixture(autouse=True)
+    def cleanup(self):
+        yield
+        for upload in stored:
+            upload.remove()
+        stored.clear()
+
+    def post(self, **kwargs):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post("/upload", **kwargs)
+        return asyncio.run(run())
+
+    @pytest.mark.parametrize("filename,expected", [
+        ("Fire Evacuation.md", "Fire Evacuation.md"),
+        ("../../etc/passwd.md", "passwd.md"),
+        ("..\\..\\boot.ini.docx", "boot.ini.docx"),
+        ("we|rd<name>.md", "we_rd_name_.md"),
+        (".md", "md"),
+        ("", "upload"),
+    ])
+    def test_safe_filename(self, filename, expected):
+        """Test that upload filenames cannot escape or misuse the temp directory."""
+        assert safe_filename(filename) == expected
+
+    def test_file_streamed_to_disk_and_hashed(self):
+        """Test that the file part is stored with its size and hash, ignoring other fields."""
+        body = b"# Fire Evacuation\n" * 1000
+        response = self.post(files={"file": ("fire.md", body)}, data={"note": "x" * 10000})
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["size"] == len(body)
+        assert result["sha256"] == hashlib.sha256(body).hexdigest()
+        assert result["content"] == body.decode()
+        assert os.path.basename(os.path.dirname(stored[0].path)).startswith("sop-upload-")
+
+    def test_oversized_upload_rejected_while_streaming(self, tmp_path, monkeypatch):
+        """Test that a body without Content-Length is cut off once the file passes the limit."""
+        monkeypatch.setattr("sop.uploads.tempfile.tempdir", str(tmp_path))
+        request = httpx.Request("POST", "http://test/upload", files={"file": ("big.md", b"x" * (4 * MAX_BYTES))})
+        content = request.read()
+        chunks_sent = []
+
+        async def body():
+            for start in range(0, len(content), 16 * 1024):
+                chunks_sent.append(start)
+                yield content[start:start + 16 * 1024]
+
+        response = self.post(content=body(), headers={"content-type": request.headers["content-type"]})
+        assert response.status_code == 413
+        assert len(chunks_sent) * 16 * 1024 < 2 * MAX_BYTES
+        assert os.listdir(tmp_path) == []
+
+    def test_invalid_uploads(self):
+        """Test rejection by declared size, file type, missing file and content type."""
+        assert self.post(files={"file": ("big.md", b"x" * (2 * MAX_BYTES))}).status_code == 413
+        assert "Unsupported file type" in self.post(files={"file": ("run.exe", b"x")}).json()["detail"]
+        assert self.post(files={"other": ("a.md", b"x")}).status_code == 400
+        assert self.post(json={"file": "a.md"}).status_code == 400
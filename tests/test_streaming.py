@@ -0,0 +1,161 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from agents import analysis_executor as executor_module
+from agents.analysis_executor import AnalysisExecutor
+from streaming import pipeline
+from streaming.pipeline import triage_stream, iter_lines
+from streaming.router import router
+
+
+def cv_event(i, detection_name="Person Brandishing Firearm"):
+    return {
+        "alert_event_id": str(i),
+        "severity": "HIGH",
+        "site_name": "San Jose",
+        "detection_name": detection_name,
+        "creation_time": "2025-07-08T18:30:03Z",
+        "camera_name": "Lobby"
+    }
+
+
+async def records_from(items, delay=0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+class TestStreamingIngestion:
+    """Test suite for streaming event ingestion."""
+
+    @pytest.fixture(autouse=True)
+    def executor(self, monkeypatch):
+        """Run stream analysis on a small dedicated executor."""
+        executor = AnalysisExecutor(workers=4, queue_size=8, name="stream-test")
+        executor.start()
+        monkeypatch.setattr(pipeline, "analysis_executor", executor)
+        monkeypatch.setattr(executor_module, "analysis_executor", executor)
+        yield executor
+        executor.stop()
+
+    def collect(self, records, **kwargs):
+        async def run():
+            return [result async for result in triage_stream(records, **kwargs)]
+        return asyncio.run(run())
+
+    def test_results_in_arrival_order(self, monkeypatch):
+        """Test that results are emitted in order even when later events finish first."""
+        import time
+
+        def analyze(event_data, event_type):
+            time.sleep(0.02 * (5 - int(event_data["alert_event_id"])))
+            return {"id": event_data["alert_event_id"]}
+
+        monkeypatch.setattr(pipeline, "run_triage_analysis", analyze)
+        lines = [json.dumps(cv_event(i)) for i in range(5)]
+        results = self.collect(records_from(lines), event_type="CV_Threat_Detection", queue_size=3)
+
+        assert [result["seq"] for result in results] == list(range(5))
+        assert [result["result"]["id"] for result in results] == [str(i) for i in range(5)]
+
+    def test_streams_hold_a_share_of_the_executor(self, executor, monkeypatch):
+        """Test that stream records wait for a stream slot instead of filling the shared queue."""
+        import threading
+        import time
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def analyze(event_data, event_type):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return {"id": event_data["alert_event_id"]}
+
+        monkeypatch.setattr(pipeline, "run_triage_analysis", analyze)
+        lines = [json.dumps(cv_event(i)) for i in range(30)]
+        results = self.collect(records_from(lines), event_type="CV_Threat_Detection", queue_size=30)
+
+        assert [result["result"]["id"] for result in results] == [str(i) for i in range(30)]
+        assert running[1] <= 2
+        assert executor.stats()["rejected"] == 0
+
+    def test_envelope_records_and_errors(self):
+        """Test mixed envelope records with invalid lines reported in place."""
+        lines = [
+            json.dumps({"event_type": "CV_Threat_Detection", "event": cv_event(1)}),
+            "not json",
+            "",
+            json.dumps({"event_type": "Access_Control_System", "event": {"alarm_name": "Door Held Open"}}),
+            json.dumps({"event_type": "Access_Control_System", "event": {
+                "serial_number": "S1", "device_id": "D-1", "controller_id": "C1", "segment_id": "1",
+                "alarm_name": "Door Held Open", "timestamp": "2025-07-08T18:30:03Z", "alarm_id": "A1"
+            }})
+        ]
+        results = self.collect(records_from(lines))
+
+        assert [result["seq"] for result in results] == [0, 1, 2, 3]
+        assert results[0]["result"]["ai_threat_level"] == "CRITICAL"
+        assert "Invalid JSON" in results[1]["error"]
+        assert "validation errors" in results[2]["error"]
+        assert results[3]["event_type"] == "Access_Control_System"
+
+    def test_iter_lines_handles_split_chunks(self):
+        """Test that NDJSON lines split across chunks are reassembled."""
+        async def run():
+            chunks = records_from([b'{"a": 1}\n{"b"', b': 2}\n', b'{"c": 3}'])
+            return [line async for line in iter_lines(chunks)]
+
+        assert asyncio.run(run()) == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+    def test_bad_records_do_not_abort_the_stream(self, monkeypatch):
+        """Test that invalid UTF-8, oversized lines and analyzer crashes each yield one error line."""
+        def analyze(event_data, event_type):
+            if event_data["alert_event_id"] == "2":
+                raise KeyError("camera_name")
+            return {"id": event_data["alert_event_id"]}
+
+        monkeypatch.setattr(pipeline, "run_triage_analysis", analyze)
+        body = b"\n".join([
+            json.dumps(cv_event(0)).encode(),
+            b'{"alert_event_id": "\xff\xfe"}',
+            b"x" * 5000,
+            json.dumps(cv_event(2)).encode(),
+            json.dumps(cv_event(3)).encode(),
+        ])
+        chunks = records_from([body[start:start + 1000] for start in range(0, len(body), 1000)])
+        results = self.collect(iter_lines(chunks, max_line_bytes=1000), event_type="CV_Threat_Detection")
+
+        assert [result["seq"] for result in results] == [0, 1, 2, 3, 4]
+        assert results[0]["result"] == {"id": "0"}
+        assert "error" in results[1]
+        assert results[2]["error"] == "Record exceeds 1000 bytes"
+        assert "Analysis failed" in results[3]["error"]
+        assert results[4]["result"] == {"id": "3"}
+
+    def test_ndjson_endpoint_streams_results(self):
+        """Test the chunked NDJSON endpoint end to end."""
+        app = FastAPI()
+        app.include_router(router)
+
+        async def run():
+            body = records_from([(json.dumps(cv_event(i)) + "\n").encode() for i in range(3)])
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/stream/events?event_type=CV_Threat_Detection", content=body)
+                return response.status_code, [json.loads(line) for line in response.text.splitlines()]
+
+        status, results = asyncio.run(run())
+        assert status == 200
+        assert [result["seq"] for result in results] == [0, 1, 2]
+        assert all(result["result"]["ai_threat_level"] == "CRITICAL" for result in results)
+
+    def test_invalid_event_type_rejected(self):
+        """Test that an unknown stream event type is rejected."""
+        with pytest.raises(ValueError):
+            self.collect(records_from([]), event_type="Unknown")
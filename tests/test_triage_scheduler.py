@@ -0,0 +1,93 @@
+import queue
+import threading
+import pytest
+from agents.analysis_executor import AnalysisExecutor, ExecutorSaturatedError
+from agents.triage_scheduler import TriageQueue, pre_score, highest_priority
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestTriageScheduler:
+    """Test suite for priority-aware triage scheduling."""
+
+    def drain(self, triage_queue, count):
+        return [triage_queue.get().name for _ in range(count)]
+
+    def test_pre_score(self):
+        """Test the cheap pre-score for both event types."""
+        assert pre_score({"detection_name": "Person Brandishing Firearm", "severity": "SEV3"}, "CV_Threat_Detection") == "CRITICAL"
+        assert pre_score({"detection_name": "Tailgating", "severity": "SEV0"}, "CV_Threat_Detection") == "CRITICAL"
+        assert pre_score({"detection_name": "Tailgating", "severity": "SEV3"}, "CV_Threat_Detection") == "LOW"
+        assert pre_score({"alarm_name": "Door Held Open", "device_id": "D-1"}, "Access_Control_System") == "HIGH"
+        assert pre_score({}, "Unknown") == "MEDIUM"
+        assert highest_priority(["LOW", "HIGH", "MEDIUM"]) == "HIGH"
+
+    def test_critical_dispatched_first(self):
+        """Test that queued CRITICAL work jumps ahead of earlier LOW work."""
+        triage_queue = TriageQueue(capacity=10)
+        for i in range(3):
+            triage_queue.put(Item(f"low-{i}"), "LOW")
+        triage_queue.put(Item("critical"), "CRITICAL")
+
+        assert self.drain(triage_queue, 4) == ["critical", "low-0", "low-1", "low-2"]
+
+    def test_weighted_fairness(self):
+        """Test that lower levels get a weighted share instead of starving."""
+        triage_queue = TriageQueue(capacity=100, weights={"HIGH": 4, "MEDIUM": 2, "LOW": 1})
+        for level in ("HIGH", "MEDIUM", "LOW"):
+            for i in range(20):
+                triage_queue.put(Item(level), level)
+
+        first = self.drain(triage_queue, 14)
+        assert (first.count("HIGH"), first.count("MEDIUM"), first.count("LOW")) == (8, 4, 2)
+
+    def test_full_queue_preempts_lower_priority(self):
+        """Test that urgent work preempts the newest queued low-priority item."""
+        triage_queue = TriageQueue(capacity=2)
+        triage_queue.put(Item("low-0"), "LOW")
+        triage_queue.put(Item("low-1"), "LOW")
+
+        victim = triage_queue.put(Item("critical"), "CRITICAL")
+        assert victim.name == "low-1"
+
+        with pytest.raises(queue.Full):
+            triage_queue.put(Item("low-2"), "LOW")
+
+        stats = triage_queue.stats()
+        assert stats["LOW"]["preempted"] == 1
+        assert stats["LOW"]["rejected"] == 1
+        assert stats["CRITICAL"]["depth"] == 1
+
+    def test_wait_histograms(self):
+        """Test that dispatch records per-level wait times."""
+        triage_queue = TriageQueue(capacity=10)
+        triage_queue.put(Item("a"), "HIGH")
+        triage_queue.get()
+
+        histogram = triage_queue.stats()["HIGH"]["wait_seconds"]
+        assert histogram["count"] == 1
+        assert histogram["buckets"]["+Inf"] == 1
+
+    def test_executor_preempted_work_fails_fast(self):
+        """Test that preempted work surfaces as saturation on its future."""
+        release = threading.Event()
+        started = threading.Event()
+        executor = AnalysisExecutor(workers=1, queue_size=1, name="priority-test")
+        executor.start()
+        try:
+            executor.submit_prioritized("LOW", lambda: started.set() or release.wait(5))
+            started.wait(5)
+            low = executor.submit_prioritized("LOW", lambda: "low")
+            critical = executor.submit_prioritized("CRITICAL", lambda: "critical")
+
+            with pytest.raises(ExecutorSaturatedError):
+                low.result(5)
+            release.set()
+            assert critical.result(5) == "critical"
+            assert executor.stats()["levels"]["CRITICAL"]["admitted"] == 1
+        finally:
+            release.set()
+            executor.stop()